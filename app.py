@@ -7,101 +7,58 @@ def check_port_available(host, port):
     sock.close()
     return result != 0
 
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import dash
 from dash import dcc, html
-from dash.dependencies import Input, Output, State, MATCH, ALL
+from dash.dependencies import Input, Output, State, MATCH, ALL, ClientsideFunction
 from dash import dash_table
 from dash.dash_table.Format import Format, Scheme
 import dash_bootstrap_components as dbc
 
-from data_processing.data_processing import update_output_extern
+from flask import Response, abort, jsonify, request, stream_with_context
+
+from config import METRICS_ENABLED, PARAMETER_TABLE_PAGE_SIZE, UPLOAD_CHUNK_BYTES
+from data_processing.data_processing import CHECKBOX_ROW_STYLE, expired_messages_extern, poll_upload_extern, start_upload_extern
+from data_processing.export import (
+    CURVE_ARCHIVE_NAME,
+    EXPORT_FORMATS,
+    available_formats,
+    iter_csv,
+    iter_curve_zip,
+    pop_export,
+    register_export,
+    selected_curves,
+    write_parquet,
+    write_xlsx,
+)
 from data_processing.graph_processing import update_graph_extern
+from data_processing.metrics import instrument, render_metrics
+from data_processing.statistics import GROUP_MODES, statistics_table_columns, update_statistics_extern
+from data_processing.parameter_table import (
+    TABLE_COLUMNS,
+    PRECISION_MAP,
+    query_parameter_table,
+    select_parameter_rows,
+)
+from input_handling.chunked_upload import UploadError, create_upload, write_chunk
 
-# Header-Definition
-header = [
-    "Voltage [mV]",
-    "Current [mA]",
-    "Power [mW]",
-    "Isc [mA]",
-    "Voc [mV]",
-    "Vmpp [mV]",
-    "Impp [mA]",
-    "Pmpp [mW]",
-    "FF [%]",
-    "Rp [kOhm]",
-    "Rs [Ohm]",
-    "Eta [%]",
-    "Jsc [mA/cm²]",
-    "Flashtime [ms]",
-    "Voltage 2 [mV]",
-    "Current 2 [mA]",
-    "Power 2 [mW]",
-    "Isc 2 [mA]",
-    "Vmpp 2 [mV]",
-    "Impp 2 [mA]",
-    "Pmpp 2 [mW]",
-    "Intensity [W/m²]",
-    "Start Voltage [V]",
-    "End Voltage [V]",
-    "Max Current [A]",
-    "Measurement Steps",
-    "Trigger Delay [ms]",
-    "Delay Between Sweep Steps [ms]",
-    "Aperture [ms]",
-    "AM1.5G",
-    "Spectral Flux Density [W/m²]"
-]
-
-# zentrale Präzisions-Map (Spalten -> Nachkommastellen) 
-PRECISION_MAP = {
-    'Isc [mA]': 1,
-    'Voc [mV]': 0,
-    'Vmpp [mV]': 0,
-    'Impp [mA]': 1,
-    'Pmpp [mW]': 2,
-    'FF [%]': 2,
-    'Rp [kOhm]': 2,
-    'Rs [Ohm]': 1,
-    'Eta [%]': 1,
-    'Jsc [mA/cm²]': 1,
-}
-
-
-PARAMETER_TABLE_COLUMNS = header[3:-2]
-DOWNLOADABLE_COLUMNS = ['Datei'] + PARAMETER_TABLE_COLUMNS
+DOWNLOADABLE_COLUMNS = ['Datei'] + TABLE_COLUMNS
 DEFAULT_DOWNLOAD_COLUMNS = [
     column for column in ["Datei", "Isc [mA]", "Voc [mV]", "FF [%]", "Eta [%]"]
     if column in DOWNLOADABLE_COLUMNS
 ]
 
-# Formatierung für den CSV-Download 
-def format_df_for_download(df: pd.DataFrame, precision_map: dict) -> pd.DataFrame:
-    df_out = df.copy()
-    for col, prec in precision_map.items():
-        if col in df_out.columns:
-            def _fmt(v):
-                # None/NaN/Platzhalter unverändert lassen
-                if pd.isna(v) or (isinstance(v, str) and v.strip().upper() in ('INF', '#NV')):
-                    return v
-                try:
-                    return f"{float(v):.{prec}f}"
-                except Exception:
-                    return v
-            df_out[col] = df_out[col].map(_fmt)
-    return df_out
-
-
-def normalize_filename(name: str) -> str:
-    # "IV Measurement" löschen
-    name = name.replace("IV Measurement", "")
-
-    # ".xlsx" am Ende entfernen
-    name = name.replace(".xlsx", "")
-
-    return name.strip("_ ")
+# Spalten-Definition der Parameter-Tabelle (einmalig, ändert sich nicht mit der Auswahl)
+PARAMETER_TABLE_COLUMN_DEFS = [{'name': 'Datei', 'id': 'Datei'}]
+for param in TABLE_COLUMNS:
+    if param in PRECISION_MAP:
+        PARAMETER_TABLE_COLUMN_DEFS.append({
+            'name': param,
+            'id': param,
+            'type': 'numeric',
+            'format': Format(precision=PRECISION_MAP[param], scheme=Scheme.fixed)
+        })
+    else:
+        PARAMETER_TABLE_COLUMN_DEFS.append({'name': param, 'id': param})
 
 # Dash-App initialisieren
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
@@ -123,16 +80,41 @@ app.layout = dbc.Container([
     dbc.Row([
         dbc.Col([
             html.H5('Dateien zum Auswerten hochladen:'),
-            dcc.Upload(
-                id='upload-data',
-                children=dbc.Button(
-                    "Dateien auswählen",
-                    color="secondary",
-                    className="mr-2"
-                ),
-                multiple=True
+            # Dateien werden roh und blockweise an /upload gesendet (assets/clientside.js), nicht als Base64-Data-URL
+            html.Div(
+                [
+                    dbc.Button(
+                        "Dateien auswählen",
+                        id='upload-select-btn',
+                        color="secondary",
+                        className="mr-2"
+                    ),
+                    html.Span('oder hierher ziehen', className='text-muted ms-2'),
+                ],
+                id='upload-area',
+                **{'data-chunk-bytes': UPLOAD_CHUNK_BYTES}
             ),
-            html.Div(id='file-list'),
+            # Wird vom Browser gesetzt, sobald alle Blöcke übertragen sind
+            dcc.Store(id='raw-upload'),
+            # Fortschritt des laufenden Uploads (Verarbeitung im Hintergrund)
+            html.Div(
+                [
+                    html.Div(id='upload-progress'),
+                    dbc.Button(
+                        'Abbrechen', id='upload-cancel-btn', color='danger', outline=True, size='sm',
+                        style={'display': 'none'}
+                    ),
+                ],
+                className='mt-2'
+            ),
+            dcc.Interval(id='upload-interval', interval=500, disabled=True),
+            # ID der serverseitigen Upload-Warteschlange (schreibt nur der Start-Callback)
+            dcc.Store(id='upload-job'),
+            # Wird per Patch erweitert (nur neue Dateien), Meldungen des letzten Uploads separat
+            html.Ul(id='file-list', children=[]),
+            html.Div(id='upload-messages'),
+            # Dateien, die aus dem Cache verdrängt wurden und neu hochgeladen werden müssen
+            html.Div(id='expired-messages'),
         ], width=12)
     ], className="mt-4"),
 
@@ -140,7 +122,14 @@ app.layout = dbc.Container([
     dbc.Row([
         dbc.Col([
             html.H5('Datensätze Plotten:'),
-            html.Div(id='dataset-checkboxes')
+            # Eine Spalte pro Datei; neue Dateien werden angehängt, vorhandene behalten ihre Auswahl
+            dbc.Row(
+                [],
+                id='dataset-checkboxes',
+                justify="start",
+                className="g-0",
+                style=CHECKBOX_ROW_STYLE
+            )
         ], width=12)
     ], className="mt-4"),
 
@@ -173,6 +162,23 @@ app.layout = dbc.Container([
                 ],
                 className='d-flex align-items-center mb-3'
             ),
+            # Darstellung: Einzelkurven oder auf gemeinsamem Spannungsraster gemittelt/verglichen
+            dbc.RadioItems(
+                id='graph-mode',
+                options=[
+                    {'label': 'Einzelkurven', 'value': 'raw'},
+                    {'label': 'Mittelwert ± Std pro Datei', 'value': 'mean'},
+                    {'label': 'Differenz zur Referenz', 'value': 'delta'}
+                ],
+                value='raw',
+                className='mb-2'
+            ),
+            dcc.Dropdown(
+                id='reference-curve',
+                options=[],
+                placeholder='Referenz (Standard: erster ausgewählter Datensatz)',
+                className='mb-3'
+            ),
             dbc.RadioItems(
                 id='axis-range-toggle',
                 options=[
@@ -226,6 +232,16 @@ app.layout = dbc.Container([
             html.Div(
                 [
                     dbc.Button('Download Data', id='download-btn', color='success'),
+                    dbc.Button('Download Curves', id='download-curves-btn', color='success', outline=True),
+                    dbc.RadioItems(
+                        id='download-format',
+                        options=[{'label': fmt.upper(), 'value': fmt} for fmt in available_formats()],
+                        value='csv',
+                        inline=True,
+                        inputClassName='me-1',
+                        labelClassName='me-2',
+                        className='d-inline-flex flex-nowrap'
+                    ),
                     html.Div(
                         dbc.Checklist(
                             id='download-columns',
@@ -250,37 +266,153 @@ app.layout = dbc.Container([
                 ],
                 className='d-flex align-items-center gap-2 mb-2'
             ),
-            dcc.Download(id='download-data'),
-            html.Div(id='header-parameters')
+            # URL des vorbereiteten Exports; der Browser lädt ihn direkt über /export/<token>
+            dcc.Store(id='download-url'),
+            dcc.Store(id='download-started'),
+            html.Div(
+                # Blättern, Sortieren und Filtern laufen serverseitig; es wird nur die sichtbare Seite übertragen
+                dash_table.DataTable(
+                    id='parameter-table',
+                    columns=PARAMETER_TABLE_COLUMN_DEFS,
+                    data=[],
+                    page_action='custom',
+                    page_current=0,
+                    page_size=PARAMETER_TABLE_PAGE_SIZE,
+                    page_count=1,
+                    sort_action='custom',
+                    sort_mode='multi',
+                    sort_by=[],
+                    filter_action='custom',
+                    filter_query='',
+                    style_table={'overflowX': 'auto', 'paddingBottom': '20px'},
+                    style_cell={
+                        'textAlign': 'left',
+                        'padding': '5px',
+                        'minWidth': '60px',
+                        'whiteSpace': 'nowrap',  # verhindert Umbrüche
+                        'overflow': 'visible'    # Verhindert abgeschnittenen Text
+                    },
+                    style_header={'backgroundColor': 'lightgrey', 'fontWeight': 'bold'}
+                ),
+                id='header-parameters',
+                style={'display': 'none'}
+            )
         ], width=12)
     ], className="mt-4"),
 
+    # Statistik über die ausgewählten Datensätze (Verteilungen pro Datei bzw. Probe)
+    dbc.Row([
+        dbc.Col([
+            html.H5('Statistik der ausgewählten Datensätze:'),
+            html.Div(
+                [
+                    dbc.RadioItems(
+                        id='stats-group-mode',
+                        options=[{'label': label, 'value': mode} for mode, label in GROUP_MODES.items()],
+                        value='file',
+                        inline=True
+                    ),
+                    dbc.RadioItems(
+                        id='stats-plot-type',
+                        options=[
+                            {'label': 'Box-Plot', 'value': 'box'},
+                            {'label': 'Violin-Plot', 'value': 'violin'}
+                        ],
+                        value='box',
+                        inline=True
+                    )
+                ],
+                className='d-flex gap-4 mb-2'
+            ),
+            dcc.Graph(id='stats-graph'),
+            dash_table.DataTable(
+                id='stats-table',
+                columns=statistics_table_columns(),
+                data=[],
+                merge_duplicate_headers=True,
+                sort_action='native',
+                style_table={'overflowX': 'auto', 'paddingBottom': '20px'},
+                style_cell={'textAlign': 'left', 'padding': '5px', 'minWidth': '60px', 'whiteSpace': 'nowrap'},
+                style_header={'backgroundColor': 'lightgrey', 'fontWeight': 'bold'}
+            )
+        ], width=12)
+    ], id='statistics-section', className="mt-4", style={'display': 'none'}),
+
     # Versteckter Speicher für die Daten
-    dcc.Store(id='data-store')
+    dcc.Store(id='data-store'),
+    # Was aktuell im IV-Graphen angezeigt wird (Basis für inkrementelle Updates)
+    dcc.Store(id='graph-state'),
+    # Letzter Zoom im IV-Graphen samt der uirevision, unter der er entstanden ist
+    dcc.Store(id='graph-zoom')
 ], fluid=True)
 
-# Callback zum Verarbeiten der hochgeladenen Dateien
+# Callback zum Starten der Verarbeitung der hochgeladenen Dateien (läuft im Hintergrund weiter,
+# ein weiterer Upload wird hinten angehängt)
+@app.callback(
+    [
+        Output('upload-job', 'data'),
+        Output('upload-interval', 'disabled'),
+        Output('upload-progress', 'children'),
+        Output('upload-cancel-btn', 'style')
+    ],
+    [Input('raw-upload', 'data')],
+    [
+        State('data-store', 'data'),
+        State('upload-job', 'data')
+    ],
+    prevent_initial_call=True
+)
+@instrument('start_upload')
+def start_upload(raw_upload, existing_data, upload_job):
+    return start_upload_extern(raw_upload, existing_data, upload_job)
+
+# Callback, der fertige Dateien abholt und mit den alten Daten aus existing_data zusammenführt
 @app.callback(
     [
         Output('file-list', 'children'),
+        Output('upload-messages', 'children'),
         Output('data-store', 'data'),
-        Output('dataset-checkboxes', 'children')
+        Output('dataset-checkboxes', 'children'),
+        Output('upload-progress', 'children', allow_duplicate=True),
+        Output('upload-interval', 'disabled', allow_duplicate=True),
+        Output('upload-cancel-btn', 'style', allow_duplicate=True)
+    ],
+    [
+        Input('upload-interval', 'n_intervals'),
+        Input('upload-cancel-btn', 'n_clicks')
     ],
-    [Input('upload-data', 'contents')],
     [
-        State('upload-data', 'filename'),
+        State('upload-job', 'data'),
         State('data-store', 'data')
-    ]
+    ],
+    prevent_initial_call=True
 )
-def update_output(list_of_contents, list_of_names, existing_data):
+@instrument('update_output')
+def update_output(n_intervals, cancel_clicks, upload_job, existing_data):
     """
-    Callback, der alte Daten aus existing_data übernimmt und mit den neu hochgeladenen
-    Dateien zusammenführt.
+    Callback, der alte Daten aus existing_data übernimmt und mit den bereits
+    verarbeiteten Dateien des laufenden Uploads zusammenführt.
     """
-    return update_output_extern(list_of_contents, list_of_names, existing_data)
+    cancel_requested = dash.ctx.triggered_id == 'upload-cancel-btn'
+    return poll_upload_extern(cancel_requested, upload_job, existing_data)
 
-# Callback zum Aktivieren/Deaktivieren der Eingabefelder und Anzeigen der Preset-Optionen
+# Callback, der auf abgelaufene Dateien hinweist (geprüft bei jeder Änderung der Auswahl)
 @app.callback(
+    Output('expired-messages', 'children'),
+    [
+        Input('data-store', 'data'),
+        Input({'type': 'dataset-checklist', 'index': ALL}, 'value')
+    ]
+)
+@instrument('update_expired_messages')
+def update_expired_messages(data_store, dataset_checklist_values):
+    return expired_messages_extern(data_store)
+
+# Reine UI-Zustände laufen clientseitig (assets/clientside.js), ohne Server-Roundtrip
+
+# Callback zum Aktivieren/Deaktivieren der Eingabefelder und Anzeigen der Preset-Optionen
+app.clientside_callback(
+    ClientsideFunction(namespace='sosim', function_name='toggle_axis_inputs'),
     [Output('x-min-input', 'disabled'),
      Output('x-max-input', 'disabled'),
      Output('y-min-input', 'disabled'),
@@ -289,30 +421,20 @@ def update_output(list_of_contents, list_of_names, existing_data):
      Output('preset-toggle', 'value')],
     Input('axis-range-toggle', 'value')
 )
-def toggle_axis_inputs(axis_range_toggle):
-    if axis_range_toggle == 'manual':
-        return [False, False, False, False, {'display': 'block'}, 'preset1']
-    else:
-        return [True, True, True, True, {'display': 'none'}, dash.no_update]
 
 # Callback zum Setzen der Eingabefelder basierend auf dem ausgewählten Preset
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='sosim', function_name='update_axis_inputs'),
     [Output('x-min-input', 'value'),
      Output('x-max-input', 'value'),
      Output('y-min-input', 'value'),
      Output('y-max-input', 'value')],
     Input('preset-toggle', 'value')
 )
-def update_axis_inputs(preset_value):
-    if preset_value == 'preset1':
-        return [-500, 800, -200, 600]  # Werte für Preset-1
-    elif preset_value == 'preset2':
-        return [-800, 1500, -400, 800]  # Werte für Preset-2
-    else:
-        return [dash.no_update]*4
 
 # Callback für Achsen Spiegelung
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='sosim', function_name='toggle_flip_buttons'),
     [
         Output('x-flip-btn', 'active'),
         Output('x-flip-btn', 'outline'),
@@ -329,15 +451,35 @@ def update_axis_inputs(preset_value):
     ],
     prevent_initial_call=True
 )
-def toggle_flip_buttons(x_n, y_n, x_active, y_active):
-    ctx = dash.callback_context.triggered[0]['prop_id'].split('.')[0]
-    if ctx == 'x-flip-btn':
-        x_active = not x_active
-    elif ctx == 'y-flip-btn':
-        y_active = not y_active
 
-    # outline umkehren, damit aktiv = gefüllt, inaktiv = outline
-    return x_active, not x_active, y_active, not y_active
+# Callback, der Flips und Achsenbereich direkt an der angezeigten Figur anwendet.
+# graph-state als Input: nach jeder Antwort des Servers werden Traces mit veraltetem Flip nachgezogen.
+# graph-zoom nur, wenn ausgedünnte Kurven für den neuen Ausschnitt neu aufgelöst werden müssen.
+app.clientside_callback(
+    ClientsideFunction(namespace='sosim', function_name='apply_view'),
+    [Output('IV-graph', 'figure', allow_duplicate=True),
+     Output('graph-state', 'data', allow_duplicate=True),
+     Output('graph-zoom', 'data', allow_duplicate=True)],
+    [Input('x-flip-btn', 'active'),
+     Input('y-flip-btn', 'active'),
+     Input('axis-range-toggle', 'value'),
+     Input('x-min-input', 'value'),
+     Input('x-max-input', 'value'),
+     Input('y-min-input', 'value'),
+     Input('y-max-input', 'value'),
+     Input('graph-state', 'data')],
+    [State('IV-graph', 'figure')],
+    prevent_initial_call=True
+)
+
+# Callback, der jeden Zoom mit der aktuellen uirevision versieht (ältere Zooms verwirft der Server)
+app.clientside_callback(
+    ClientsideFunction(namespace='sosim', function_name='stamp_zoom'),
+    Output('graph-zoom', 'data'),
+    Input('IV-graph', 'relayoutData'),
+    State('graph-state', 'data'),
+    prevent_initial_call=True
+)
 
 # Callback zur Synchronisation von Datei- und Datensatz-Checkboxes
 @app.callback(
@@ -345,6 +487,7 @@ def toggle_flip_buttons(x_n, y_n, x_active, y_active):
     Input({'type': 'file-checkbox', 'index': MATCH}, 'value'),
     State({'type': 'dataset-checklist', 'index': MATCH}, 'options')
 )
+@instrument('update_dataset_checklist')
 def update_dataset_checklist(file_checkbox_value, dataset_options):
     if file_checkbox_value == []:
         # Wenn die Datei-Checkbox deaktiviert ist, alle Datensätze deaktivieren
@@ -355,123 +498,103 @@ def update_dataset_checklist(file_checkbox_value, dataset_options):
 
 # Callback zur Aktualisierung des Graphen basierend auf den ausgewählten Datensätzen
 @app.callback(
-    Output('IV-graph', 'figure'),
+    [Output('IV-graph', 'figure'),
+     Output('graph-state', 'data'),
+     Output('reference-curve', 'options')],
     [Input({'type': 'dataset-checklist', 'index': ALL}, 'value'),
-     Input('axis-range-toggle', 'value'),
-     Input('x-min-input', 'value'),
-     Input('x-max-input', 'value'),
-     Input('y-min-input', 'value'),
-     Input('y-max-input', 'value'),
-     Input('x-flip-btn', 'active'),
-     Input('y-flip-btn', 'active')],
-    [State('data-store', 'data'),
-     State({'type': 'dataset-checklist', 'index': ALL}, 'id')]
+     # Zoom, und bei ausgedünnten Kurven auch ein neuer Achsenbereich (apply_view), ändern die nötige Auflösung
+     Input('graph-zoom', 'data'),
+     Input('graph-mode', 'value'),
+     Input('reference-curve', 'value')],
+    [State('axis-range-toggle', 'value'),
+     State('x-min-input', 'value'),
+     State('x-max-input', 'value'),
+     State('y-min-input', 'value'),
+     State('y-max-input', 'value'),
+     State('x-flip-btn', 'active'),
+     State('y-flip-btn', 'active'),
+     State('data-store', 'data'),
+     State({'type': 'dataset-checklist', 'index': ALL}, 'id'),
+     State('graph-state', 'data')]
 )
-def update_graph(selected_datasets_per_file, axis_range_toggle, x_min_input, x_max_input, y_min_input, y_max_input, x_flip_btn, y_flip_btn, data_store, ids):
-    figure = update_graph_extern(selected_datasets_per_file, axis_range_toggle, x_min_input, x_max_input, y_min_input, y_max_input, x_flip_btn, y_flip_btn, data_store, ids)
-    
-    # Update legend labels with normalized filenames
-    if figure and 'data' in figure:
-        for trace in figure['data']:
-            if 'name' in trace:
-                trace['name'] = normalize_filename(trace['name'])
-    return figure
-
-# Hilfsfunktion zum Vorbereiten der Tabellendaten basierend auf den aktiven Auswahlen
-def prepare_parameter_table_data(data_store, file_checkbox_values, file_checkbox_ids, dataset_checklist_values, dataset_checklist_ids):
-    if not data_store or 'parameters' not in data_store:
-        return []
-
-    active_files = set()
-    for val, comp_id in zip(file_checkbox_values, file_checkbox_ids):
-        if val and comp_id.get('index'):
-            active_files.add(comp_id['index'])  # -> IDs bleiben unverändert (Originalname)
-
-    active_datasets = {}
-    for val, comp_id in zip(dataset_checklist_values, dataset_checklist_ids):
-        if comp_id.get('index'):
-            active_datasets[comp_id['index']] = set(val) if val else set()
-
-    table_data = []
-    formatted_keys = ['Isc [mA]', 'Voc [mV]', 'Vmpp [mV]', 'Impp [mA]', 'Pmpp [mW]', 'FF [%]', 'Rp [kOhm]', 'Rs [Ohm]', 'Eta [%]', 'Jsc [mA/cm²]']
-
-    for orig_fn, param_rows in data_store['parameters'].items():
-        if orig_fn not in active_files:
-            continue
-
-        display_fn = normalize_filename(orig_fn)  # <<< nur für Anzeige
-
-        if param_rows is not None:
-            selected_indices = set(active_datasets.get(orig_fn, set(range(len(param_rows)))))  # <<< Lookup mit Original!
-            for idx, param_values in enumerate(param_rows):
-                if idx not in selected_indices:
-                    continue
-                row = {'Datei': f"{display_fn} - Datensatz {idx + 1}"}  # <<< Anzeige-Name
-                for key, value in zip(header, param_values):
-                    if key not in PARAMETER_TABLE_COLUMNS:
-                        continue
-                    if key in formatted_keys and value is not None and value != 'Inf' and str(value).strip().upper() != '#NV':
-                        row[key] = float(value) * 100 if key == 'FF [%]' else float(value)
-                    else:
-                        row[key] = value
-                table_data.append(row)
-
-    return table_data
-
-# Callback zur Anzeige der Parameter in einer Tabelle
+@instrument('update_graph')
+def update_graph(selected_datasets_per_file, zoom, graph_mode, reference, axis_range_toggle, x_min_input, x_max_input, y_min_input, y_max_input, x_flip_btn, y_flip_btn, data_store, ids, graph_state):
+    # Liefert beim ersten Mal die ganze Figur, danach nur noch Patches (Legenden-Namen sind bereits normalisiert).
+    # Flips und Achsenbereich wendet der Browser selbst an (apply_view); nur wenn Kurven ausgedünnt
+    # sind, meldet er einen neuen Ausschnitt über graph-zoom, damit die passende Auflösung nachgeladen wird.
+    return update_graph_extern(selected_datasets_per_file, axis_range_toggle, x_min_input, x_max_input, y_min_input, y_max_input, x_flip_btn, y_flip_btn, data_store, ids, zoom, graph_state, graph_mode, reference)
+
+# Callback zur Anzeige der Parameter in einer Tabelle (nur die aktuelle Seite)
 @app.callback(
-    Output('header-parameters', 'children'),
+    [
+        Output('parameter-table', 'data'),
+        Output('parameter-table', 'page_count'),
+        Output('parameter-table', 'page_current'),
+        Output('header-parameters', 'style')
+    ],
     [
         Input('data-store', 'data'),
         Input({'type': 'file-checkbox', 'index': ALL}, 'value'),
         Input({'type': 'file-checkbox', 'index': ALL}, 'id'),
         Input({'type': 'dataset-checklist', 'index': ALL}, 'value'),
-        Input({'type': 'dataset-checklist', 'index': ALL}, 'id')
+        Input({'type': 'dataset-checklist', 'index': ALL}, 'id'),
+        Input('parameter-table', 'page_current'),
+        Input('parameter-table', 'page_size'),
+        Input('parameter-table', 'sort_by'),
+        Input('parameter-table', 'filter_query')
     ]
 )
-def update_header_parameters(data_store, file_checkbox_values, file_checkbox_ids, dataset_checklist_values, dataset_checklist_ids):
-    if not data_store or 'parameters' not in data_store:
-        return ''
+@instrument('update_header_parameters')
+def update_header_parameters(data_store, file_checkbox_values, file_checkbox_ids, dataset_checklist_values, dataset_checklist_ids,
+                             page_current, page_size, sort_by, filter_query):
+    if not data_store or 'handles' not in data_store:
+        return [], 1, 0, {'display': 'none'}
 
-    table_data = prepare_parameter_table_data(
+    rows = select_parameter_rows(
         data_store,
         file_checkbox_values,
         file_checkbox_ids,
         dataset_checklist_values,
         dataset_checklist_ids
     )
+    page, page_count, page_current = query_parameter_table(
+        rows, filter_query, sort_by, page_current, page_size or PARAMETER_TABLE_PAGE_SIZE
+    )
+    table_data = page[['Datei'] + TABLE_COLUMNS].to_dict('records')
+    return table_data, page_count, page_current, {}
 
-    # Spalten-Definition
-    columns = [{'name': 'Datei', 'id': 'Datei'}]
-    for param in PARAMETER_TABLE_COLUMNS:
-        if param in PRECISION_MAP:
-            columns.append({
-                'name': param,
-                'id': param,
-                'type': 'numeric',
-                'format': Format(precision=PRECISION_MAP[param], scheme=Scheme.fixed)
-            })
-        else:
-            columns.append({'name': param, 'id': param})
-
-    parameter_table = dash_table.DataTable(
-        data=table_data,
-        columns=columns,
-        style_table={'overflowX': 'auto', 'paddingBottom': '20px'},
-        style_cell={
-            'textAlign': 'left',
-            'padding': '5px',
-            'minWidth': '60px',
-            'whiteSpace': 'nowrap',  # verhindert Umbrüche
-            'overflow': 'visible'    # Verhindert abgeschnittenen Text
-        },
-        style_header={'backgroundColor': 'lightgrey', 'fontWeight': 'bold'}
+# Callback für die Statistik-Ansicht (Teil-Aggregate pro Datei werden zwischengespeichert)
+@app.callback(
+    [
+        Output('stats-graph', 'figure'),
+        Output('stats-table', 'data'),
+        Output('statistics-section', 'style')
+    ],
+    [
+        Input('data-store', 'data'),
+        Input({'type': 'file-checkbox', 'index': ALL}, 'value'),
+        Input({'type': 'file-checkbox', 'index': ALL}, 'id'),
+        Input({'type': 'dataset-checklist', 'index': ALL}, 'value'),
+        Input({'type': 'dataset-checklist', 'index': ALL}, 'id'),
+        Input('stats-group-mode', 'value'),
+        Input('stats-plot-type', 'value')
+    ]
+)
+@instrument('update_statistics')
+def update_statistics(data_store, file_checkbox_values, file_checkbox_ids, dataset_checklist_values, dataset_checklist_ids, group_mode, plot_type):
+    return update_statistics_extern(
+        data_store,
+        file_checkbox_values,
+        file_checkbox_ids,
+        dataset_checklist_values,
+        dataset_checklist_ids,
+        group_mode,
+        plot_type
     )
-    return parameter_table
 
-# Callback zum Herunterladen der ausgewählten Parameter als CSV
+# Callback zum Herunterladen der ausgewählten Parameter (CSV, XLSX oder Parquet)
 @app.callback(
-    Output('download-data', 'data'),
+    Output('download-url', 'data'),
     Input('download-btn', 'n_clicks'),
     State('data-store', 'data'),
     State({'type': 'file-checkbox', 'index': ALL}, 'value'),
@@ -479,10 +602,12 @@ def update_header_parameters(data_store, file_checkbox_values, file_checkbox_ids
     State({'type': 'dataset-checklist', 'index': ALL}, 'value'),
     State({'type': 'dataset-checklist', 'index': ALL}, 'id'),
     State('download-columns', 'value'),
+    State('download-format', 'value'),
     prevent_initial_call=True
 )
-def download_selected_data(n_clicks, data_store, file_checkbox_values, file_checkbox_ids, dataset_checklist_values, dataset_checklist_ids, selected_columns):
-    table_data = prepare_parameter_table_data(
+@instrument('download_selected_data')
+def download_selected_data(n_clicks, data_store, file_checkbox_values, file_checkbox_ids, dataset_checklist_values, dataset_checklist_ids, selected_columns, export_format):
+    rows = select_parameter_rows(
         data_store,
         file_checkbox_values,
         file_checkbox_ids,
@@ -490,19 +615,96 @@ def download_selected_data(n_clicks, data_store, file_checkbox_values, file_chec
         dataset_checklist_ids
     )
 
-    if not table_data or not selected_columns:
+    if rows.empty or not selected_columns:
         return dash.no_update
 
-    df = pd.DataFrame(table_data)
-    valid_columns = [column for column in selected_columns if column in df.columns]
+    valid_columns = [column for column in selected_columns if column in DOWNLOADABLE_COLUMNS]
     if not valid_columns:
         return dash.no_update
 
-    df = df[valid_columns]
+    if export_format not in available_formats():
+        export_format = 'csv'
+    # Die Datei selbst wird erst beim Abruf der Route erzeugt (CSV blockweise gestreamt)
+    token = register_export('parameters', (rows, valid_columns), export_format)
+    return f'/export/{token}'
+
+# Callback zum Herunterladen der Rohkurven als ZIP (eine CSV- bzw. Parquet-Datei pro Datensatz)
+@app.callback(
+    Output('download-url', 'data', allow_duplicate=True),
+    Input('download-curves-btn', 'n_clicks'),
+    State('data-store', 'data'),
+    State({'type': 'file-checkbox', 'index': ALL}, 'value'),
+    State({'type': 'file-checkbox', 'index': ALL}, 'id'),
+    State({'type': 'dataset-checklist', 'index': ALL}, 'value'),
+    State({'type': 'dataset-checklist', 'index': ALL}, 'id'),
+    State('download-format', 'value'),
+    prevent_initial_call=True
+)
+@instrument('download_selected_curves')
+def download_selected_curves(n_clicks, data_store, file_checkbox_values, file_checkbox_ids, dataset_checklist_values, dataset_checklist_ids, export_format):
+    items = selected_curves(
+        data_store,
+        file_checkbox_values,
+        file_checkbox_ids,
+        dataset_checklist_values,
+        dataset_checklist_ids
+    )
+    if not items:
+        return dash.no_update
+
+    # XLSX pro Kurve wäre zu langsam; Kurven gibt es als CSV oder Parquet
+    if export_format != 'parquet' or 'parquet' not in available_formats():
+        export_format = 'csv'
+    token = register_export('curves', items, export_format)
+    return f'/export/{token}'
+
+# Startet den Download im Browser, ohne die Seite zu verlassen
+app.clientside_callback(
+    ClientsideFunction(namespace='sosim', function_name='start_download'),
+    Output('download-started', 'data'),
+    Input('download-url', 'data'),
+    prevent_initial_call=True
+)
 
-    df = format_df_for_download(df, PRECISION_MAP)
-    
-    return dcc.send_data_frame(df.to_csv, 'selected_data.csv', index=False)
+@app.server.route('/export/<token>')
+def serve_export(token):
+    export = pop_export(token)
+    if export is None:
+        abort(404)
+    kind, payload, export_format = export
+    if kind == 'curves':
+        headers = {'Content-Disposition': f'attachment; filename="{CURVE_ARCHIVE_NAME}"'}
+        return Response(stream_with_context(iter_curve_zip(payload, export_format)), mimetype='application/zip', headers=headers)
+
+    rows, columns = payload
+    filename, mimetype = EXPORT_FORMATS[export_format]
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+
+    if export_format == 'xlsx':
+        return Response(write_xlsx(rows, columns), mimetype=mimetype, headers=headers)
+    if export_format == 'parquet':
+        return Response(write_parquet(rows, columns), mimetype=mimetype, headers=headers)
+    return Response(stream_with_context(iter_csv(rows, columns)), mimetype=mimetype, headers=headers)
+
+# Chunk-Upload: erst eine Upload-ID holen, dann jede Datei blockweise als Rohdaten senden
+@app.server.route('/upload', methods=['POST'])
+def upload_start():
+    return jsonify({'upload_id': create_upload()})
+
+@app.server.route('/upload/<upload_id>/<int:index>', methods=['PUT'])
+def upload_chunk(upload_id, index):
+    try:
+        offset = int(request.args.get('offset', 0))
+        size = write_chunk(upload_id, index, offset, request.stream, request.content_length)
+    except (UploadError, ValueError) as exc:
+        return jsonify({'error': str(exc)}), 400
+    return jsonify({'size': size})
+
+# Prometheus-Metriken der Callbacks (nur wenn SOSIM_METRICS=1)
+if METRICS_ENABLED:
+    @app.server.route('/metrics')
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
 
 # Server starten
 if __name__ == '__main__':
@@ -0,0 +1,277 @@
+// Clientseitige Callbacks: reine UI-Zustände (Flip, Presets, Achsenbereich)
+// werden im Browser verarbeitet, ohne Server-Roundtrip. Dazu der Chunk-Upload der Messdateien.
+
+(function () {
+    const noUpdate = () => window.dash_clientside.no_update;
+
+    // Werte der Achsen-Presets (Manuell)
+    const PRESETS = {
+        preset1: [-500, 800, -200, 600],   // Preset-CIGS
+        preset2: [-800, 1500, -400, 800]   // Preset-Tandem
+    };
+
+    // --- Typed Arrays ({dtype, bdata}) wie sie der Server schickt ---
+    const TYPED = {f4: Float32Array, f8: Float64Array, i4: Int32Array, i2: Int16Array, i1: Int8Array};
+
+    function decode(spec) {
+        const binary = atob(spec.bdata);
+        const bytes = new Uint8Array(binary.length);
+        for (let i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        return new TYPED[spec.dtype](bytes.buffer);
+    }
+
+    function encode(values, dtype) {
+        const bytes = new Uint8Array(values.buffer, values.byteOffset, values.byteLength);
+        let binary = '';
+        const chunk = 0x8000;
+        for (let i = 0; i < bytes.length; i += chunk) {
+            binary += String.fromCharCode.apply(null, bytes.subarray(i, i + chunk));
+        }
+        return {dtype: dtype, bdata: btoa(binary)};
+    }
+
+    function negate(values) {
+        if (values && values.bdata !== undefined && TYPED[values.dtype]) {
+            const array = decode(values);
+            for (let i = 0; i < array.length; i++) {
+                array[i] = -array[i];
+            }
+            return encode(array, values.dtype);
+        }
+        if (Array.isArray(values)) {
+            return values.map(v => (v === null ? null : -v));
+        }
+        return values;
+    }
+
+    function toNumber(value) {
+        if (value === null || value === undefined || value === '') {
+            return null;
+        }
+        const number = Number(value);
+        return Number.isFinite(number) ? number : NaN;
+    }
+
+    // Achsenbereiche wie _axis_ranges in graph_processing.py
+    function axisRanges(state, toggle, xMin, xMax, yMin, yMax, xFlip, yFlip) {
+        if (toggle === 'manual') {
+            const values = [xMin, xMax, yMin, yMax].map(toNumber);
+            if (values.some(Number.isNaN)) {
+                return [null, null];
+            }
+            const [x0, x1, y0, y1] = values;
+            return [
+                x0 !== null && x1 !== null ? [x0, x1] : null,
+                y0 !== null && y1 !== null ? [y0, y1] : null
+            ];
+        }
+        const [bx0, bx1, by0, by1] = state.bounds;
+        let [x0, x1] = xFlip ? [-bx1, -bx0] : [bx0, bx1];
+        let [y0, y1] = yFlip ? [-by1, -by0] : [by0, by1];
+        const xMargin = Math.abs((x1 - x0) * 0.15);
+        const yMargin = Math.abs((y1 - y0) * 0.15);
+        return [[x0 - xMargin, x1 + xMargin], [y0 - yMargin, y1 + yMargin]];
+    }
+
+    // --- Chunk-Upload: Dateien roh und blockweise an /upload senden (kein Base64, kein Komplett-Puffer) ---
+    const DEFAULT_CHUNK_BYTES = 8 * 1024 * 1024;
+
+    function showUploadStatus(text, color) {
+        window.dash_clientside.set_props('upload-progress', {
+            children: {namespace: 'dash_html_components', type: 'Div', props: {children: text, style: {color: color || 'black'}}}
+        });
+    }
+
+    async function checkedJson(response) {
+        const body = await response.json().catch(() => ({}));
+        if (!response.ok) {
+            throw new Error(body.error || `HTTP ${response.status}`);
+        }
+        return body;
+    }
+
+    async function uploadFiles(files, chunkBytes) {
+        const {upload_id} = await checkedJson(await fetch('/upload', {method: 'POST'}));
+        const total = files.reduce((sum, file) => sum + file.size, 0) || 1;
+        let sent = 0;
+        for (let index = 0; index < files.length; index++) {
+            const file = files[index];
+            // Auch leere Dateien einmal senden, damit sie auf dem Server existieren
+            let offset = 0;
+            do {
+                const chunk = file.slice(offset, offset + chunkBytes);
+                await checkedJson(await fetch(`/upload/${upload_id}/${index}?offset=${offset}`, {
+                    method: 'PUT',
+                    headers: {'Content-Type': 'application/octet-stream'},
+                    body: chunk
+                }));
+                offset += chunk.size;
+                sent += chunk.size;
+                showUploadStatus(`Übertrage ${file.name} (${Math.round(100 * sent / total)} %)`);
+            } while (offset < file.size);
+        }
+        // Erst jetzt startet der Server das Einlesen (start_upload)
+        window.dash_clientside.set_props('raw-upload', {
+            data: {upload_id: upload_id, names: files.map(file => file.name)}
+        });
+    }
+
+    function startUpload(fileList) {
+        const files = Array.from(fileList || []);
+        if (!files.length) {
+            return;
+        }
+        const area = document.getElementById('upload-area');
+        const chunkBytes = Number(area && area.dataset.chunkBytes) || DEFAULT_CHUNK_BYTES;
+        uploadFiles(files, chunkBytes).catch(error => showUploadStatus(`Upload fehlgeschlagen: ${error.message}`, 'red'));
+    }
+
+    // Das Layout wird von Dash gerendert, daher Ereignisse am document abfangen
+    document.addEventListener('click', event => {
+        if (!event.target.closest('#upload-select-btn')) {
+            return;
+        }
+        const input = document.createElement('input');
+        input.type = 'file';
+        input.multiple = true;
+        input.accept = '.xlsx';
+        input.addEventListener('change', () => startUpload(input.files));
+        input.click();
+    });
+    document.addEventListener('dragover', event => {
+        if (event.target.closest('#upload-area')) {
+            event.preventDefault();
+        }
+    });
+    document.addEventListener('drop', event => {
+        if (event.target.closest('#upload-area')) {
+            event.preventDefault();
+            startUpload(event.dataTransfer.files);
+        }
+    });
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        sosim: {
+            start_download: function (url) {
+                // Vorbereiteten Export über einen temporären Link laden (Datei wird vom Server gestreamt)
+                if (!url) {
+                    return noUpdate();
+                }
+                const link = document.createElement('a');
+                link.href = url;
+                link.download = '';
+                document.body.appendChild(link);
+                link.click();
+                document.body.removeChild(link);
+                return url;
+            },
+
+            toggle_axis_inputs: function (toggle) {
+                if (toggle === 'manual') {
+                    return [false, false, false, false, {display: 'block'}, 'preset1'];
+                }
+                return [true, true, true, true, {display: 'none'}, noUpdate()];
+            },
+
+            update_axis_inputs: function (preset) {
+                return PRESETS[preset] || [noUpdate(), noUpdate(), noUpdate(), noUpdate()];
+            },
+
+            toggle_flip_buttons: function (xClicks, yClicks, xActive, yActive) {
+                const triggered = window.dash_clientside.callback_context.triggered.map(t => t.prop_id);
+                if (triggered.includes('x-flip-btn.n_clicks')) {
+                    xActive = !xActive;
+                }
+                if (triggered.includes('y-flip-btn.n_clicks')) {
+                    yActive = !yActive;
+                }
+                // outline umkehren, damit aktiv = gefüllt, inaktiv = outline
+                return [xActive, !xActive, yActive, !yActive];
+            },
+
+            // Zoom aus relayoutData (geflippte Koordinaten) mit der uirevision der angezeigten Figur merken
+            stamp_zoom: function (relayout, state) {
+                if (!relayout || !state) {
+                    return noUpdate();
+                }
+                let xRange;
+                if ('xaxis.range[0]' in relayout && 'xaxis.range[1]' in relayout) {
+                    xRange = [relayout['xaxis.range[0]'], relayout['xaxis.range[1]']];
+                } else if (Array.isArray(relayout['xaxis.range'])) {
+                    xRange = relayout['xaxis.range'].slice(0, 2);
+                } else if (relayout['xaxis.autorange']) {
+                    xRange = null;
+                } else {
+                    // Kein Zoom der x-Achse (z.B. Legende, Größenänderung)
+                    return noUpdate();
+                }
+                return {x_range: xRange, uirevision: state.uirevision};
+            },
+
+            // Flips und Achsenbereich direkt an der angezeigten Figur anwenden.
+            // Läuft auch nach jeder Antwort des Servers (graph-state): Traces, die der Server mit
+            // einem inzwischen veralteten Flip geschickt hat, werden hier anhand trace.meta nachgezogen.
+            apply_view: function (xFlip, yFlip, toggle, xMin, xMax, yMin, yMax, state, figure) {
+                if (!figure || !state) {
+                    return [noUpdate(), noUpdate(), noUpdate()];
+                }
+                xFlip = Boolean(xFlip);
+                yFlip = Boolean(yFlip);
+
+                let changed = false;
+                const data = (figure.data || []).map(function (trace) {
+                    const meta = trace.meta || {};
+                    const traceX = 'x_flip' in meta ? Boolean(meta.x_flip) : Boolean(state.x_flip);
+                    const traceY = 'y_flip' in meta ? Boolean(meta.y_flip) : Boolean(state.y_flip);
+                    if (traceX === xFlip && traceY === yFlip) {
+                        return trace;
+                    }
+                    changed = true;
+                    const copy = Object.assign({}, trace, {meta: Object.assign({}, meta, {x_flip: xFlip, y_flip: yFlip})});
+                    if (traceX !== xFlip) {
+                        copy.x = negate(trace.x);
+                    }
+                    if (traceY !== yFlip) {
+                        copy.y = negate(trace.y);
+                    }
+                    return copy;
+                });
+
+                const [xRange, yRange] = axisRanges(state, toggle, xMin, xMax, yMin, yMax, xFlip, yFlip);
+                // uirevision entsteht nur hier; der Server reicht sie über graph-state weiter
+                const uirevision = JSON.stringify([toggle, xMin, xMax, yMin, yMax, xFlip, yFlip]);
+                const sameView = uirevision === state.uirevision
+                    && xFlip === Boolean(state.x_flip) && yFlip === Boolean(state.y_flip)
+                    && JSON.stringify(xRange) === JSON.stringify(state.x_range)
+                    && JSON.stringify(yRange) === JSON.stringify(state.y_range);
+                if (!changed && sameView) {
+                    return [noUpdate(), noUpdate(), noUpdate()];
+                }
+
+                // Neuer Ausschnitt (Plotly setzt den Zoom zurück): den Server nur fragen, wenn Kurven
+                // ausgedünnt sind und sich das Fenster tatsächlich ändern kann
+                let zoom = noUpdate();
+                const xWindow = toggle === 'manual' ? xRange : null;
+                if (state.decimated && uirevision !== state.uirevision && (xWindow !== null || state.window !== null)) {
+                    zoom = {x_range: xWindow, uirevision: uirevision};
+                }
+
+                const layout = Object.assign({}, figure.layout, {uirevision: uirevision});
+                layout.xaxis = Object.assign({}, (figure.layout || {}).xaxis, {range: xRange});
+                layout.yaxis = Object.assign({}, (figure.layout || {}).yaxis, {range: yRange});
+
+                // graph-state mitführen, damit der Server beim nächsten Patch vom angezeigten Stand ausgeht
+                const newState = Object.assign({}, state, {
+                    x_flip: xFlip,
+                    y_flip: yFlip,
+                    x_range: xRange,
+                    y_range: yRange,
+                    uirevision: uirevision
+                });
+                return [Object.assign({}, figure, {data: data, layout: layout}), newState, zoom];
+            }
+        }
+    });
+})();
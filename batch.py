@@ -0,0 +1,180 @@
+"""
+Kommandozeilen-Auswertung ohne Web-Oberfläche.
+
+Liest SOSIM-Dateien (Verzeichnisse, Dateien oder Glob-Muster) parallel ein und
+schreibt eine gemeinsame Parameter-Tabelle sowie alle Rohkurven als Parquet oder CSV:
+
+    python batch.py messungen/ "archiv/**/*.xlsx" -o auswertung --format parquet
+
+Importiert weder Dash noch Plotly und läuft daher auch auf Rechnern ohne Browser.
+"""
+import argparse
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from config import INGEST_WORKERS
+from data_processing.export import PARQUET_AVAILABLE, iter_csv, write_parquet
+from data_processing.file_processing import normalize_filename
+from data_processing.ingestion import ingest_file
+from data_processing.parameter_table import TABLE_COLUMNS, label_parameter_table
+
+# Spalten der Parameter-Datei; 'file' und 'dataset' verbinden sie mit der Kurven-Datei
+BATCH_PARAMETER_COLUMNS = ['Datei', 'file', 'dataset'] + TABLE_COLUMNS
+
+
+def find_input_files(inputs, recursive=False):
+    """
+    Löst Verzeichnisse, Dateien und Glob-Muster in eine sortierte, doppelfreie Dateiliste auf.
+
+    :param inputs:    Pfade oder Muster von der Kommandozeile
+    :param recursive: Verzeichnisse inkl. Unterordnern durchsuchen
+    :return:          Liste von .xlsx-Pfaden
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, '**', '*.xlsx') if recursive else os.path.join(item, '*.xlsx')
+            paths.extend(glob.glob(pattern, recursive=recursive))
+        elif os.path.isfile(item):
+            paths.append(item)
+        else:
+            paths.extend(glob.glob(item, recursive=True))
+
+    files = []
+    seen = set()
+    for path in sorted(paths):
+        name = os.path.basename(path)
+        # Temporäre Excel-Sperrdateien (~$...) überspringen
+        if name.startswith('~$') or not name.lower().endswith('.xlsx'):
+            continue
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            files.append(path)
+    return files
+
+
+def process_path(path):
+    # Läuft im Worker-Prozess: Datei dort lesen, damit keine Bytes durch die Pipe müssen
+    with open(path, 'rb') as file:
+        contents = file.read()
+    return ingest_file(contents, os.path.basename(path))
+
+
+def curve_frame(result):
+    """Alle Kennlinien einer Datei im Langformat (eine Zeile pro Messpunkt)."""
+    filename = result['filename']
+    display_fn = normalize_filename(filename)
+    frames = []
+    for idx, curve in enumerate(result['datasets']):
+        frame = curve.to_frame()
+        frame.insert(0, 'dataset', idx)
+        frame.insert(0, 'file', filename)
+        frame.insert(0, 'Datei', f'{display_fn} - Datensatz {idx + 1}')
+        frames.append(frame)
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+
+class CurveWriter:
+    """Schreibt die Kurven Datei für Datei an, ohne alle gleichzeitig im Speicher zu halten."""
+
+    def __init__(self, path, output_format):
+        self.path = path
+        self.output_format = output_format
+        self._writer = None
+        self._header_written = False
+
+    def write(self, frame):
+        if self.output_format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+        else:
+            frame.to_csv(self.path, mode='a' if self._header_written else 'w',
+                         header=not self._header_written, index=False)
+            self._header_written = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def run_batch(files, output_dir, output_format='parquet', workers=INGEST_WORKERS):
+    """
+    Verarbeitet alle Dateien und schreibt parameters.<fmt> und curves.<fmt> nach output_dir.
+
+    :param files:         Liste von .xlsx-Pfaden
+    :param output_dir:    Zielverzeichnis (wird angelegt)
+    :param output_format: 'parquet' oder 'csv'
+    :param workers:       Anzahl Prozesse (<= 1: sequentiell)
+    :return:              Liste von (Dateiname, Fehlermeldung) für nicht lesbare Dateien
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    parameter_path = os.path.join(output_dir, f'parameters.{output_format}')
+    curves = CurveWriter(os.path.join(output_dir, f'curves.{output_format}'), output_format)
+
+    tables = []
+    errors = []
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(files) > 1 else None
+    try:
+        results = executor.map(process_path, files) if executor else map(process_path, files)
+        for path, result in zip(files, results):
+            if result['error']:
+                errors.append((path, result['error']))
+                print(f'Fehler in {path}: {result["error"]}', file=sys.stderr)
+                continue
+            tables.append(label_parameter_table(result['parameter_table'], result['filename']))
+            frame = curve_frame(result)
+            if frame is not None:
+                curves.write(frame)
+            print(f'{path}: {len(result["datasets"])} Datensätze')
+    finally:
+        curves.close()
+        if executor:
+            executor.shutdown()
+
+    if tables:
+        rows = pd.concat(tables, ignore_index=True)
+        if output_format == 'parquet':
+            with open(parameter_path, 'wb') as file:
+                file.write(write_parquet(rows, BATCH_PARAMETER_COLUMNS))
+        else:
+            with open(parameter_path, 'w', encoding='utf-8', newline='') as file:
+                for chunk in iter_csv(rows, BATCH_PARAMETER_COLUMNS):
+                    file.write(chunk)
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='SOSIM-Dateien ohne Web-Oberfläche auswerten.')
+    parser.add_argument('inputs', nargs='+', help='Verzeichnisse, .xlsx-Dateien oder Glob-Muster')
+    parser.add_argument('-o', '--output', default='auswertung', help='Zielverzeichnis (Standard: auswertung)')
+    parser.add_argument('-f', '--format', choices=['parquet', 'csv'], default='parquet', help='Ausgabeformat')
+    parser.add_argument('-w', '--workers', type=int, default=INGEST_WORKERS, help='Anzahl paralleler Prozesse')
+    parser.add_argument('-r', '--recursive', action='store_true', help='Verzeichnisse inkl. Unterordnern durchsuchen')
+    args = parser.parse_args(argv)
+
+    if args.format == 'parquet' and not PARQUET_AVAILABLE:
+        parser.error('Für Parquet wird pyarrow benötigt (oder --format csv verwenden).')
+
+    files = find_input_files(args.inputs, recursive=args.recursive)
+    if not files:
+        parser.error('Keine .xlsx-Dateien gefunden.')
+
+    errors = run_batch(files, args.output, args.format, args.workers)
+    print(f'{len(files) - len(errors)} von {len(files)} Dateien verarbeitet, Ergebnis in {args.output}')
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""
+Benchmark-Suite für die Verarbeitungsschritte der App.
+
+Misst für mehrere Größenordnungen synthetischer Messdateien (benchmarks.synthetic)
+Laufzeit, Durchsatz und Spitzen-Speicher (tracemalloc) der einzelnen Stufen:
+
+- read_input:             Excel-Datei lesen
+- process_file_extern:    Datensätze segmentieren
+- build_parameter_table:  typisierte Parameter + Kennlinienparameter
+- upload_start_poll:      Upload wie im Browser: Blöcke schreiben, start_upload_extern,
+                          poll_upload_extern bis zum Ende (ohne Disk-Cache, ohne Prozess-Pool)
+- update_graph_extern:    erste vollständige Figur aller Datensätze
+- parameter_table_page:   Auswahl, Sortierung und erste Seite der Tabelle
+- export_csv:             CSV-Export aller ausgewählten Parameter
+
+Jeder Lauf wird als JSON unter benchmarks/results/ abgelegt und mit dem
+vorherigen Lauf verglichen, damit Verschlechterungen sofort auffallen:
+
+    python -m benchmarks.run
+    python -m benchmarks.run --scales small,medium --repeat 5
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from dash import no_update
+
+from benchmarks.synthetic import make_workbook
+from config import UPLOAD_CHUNK_BYTES
+from data_processing import ingestion
+from data_processing.data_processing import poll_upload_extern, start_upload_extern
+from data_processing.disk_cache import disk_cache
+from data_processing.export import iter_csv
+from data_processing.figure_cache import figure_cache, trace_cache
+from data_processing.file_processing import process_file_extern
+from data_processing.graph_processing import update_graph_extern
+from data_processing.parameter_table import TABLE_COLUMNS, build_parameter_table, query_parameter_table, select_parameter_rows
+from input_handling.chunked_upload import create_upload, write_chunk
+from input_handling.parser import read_input
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Größenordnungen: (Anzahl Dateien, Datensätze pro Datei, Sweep-Schritte)
+SCALES = {
+    'small': (1, 3, 50),
+    'medium': (1, 10, 400),
+    'large': (1, 40, 2000),
+    'many_files': (20, 10, 400),
+}
+
+# Ab diesem Faktor gegenüber dem vorherigen Lauf gilt eine Stufe als langsamer geworden
+REGRESSION_FACTOR = 1.2
+# Abstand zwischen zwei Abfragen des Upload-Jobs (s); in der App 500 ms (upload-interval)
+POLL_INTERVAL = 0.005
+
+
+def measure(func, repeat):
+    """
+    Führt func repeat-mal für die Zeitmessung und einmal unter tracemalloc aus.
+
+    :return: (beste Laufzeit in s, Spitzen-Speicher in Bytes, Ergebnis des letzten Aufrufs)
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times), peak, result
+
+
+def upload_and_poll(workbooks, names):
+    """
+    Lädt die Dateien wie der Browser blockweise hoch und verarbeitet sie über
+    start_upload_extern und poll_upload_extern, bis der Upload abgeschlossen ist.
+
+    :return: Store nach dem letzten Abholen
+    """
+    upload_id = create_upload()
+    for index, workbook in enumerate(workbooks):
+        for offset in range(0, len(workbook), UPLOAD_CHUNK_BYTES):
+            block = workbook[offset:offset + UPLOAD_CHUNK_BYTES]
+            write_chunk(upload_id, index, offset, io.BytesIO(block), len(block))
+
+    upload_job, disabled, _, _ = start_upload_extern({'upload_id': upload_id, 'names': names}, None, None)
+    store = None
+    while not disabled:
+        time.sleep(POLL_INTERVAL)
+        _, _, store_update, _, _, disabled, _ = poll_upload_extern(False, upload_job, store)
+        if store_update is not no_update:
+            store = store_update
+    return store
+
+
+def run_scale(name, n_files, n_datasets, steps, repeat):
+    """Misst alle Stufen für eine Größenordnung und gibt eine Liste von Ergebnis-Dictionaries zurück."""
+    workbooks = [make_workbook(n_datasets, steps, seed=i) for i in range(n_files)]
+    names = [f'synthetic_{name}_{i}.xlsx' for i in range(n_files)]
+    total_bytes = sum(len(workbook) for workbook in workbooks)
+    total_datasets = n_files * n_datasets
+    total_points = total_datasets * steps
+
+    results = []
+
+    def record(stage, func):
+        seconds, peak, result = measure(func, repeat)
+        results.append({
+            'scale': name,
+            'stage': stage,
+            'files': n_files,
+            'datasets': total_datasets,
+            'points': total_points,
+            'seconds': seconds,
+            'peak_bytes': peak,
+            'datasets_per_s': total_datasets / seconds if seconds else None,
+            'points_per_s': total_points / seconds if seconds else None,
+            'mb_per_s': total_bytes / 1e6 / seconds if seconds else None,
+        })
+        print(f'  {stage:<24} {seconds * 1000:10.1f} ms   {peak / 1e6:8.1f} MB peak')
+        return result
+
+    record('read_input', lambda: [read_input(workbook) for workbook in workbooks])
+    parsed = record('process_file_extern', lambda: [process_file_extern(w, n) for w, n in zip(workbooks, names)])
+    record('build_parameter_table', lambda: [build_parameter_table(params, curves) for curves, params in parsed])
+
+    # Upload wie in der App (Chunk-Upload, Hintergrund-Job, Abholen per Intervall),
+    # ohne Disk-Cache und Prozess-Pool, damit nur die eigene Arbeit gemessen wird
+    store = record('upload_start_poll', lambda: upload_and_poll(workbooks, names))
+
+    ids = [{'type': 'dataset-checklist', 'index': fn} for fn in store['file_names']]
+    file_ids = [{'type': 'file-checkbox', 'index': fn} for fn in store['file_names']]
+    selection = [list(range(store['checkbox_info'][fn]['ds_count'])) for fn in store['file_names']]
+    file_values = [[fn] for fn in store['file_names']]
+
+    record('update_graph_extern', lambda: update_graph_extern(
+        selection, 'auto', None, None, None, None, False, False, store, ids
+    ))
+
+    def table_page():
+        rows = select_parameter_rows(store, file_values, file_ids, selection, ids)
+        return query_parameter_table(rows, '{Isc [mA]} > 20', [{'column_id': 'FF [%] (Kurve)', 'direction': 'desc'}], 0, 50)
+
+    record('parameter_table_page', table_page)
+
+    def export_csv():
+        rows = select_parameter_rows(store, file_values, file_ids, selection, ids)
+        return sum(len(chunk) for chunk in iter_csv(rows, ['Datei'] + TABLE_COLUMNS))
+
+    record('export_csv', export_csv)
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(RESULTS_DIR)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _previous_results(exclude=None):
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, '*.json')))
+    files = [path for path in files if path != exclude]
+    if not files:
+        return None, None
+    with open(files[-1], encoding='utf-8') as file:
+        return files[-1], json.load(file)
+
+
+def compare(current, previous):
+    """Gibt die Laufzeit-Faktoren gegenüber einem früheren Lauf aus und liefert die Regressionen."""
+    before = {(r['scale'], r['stage']): r for r in previous['results']}
+    regressions = []
+    print(f"\nVergleich mit {previous['revision']} ({previous['timestamp']}):")
+    for result in current['results']:
+        old = before.get((result['scale'], result['stage']))
+        if old is None or not old['seconds']:
+            continue
+        factor = result['seconds'] / old['seconds']
+        memory = result['peak_bytes'] / old['peak_bytes'] if old['peak_bytes'] else float('nan')
+        flag = '  <-- langsamer' if factor > REGRESSION_FACTOR else ''
+        print(f"  {result['scale']:<11} {result['stage']:<24} Zeit x{factor:5.2f}   Speicher x{memory:5.2f}{flag}")
+        if factor > REGRESSION_FACTOR:
+            regressions.append((result['scale'], result['stage'], factor))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks der Verarbeitungsschritte ausführen.')
+    parser.add_argument('--scales', default=','.join(SCALES), help=f'Kommagetrennt aus: {", ".join(SCALES)}')
+    parser.add_argument('--repeat', type=int, default=3, help='Wiederholungen pro Stufe (beste Zeit zählt)')
+    parser.add_argument('--baseline', help='Ergebnisdatei, mit der verglichen wird (Standard: letzter Lauf)')
+    parser.add_argument('--no-save', action='store_true', help='Ergebnis nicht unter benchmarks/results/ ablegen')
+    args = parser.parse_args(argv)
+
+    scales = [scale.strip() for scale in args.scales.split(',') if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f'Unbekannte Größenordnung(en): {", ".join(unknown)}')
+
+    # Nur die eigene Arbeit messen: kein Disk-Cache, kein Prozess-Pool, keine wiederverwendeten Figuren
+    disk_cache.max_bytes = 0
+    ingestion.INGEST_WORKERS = 1
+    trace_cache.max_entries = 0
+    figure_cache.max_entries = 0
+
+    current = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.platform(),
+        'results': [],
+    }
+    for scale in scales:
+        n_files, n_datasets, steps = SCALES[scale]
+        print(f'{scale}: {n_files} Datei(en) x {n_datasets} Datensätze x {steps} Schritte')
+        current['results'].extend(run_scale(scale, n_files, n_datasets, steps, args.repeat))
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            previous = json.load(file)
+    else:
+        _, previous = _previous_results()
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{current['timestamp'].replace(':', '-')}_{current['revision']}.json")
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(current, file, indent=2)
+        print(f'\nErgebnis gespeichert: {path}')
+
+    regressions = compare(current, previous) if previous else []
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+Erzeugt realistische, synthetische SOSIM-Arbeitsmappen für Benchmarks.
+
+Aufbau wie die Exporte des Messplatzes (Spalten exakt nach file_processing.header):
+
+- Zeile 1:  Überschrift (header)
+- je Datensatz: eine Parameterzeile (alle 31 Spalten, erster Messpunkt in A-C),
+  danach die übrigen Sweep-Schritte (nur Spannung, Strom, Leistung)
+  und eine leere Trennzeile
+
+    python -m benchmarks.synthetic messung.xlsx --datasets 10 --steps 400
+"""
+import argparse
+import io
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from data_processing.file_processing import header
+
+_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/sharedStrings.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    '</Types>'
+)
+
+
+def _column_letter(index):
+    # 0 -> "A", 27 -> "AB"
+    letters = ''
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters
+
+
+def _diode_curve(rnd, steps, start_mv, end_mv):
+    """Eindiodenmodell mit Serien-/Parallelwiderstand und etwas Messrauschen (mV, mA)."""
+    isc = rnd.uniform(20.0, 40.0)
+    voc = rnd.uniform(550.0, 720.0)
+    n_vt = rnd.uniform(30.0, 45.0)
+    rs = rnd.uniform(0.5, 5.0)
+    rp = rnd.uniform(500.0, 50000.0)
+    voltage = np.linspace(start_mv, end_mv, steps)
+    i0 = isc / np.expm1(voc / n_vt)
+    # Implizite Gleichung I = Isc - I0 (exp((V + I Rs) / nVt) - 1) - (V + I Rs) / Rp gedämpft iterieren
+    current = np.full(steps, isc)
+    for _ in range(40):
+        v_diode = voltage + current * rs
+        neu = isc - i0 * np.expm1(np.minimum(v_diode / n_vt, 50.0)) - v_diode / rp
+        current = 0.5 * current + 0.5 * np.clip(neu, -10 * isc, 2 * isc)
+    current += rnd.gauss(0, 1) * 0.01 * np.sin(np.arange(steps))
+    return voltage, current
+
+
+def _parameter_row(rnd, voltage, current, steps, placeholder_share):
+    power = voltage * current / 1000.0
+    isc = float(np.interp(0.0, voltage, current))
+    voc = float(np.interp(0.0, -current, voltage))
+    mpp = int(np.argmax(np.where(voltage >= 0, power, -np.inf)))
+    pmpp = float(power[mpp])
+    ff = pmpp / (isc * voc / 1000.0) if isc > 0 and voc > 0 else 0.0
+
+    def maybe_placeholder(value):
+        if rnd.random() < placeholder_share:
+            return rnd.choice(['#NV', 'Inf'])
+        return value
+
+    # Die Datei speichert den Strom mit umgekehrtem Vorzeichen (siehe IVCurve.from_raw)
+    return [
+        float(voltage[0]), float(-current[0]), float(-power[0]),
+        maybe_placeholder(isc), maybe_placeholder(voc), float(voltage[mpp]), float(current[mpp]),
+        maybe_placeholder(pmpp), maybe_placeholder(ff), rnd.uniform(0.5, 50.0), rnd.uniform(0.5, 5.0),
+        maybe_placeholder(pmpp / 10.0), isc / 0.5, 10,
+        '', '', '', '', '', '', '',
+        1000, voltage[0] / 1000.0, voltage[-1] / 1000.0, 0.1, steps, 5, 5, 20,
+        'AM1.5G\r\nKlasse AAA', 1000,
+    ]
+
+
+def workbook_rows(n_datasets, steps, seed=0, placeholder_share=0.2):
+    """
+    Zeilen der synthetischen Messdatei als Listen (leere Zellen = '').
+
+    :param n_datasets:        Anzahl der Datensätze (Kennlinien)
+    :param steps:             Sweep-Schritte pro Datensatz
+    :param seed:              Startwert des Zufallsgenerators (reproduzierbar)
+    :param placeholder_share: Anteil der Parameterzellen mit '#NV'/'Inf'
+    """
+    rnd = random.Random(seed)
+    yield list(header)
+    for _ in range(n_datasets):
+        voltage, current = _diode_curve(rnd, steps, -200.0, 800.0)
+        yield _parameter_row(rnd, voltage, current, steps, placeholder_share)
+        power = voltage * current / 1000.0
+        for v, i, p in zip(voltage[1:], current[1:], power[1:]):
+            yield [round(float(v), 3), float(-i), float(-p)]
+        yield []
+
+
+def make_workbook(n_datasets, steps, seed=0, placeholder_share=0.2):
+    """
+    Baut eine .xlsx-Datei (Shared Strings wie bei Excel) komplett im Speicher.
+
+    :return: Bytes der Arbeitsmappe
+    """
+    shared = {}
+    sheet = io.StringIO()
+    sheet.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><worksheet xmlns="{_NS}"><sheetData>')
+    for number, row in enumerate(workbook_rows(n_datasets, steps, seed, placeholder_share), start=1):
+        cells = []
+        for column, value in enumerate(row):
+            if value == '' or value is None:
+                continue
+            address = f'{_column_letter(column)}{number}'
+            if isinstance(value, str):
+                index = shared.setdefault(value, len(shared))
+                cells.append(f'<c r="{address}" t="s"><v>{index}</v></c>')
+            else:
+                if isinstance(value, np.generic):
+                    value = value.item()
+                cells.append(f'<c r="{address}"><v>{value!r}</v></c>')
+        sheet.write(f'<row r="{number}">{"".join(cells)}</row>')
+    sheet.write('</sheetData></worksheet>')
+
+    strings = ''.join(f'<si><t xml:space="preserve">{escape(text)}</t></si>' for text in shared)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        archive.writestr(
+            '_rels/.rels',
+            f'<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="{_PKG_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/></Relationships>'
+        )
+        archive.writestr(
+            'xl/workbook.xml',
+            f'<?xml version="1.0" encoding="UTF-8"?><workbook xmlns="{_NS}" xmlns:r="{_REL_NS}">'
+            f'<sheets><sheet name="IV Measurement" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        )
+        archive.writestr(
+            'xl/_rels/workbook.xml.rels',
+            f'<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="{_PKG_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{_REL_NS}/worksheet" Target="worksheets/sheet1.xml"/>'
+            f'<Relationship Id="rId2" Type="{_REL_NS}/sharedStrings" Target="sharedStrings.xml"/>'
+            f'</Relationships>'
+        )
+        archive.writestr('xl/worksheets/sheet1.xml', sheet.getvalue())
+        archive.writestr(
+            'xl/sharedStrings.xml',
+            f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<sst xmlns="{_NS}" count="{len(shared)}" uniqueCount="{len(shared)}">{strings}</sst>'
+        )
+    return buffer.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Synthetische SOSIM-Arbeitsmappe erzeugen.')
+    parser.add_argument('output', help='Zieldatei (.xlsx)')
+    parser.add_argument('--datasets', type=int, default=10, help='Anzahl Datensätze')
+    parser.add_argument('--steps', type=int, default=400, help='Sweep-Schritte pro Datensatz')
+    parser.add_argument('--seed', type=int, default=0, help='Startwert des Zufallsgenerators')
+    parser.add_argument('--placeholders', type=float, default=0.2, help="Anteil '#NV'/'Inf' in den Parametern")
+    args = parser.parse_args(argv)
+
+    with open(args.output, 'wb') as file:
+        file.write(make_workbook(args.datasets, args.steps, args.seed, args.placeholders))
+
+
+if __name__ == '__main__':
+    main()
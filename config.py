@@ -0,0 +1,50 @@
+import os
+import tempfile
+
+# Zentrale Einstellungen, jeweils über Umgebungsvariablen überschreibbar
+
+# Obergrenze für den serverseitigen Datensatz-Cache (in MB)
+DATASET_CACHE_MAX_BYTES = int(os.environ.get('SOSIM_DATASET_CACHE_MB', '512')) * 1024 * 1024
+
+# Anzahl der Prozesse für das parallele Einlesen (0 = sequentiell im Callback)
+INGEST_WORKERS = int(os.environ.get('SOSIM_INGEST_WORKERS', str(os.cpu_count() or 1)))
+
+# Ab dieser Gesamtpunktzahl im IV-Graph wird WebGL (Scattergl) statt SVG verwendet
+WEBGL_POINT_THRESHOLD = int(os.environ.get('SOSIM_WEBGL_POINTS', '20000'))
+
+# Maximale Punktzahl pro Kurve und Ansicht; gröbere Stufen der Kurvenpyramide werden darunter gewählt
+GRAPH_POINTS_PER_TRACE = int(os.environ.get('SOSIM_GRAPH_POINTS_PER_TRACE', '2000'))
+
+# Zeilen pro Seite in der Parameter-Tabelle (Blättern, Sortieren und Filtern laufen serverseitig)
+PARAMETER_TABLE_PAGE_SIZE = int(os.environ.get('SOSIM_PARAMETER_TABLE_PAGE_SIZE', '50'))
+
+# Verzeichnis des persistenten Einlese-Caches (SQLite, Schlüssel = SHA-256 des Dateiinhalts)
+DISK_CACHE_DIR = os.environ.get('SOSIM_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'sosim-iv-plotter'))
+
+# Obergrenze für den persistenten Cache (in MB, 0 = abgeschaltet); darüber werden alte Einträge gelöscht (LRU)
+DISK_CACHE_MAX_BYTES = int(os.environ.get('SOSIM_DISK_CACHE_MB', '2048')) * 1024 * 1024
+
+# Laufzeit-/Größenmessung aller Dash-Callbacks mit /metrics-Route (1 = an, 0 = aus ohne Mehraufwand)
+METRICS_ENABLED = int(os.environ.get('SOSIM_METRICS', '0')) == 1
+
+# Zielverzeichnis für Chunk-Uploads (Rohdaten, werden nach dem Einlesen gelöscht)
+UPLOAD_DIR = os.environ.get('SOSIM_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'sosim-uploads'))
+
+# Größe eines Upload-Blocks (in MB); der Browser sendet jede Datei in Blöcken dieser Größe
+UPLOAD_CHUNK_BYTES = int(os.environ.get('SOSIM_UPLOAD_CHUNK_MB', '8')) * 1024 * 1024
+
+# Maximale Größe einer einzelnen hochgeladenen Datei (in MB)
+UPLOAD_MAX_FILE_BYTES = int(os.environ.get('SOSIM_UPLOAD_MAX_FILE_MB', '1024')) * 1024 * 1024
+
+# Maximale Anzahl Dateien pro Upload
+UPLOAD_MAX_FILES = int(os.environ.get('SOSIM_UPLOAD_MAX_FILES', '1000'))
+
+# Platz für alle noch nicht eingelesenen Uploads zusammen (in MB)
+UPLOAD_MAX_TOTAL_BYTES = int(os.environ.get('SOSIM_UPLOAD_MAX_TOTAL_MB', '10240')) * 1024 * 1024
+
+# Stützstellen des gemeinsamen Spannungsrasters für Mittelwert- und Differenzkurven
+RESAMPLE_GRID_POINTS = int(os.environ.get('SOSIM_RESAMPLE_POINTS', '500'))
+
+# Anzahl zwischengespeicherter Traces (pro Datensatz, Ansicht und Flip) bzw. kompletter Figuren (0 = aus)
+TRACE_CACHE_ENTRIES = int(os.environ.get('SOSIM_TRACE_CACHE_ENTRIES', '4096'))
+FIGURE_CACHE_ENTRIES = int(os.environ.get('SOSIM_FIGURE_CACHE_ENTRIES', '32'))
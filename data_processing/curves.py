@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# Jede Pyramidenstufe hat etwa ein Viertel der Punkte der vorherigen
+PYRAMID_FACTOR = 4
+# Kurven bis zu dieser Länge werden nicht weiter reduziert
+PYRAMID_MIN_POINTS = 512
+
+
+class IVCurve:
+    """
+    Kompakte Darstellung eines einzelnen Datensatzes (IV-Kennlinie).
+
+    Enthält nur die numerischen Spannungs- und Stromwerte als float64-Arrays
+    sowie einen kleinen Metadaten-Datensatz (Dateiname, Datensatz-Index).
+    Zusätzlich wird eine Auflösungspyramide (levels) aufgebaut: pro Stufe die
+    Indizes der Punkte, die nach Min/Max-Bucketing übrig bleiben.
+    """
+
+    __slots__ = ('voltage', 'current', 'meta', 'levels')
+
+    def __init__(self, voltage, current, meta=None):
+        self.voltage = np.asarray(voltage, dtype=np.float64)
+        self.current = np.asarray(current, dtype=np.float64)
+        self.meta = meta or {}
+        self.levels = build_pyramid(self.voltage, self.current)
+
+    @classmethod
+    def from_raw(cls, spannung, strom, meta=None):
+        """
+        Baut eine Kennlinie aus den Rohzellen der Spalten A/B.
+
+        Nicht-numerische Zellen werden verworfen; der Strom wird wie bisher
+        mit -1 multipliziert.
+        """
+        voltage = pd.to_numeric(pd.Series(spannung, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+        current = pd.to_numeric(pd.Series(strom, dtype=object), errors='coerce').to_numpy(dtype=np.float64) * -1
+        gueltig = ~(np.isnan(voltage) | np.isnan(current))
+        return cls(voltage[gueltig], current[gueltig], meta)
+
+    def __len__(self):
+        return len(self.voltage)
+
+    @property
+    def nbytes(self):
+        return self.voltage.nbytes + self.current.nbytes + sum(level.nbytes for level in self.levels)
+
+    def view_indices(self, x_window=None, max_points=None):
+        """
+        Wählt die Punkte für die aktuelle Ansicht.
+
+        Innerhalb von x_window (Spannungsbereich, unflipped) wird die feinste Stufe
+        genommen, die höchstens max_points Punkte im Fenster hat – bei starkem Zoom
+        also die volle Auflösung. Außerhalb des Fensters genügt die gröbste Stufe.
+
+        :param x_window:   (min, max) des sichtbaren Spannungsbereichs oder None
+        :param max_points: Punktbudget pro Kurve (None = alle Punkte)
+        :return:           sortiertes Index-Array in voltage/current
+        """
+        full = np.arange(len(self.voltage))
+        if max_points is None or len(full) <= max_points:
+            return full
+        stufen = [full] + self.levels
+        if x_window is None:
+            sichtbar = [np.ones(len(stufe), dtype=bool) for stufe in stufen]
+        else:
+            lower, upper = x_window
+            sichtbar = [(self.voltage[stufe] >= lower) & (self.voltage[stufe] <= upper) for stufe in stufen]
+
+        for stufe, maske in zip(stufen, sichtbar):
+            if maske.sum() <= max_points:
+                break
+        # Grobe Stufe außerhalb, gewählte Stufe innerhalb des Fensters
+        return np.union1d(stufen[-1][~sichtbar[-1]], stufe[maske])
+
+    def to_frame(self):
+        """DataFrame mit den Spalten 'Voltage [mV]' und 'Current [mA]' (z.B. für Exporte)."""
+        return pd.DataFrame({'Voltage [mV]': self.voltage, 'Current [mA]': self.current})
+
+
+def build_pyramid(voltage, current):
+    """
+    Baut die Auflösungspyramide einer Kennlinie (Min/Max-Bucketing).
+
+    Jede Stufe behält pro Bucket den Punkt mit minimalem und maximalem Strom;
+    erster und letzter Punkt, der Nulldurchgang des Stroms (Voc) und der Punkt
+    maximaler Leistung (MPP) sind in jeder Stufe enthalten.
+
+    :return: Liste von Index-Arrays (int32), von fein nach grob
+    """
+    n = len(voltage)
+    levels = []
+    if n <= PYRAMID_MIN_POINTS:
+        return levels
+
+    leistung = voltage * current
+    mpp = [int(np.nanargmax(leistung))] if np.isfinite(leistung).any() else []
+    vorzeichen = np.signbit(current)
+    nulldurchgaenge = np.flatnonzero(vorzeichen[1:] != vorzeichen[:-1])
+    wichtige_punkte = np.unique(np.concatenate(([0, n - 1], mpp, nulldurchgaenge, nulldurchgaenge + 1))).astype(np.int64)
+
+    bucket = PYRAMID_FACTOR // 2
+    punkte = n
+    while punkte > PYRAMID_MIN_POINTS and bucket < n:
+        bucket *= PYRAMID_FACTOR
+        levels.append(_minmax_indices(current, bucket, wichtige_punkte))
+        punkte = len(levels[-1])
+    return levels
+
+def _minmax_indices(values, bucket, wichtige_punkte):
+    # Indizes von Minimum und Maximum je Bucket fester Größe, vektorisiert über alle Buckets
+    n = len(values)
+    n_buckets = -(-n // bucket)
+    gepolstert = np.full(n_buckets * bucket, np.nan)
+    gepolstert[:n] = values
+    gepolstert = gepolstert.reshape(n_buckets, bucket)
+    offsets = np.arange(n_buckets) * bucket
+    minima = np.argmin(np.where(np.isnan(gepolstert), np.inf, gepolstert), axis=1) + offsets
+    maxima = np.argmax(np.where(np.isnan(gepolstert), -np.inf, gepolstert), axis=1) + offsets
+    indizes = np.concatenate((minima, maxima, wichtige_punkte))
+    return np.unique(np.minimum(indizes, n - 1)).astype(np.int32)
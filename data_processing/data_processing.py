@@ -1,136 +1,277 @@
-from dash import dcc, html
+import os
+
+from dash import Patch, dcc, html, no_update
 import dash_bootstrap_components as dbc
-import time
 
-from data_processing.file_processing import process_file_extern
+from data_processing.dataset_cache import dataset_cache, expired_files, handle_hash, new_session_id
+from data_processing.figure_cache import invalidate_handle
+from data_processing.ingestion import upload_hashes
+from data_processing.upload_jobs import (
+    STATUS_CANCELLED,
+    STATUS_DONE,
+    STATUS_FAILED,
+    STATUS_PENDING,
+    enqueue_upload,
+    get_queue,
+)
+from input_handling.chunked_upload import UploadError, remove_upload, upload_paths
 
-def update_output_extern(list_of_contents, list_of_names, existing_data):
-    """
-    Verarbeitet neu hochgeladene Dateien sequentiell und vereint sie mit bereits bestehenden Daten.
-    Dabei werden alle Filenamen in existing_data['file_names'] gesammelt, damit sie 
-    beim nächsten Upload-Event nicht verloren gehen. Zudem werden Checkboxes für 
-    alle Dateien neu aufgebaut.
-    
-    :param list_of_contents: Inhalten der neu hochgeladenen Dateien (Base64-Strings)
-    :param list_of_names:    Liste der Dateinamen, die hochgeladen wurden
-    :param existing_data:    Alter Datenbestand aus dem dcc.Store (Dictionary), 
-                             der 'file_names', 'data', 'parameters' und 'checkbox_info'
-                             enthalten kann.
-    :return:                 Tuple aus:
-                             1) HTML-Liste aller Dateinamen (alt + neu),
-                             2) gemergte existing_data,
-                             3) Checkboxes für alle Dateien
-    """
+# Stil der Zeile mit den Datei-/Datensatz-Checkboxes (horizontal scrollbar)
+CHECKBOX_ROW_STYLE = {"overflowX": "auto", "whiteSpace": "nowrap", "display": "flex", "flexWrap": "nowrap"}
 
-    # ------------------
-    # 1) INITIALISIERUNG
-    # ------------------
+def init_store(existing_data):
+    """Legt die Schlüssel des dcc.Store an, falls sie fehlen (neue Session)."""
     if existing_data is None:
         existing_data = {}
 
     # Sichere Schlüssel anlegen
-    if 'data' not in existing_data:
-        existing_data['data'] = {}
-    if 'parameters' not in existing_data:
-        existing_data['parameters'] = {}
+    if 'session_id' not in existing_data:
+        existing_data['session_id'] = new_session_id()
+    if 'handles' not in existing_data:
+        existing_data['handles'] = {}
     if 'file_names' not in existing_data:
         existing_data['file_names'] = []
     if 'checkbox_info' not in existing_data:
         existing_data['checkbox_info'] = {}
+    return existing_data
 
-    # -------------------------------------
-    # 2) FALL: KEINE NEUEN DATEIEN HOCHGELADEN
-    # -------------------------------------
-    if list_of_contents is None or list_of_names is None:
-        checkboxes = []
-        for filename in existing_data['file_names']:
-            ds_count = existing_data['checkbox_info'].get(filename, {}).get('ds_count', 1)
-            dataset_labels = [f'Datensatz {i + 1}' for i in range(ds_count)]
-            dataset_checklist = dcc.Checklist(
-                id={'type': 'dataset-checklist', 'index': filename},
-                options=[{'label': lbl, 'value': i} for i, lbl in enumerate(dataset_labels)],
-                value=list(range(ds_count)),
-                labelStyle={'display': 'block', 'margin-left': '20px'}
-            )
-            file_checkbox = dcc.Checklist(
-                id={'type': 'file-checkbox', 'index': filename},
-                options=[{'label': filename, 'value': filename}],
-                value=[filename],
-                labelStyle={'font-weight': 'bold'}
-            )
-            col = dbc.Col([file_checkbox, dataset_checklist], width="auto")
-            checkboxes.append(col)
-
-        checkbox_row = dbc.Row(
-            checkboxes,
-            justify="start",
-            className="g-0",
-            style={
-                "overflowX": "auto",
-                "whiteSpace": "nowrap",
-                "display": "flex",
-                "flexWrap": "nowrap",
-                "paddingBottom": "20px"
-            }
-        )
-        all_file_names_html = [html.Li(fn) for fn in existing_data['file_names']]
-        return html.Ul(all_file_names_html), existing_data, checkbox_row
-
-    # --------------------------------------------
-    # 3) FALL: ES GIBT NEUE DATEIEN ZU VERARBEITEN
-    # --------------------------------------------
-    # Verarbeite jede Datei sequentiell in einer Queue-Schleife:
-    for contents, filename in zip(list_of_contents, list_of_names):
-        # Datei verarbeiten (DataFrame-Liste + Parameterwerte)
-        df_list, parameter_values_list = process_file_extern(contents, filename)
-
-        # DataFrames in JSON konvertieren, damit sie in dcc.Store speicherbar sind
-        new_data = {filename: [df.to_json(date_format='iso', orient='split') for df in df_list]}
-        new_parameters = {filename: parameter_values_list}
-
-        # Falls diese Datei noch nicht vorhanden ist, einfügen
-        if filename not in existing_data['file_names']:
-            existing_data['file_names'].append(filename)
-        # Speichere die Anzahl der Datensätze
-        existing_data['checkbox_info'][filename] = {'ds_count': len(df_list)}
-
-        # Mergen: Erzeuge neue Dictionaries, um den State zu ändern
-        existing_data['data'] = {**existing_data.get('data', {}), **new_data}
-        existing_data['parameters'] = {**existing_data.get('parameters', {}), **new_parameters}
-        # Optional: Eine kurze Pause, um die sequentielle Verarbeitung zu erzwingen
-        time.sleep(0.1)
-
-    # -------------------------------------
-    # 4) AUFBAU DES LAYOUTS (DATEIEN + CHECKBOXES)
-    # -------------------------------------
-    all_file_names_html = [html.Li(fn) for fn in existing_data['file_names']]
-    checkboxes = []
-    for filename in existing_data['file_names']:
-        ds_count = existing_data['checkbox_info'][filename]['ds_count']
-        dataset_labels = [f'Datensatz {i + 1}' for i in range(ds_count)]
-        dataset_checklist = dcc.Checklist(
-            id={'type': 'dataset-checklist', 'index': filename},
-            options=[{'label': lbl, 'value': i} for i, lbl in enumerate(dataset_labels)],
-            value=list(range(ds_count)),
-            labelStyle={'display': 'block', 'margin-left': '20px'}
-        )
-        file_checkbox = dcc.Checklist(
-            id={'type': 'file-checkbox', 'index': filename},
-            options=[{'label': filename, 'value': filename}],
-            value=[filename],
-            labelStyle={'font-weight': 'bold'}
+
+def plan_upload(list_of_contents, list_of_names, existing_data, pending=None):
+    """
+    Trennt einen Upload in neue/geänderte und bereits bekannte Dateien.
+
+    Bekannt ist eine Datei, wenn ihr Inhalts-Hash schon zu einer Datei dieser
+    Session gehört (auch unter anderem Namen), noch in einem laufenden Upload
+    steckt oder im selben Upload doppelt vorkommt.
+
+    :param pending: Inhalts-Hash -> Dateiname noch nicht übernommener Dateien (optional)
+    :return: Tuple aus (Inhalte, Namen, Hashes der zu verarbeitenden Dateien,
+             Liste von (übersprungene Datei, identische Datei))
+    """
+    hashes = upload_hashes(list_of_contents)
+    known = {}
+    for fn in existing_data['file_names']:
+        handle = existing_data['handles'].get(fn)
+        if dataset_cache.get(handle) is not None:
+            known[handle_hash(handle)] = fn
+    known.update(pending or {})
+
+    skipped_files = []
+    new_contents, new_names, new_hashes = [], [], []
+    for contents, filename, file_hash in zip(list_of_contents, list_of_names, hashes):
+        if file_hash is not None and file_hash in known:
+            skipped_files.append((filename, known[file_hash]))
+            continue
+        if file_hash is not None:
+            # Doppelte Dateien innerhalb desselben Uploads nur einmal verarbeiten
+            known[file_hash] = filename
+        new_contents.append(contents)
+        new_names.append(filename)
+        new_hashes.append(file_hash)
+    return new_contents, new_names, new_hashes, skipped_files
+
+
+def merge_result(existing_data, result):
+    """
+    Übernimmt ein Ergebnis von ingest_file in den Store (Handle + Anzahl Datensätze).
+
+    :return: None bei Erfolg, sonst (Dateiname, Fehlermeldung)
+    """
+    filename = result['filename']
+    if result['error'] is not None:
+        # Defekte Datei überspringen, die übrigen bleiben erhalten
+        return filename, result['error']
+    curves = result['datasets']
+
+    # Kennlinien serverseitig ablegen, im dcc.Store landet nur der Handle
+    old_handle = existing_data['handles'].get(filename)
+    handle = dataset_cache.put(
+        existing_data['session_id'], result['content_hash'], curves, result['parameter_table']
+    )
+
+    # Falls diese Datei noch nicht vorhanden ist, einfügen
+    if filename not in existing_data['file_names']:
+        existing_data['file_names'].append(filename)
+    # Speichere die Anzahl der Datensätze
+    existing_data['checkbox_info'][filename] = {'ds_count': len(curves)}
+
+    # Mergen: Erzeuge ein neues Dictionary, um den State zu ändern
+    existing_data['handles'] = {**existing_data.get('handles', {}), filename: handle}
+    if old_handle is not None and old_handle != handle:
+        # Neuer Inhalt unter bekanntem Namen: zwischengespeicherte Traces/Figuren der alten Version verwerfen
+        invalidate_handle(old_handle)
+    return None
+
+
+def file_checkbox_column(filename, ds_count):
+    """Datei-Checkbox mit den Checkboxes ihrer Datensätze (eine Spalte im Checkbox-Panel)."""
+    dataset_labels = [f'Datensatz {i + 1}' for i in range(ds_count)]
+    dataset_checklist = dcc.Checklist(
+        id={'type': 'dataset-checklist', 'index': filename},
+        options=[{'label': lbl, 'value': i} for i, lbl in enumerate(dataset_labels)],
+        value=list(range(ds_count)),
+        labelStyle={'display': 'block', 'margin-left': '20px'}
+    )
+    file_checkbox = dcc.Checklist(
+        id={'type': 'file-checkbox', 'index': filename},
+        options=[{'label': filename, 'value': filename}],
+        value=[filename],
+        labelStyle={'font-weight': 'bold'}
+    )
+    return dbc.Col([file_checkbox, dataset_checklist], width="auto")
+
+
+def upload_messages(failed_files, skipped_files, cancelled_files=()):
+    """Listeneinträge für fehlerhafte, übersprungene und abgebrochene Dateien eines Uploads."""
+    messages = [
+        html.Li(f'{fn} (Fehler beim Einlesen: {error})', style={'color': 'red'})
+        for fn, error in failed_files
+    ]
+    messages += [
+        html.Li(
+            f'{fn} (übersprungen, unverändert)' if fn == same_as else f'{fn} (übersprungen, identisch mit {same_as})',
+            style={'color': 'grey'}
         )
-        col = dbc.Col([file_checkbox, dataset_checklist], width="auto")
-        checkboxes.append(col)
-
-    checkbox_row = dbc.Row(
-        checkboxes,
-        justify="start",
-        className="g-0",
-        style={"overflowX": "auto", "whiteSpace": "nowrap", "display": "flex", "flexWrap": "nowrap"}
+        for fn, same_as in skipped_files
+    ]
+    messages += [
+        html.Li(f'{fn} (abgebrochen, nicht eingelesen)', style={'color': 'grey'})
+        for fn in cancelled_files
+    ]
+    return messages
+
+
+def expired_messages_extern(data_store):
+    """
+    Hinweis auf Dateien, deren Datensätze aus allen Caches verdrängt wurden.
+
+    Ohne diesen Hinweis würden sie stillschweigend aus Graph, Tabelle, Statistik und Exporten fehlen.
+    """
+    expired = expired_files(data_store)
+    if not expired:
+        return []
+    return html.Ul([
+        html.Li(f'{fn} (abgelaufen, bitte erneut hochladen)', style={'color': 'red'})
+        for fn in expired
+    ])
+
+
+def start_upload_extern(raw_upload, existing_data, upload_job):
+    """
+    Startet die Verarbeitung eines Chunk-Uploads im Hintergrund und kehrt sofort zurück.
+
+    Die Dateien liegen bereits auf der Platte (input_handling.chunked_upload) und
+    werden als Pfade an den Parser übergeben. Läuft noch ein Upload dieser Seite,
+    wird der neue dahinter eingereiht (siehe UploadQueue) und in Upload-Reihenfolge
+    übernommen.
+
+    :param raw_upload: {'upload_id', 'names'} vom Browser nach dem letzten Block
+    :param upload_job: {'queue_id'} der Warteschlange dieser Seite (oder None)
+    :return: Tuple aus (Job-State für dcc.Store, Intervall deaktiviert, Fortschrittsanzeige, Stil des Abbrechen-Buttons)
+    """
+    if not raw_upload or not raw_upload.get('names'):
+        return no_update, no_update, no_update, no_update
+
+    upload_id = raw_upload['upload_id']
+    list_of_names = [os.path.basename(name) for name in raw_upload['names']]
+    try:
+        list_of_paths = upload_paths(upload_id, len(list_of_names))
+    except UploadError as exc:
+        # Ein evtl. laufender Upload wird weiter abgefragt
+        return no_update, no_update, html.Div(str(exc), style={'color': 'red'}), no_update
+
+    queue_id = upload_job.get('queue_id') if upload_job else None
+    queue = get_queue(queue_id)
+    pending = queue.pending_hashes() if queue is not None else None
+    # plan_upload braucht nur die Schlüssel; der eigentliche Store wird beim Abholen ergänzt
+    existing_data = init_store(dict(existing_data or {}))
+    new_paths, new_names, new_hashes, skipped_files = plan_upload(
+        list_of_paths, list_of_names, existing_data, pending
     )
+    queue = enqueue_upload(
+        queue_id, new_paths, new_names, new_hashes, skipped_files, on_done=lambda: remove_upload(upload_id)
+    )
+    names, status = queue.progress()
+    return {'queue_id': queue.queue_id}, False, build_progress(names, len(names), status), {}
+
+
+def poll_upload_extern(cancel_requested, upload_job, existing_data):
+    """
+    Holt die seit dem letzten Intervall fertig gewordenen Dateien ab und übernimmt sie in den Store.
+
+    Dateiliste und Checkbox-Panel werden nicht neu aufgebaut: für neue Dateien
+    wird per Patch nur ein Eintrag bzw. eine Spalte angehängt, eine erneut
+    hochgeladene Datei ersetzt ihre Spalte. Die übrigen Checkboxes behalten so
+    ihre Auswahl, und Datei 301 kostet so viel wie Datei 1.
+
+    :param cancel_requested: True, wenn der Abbrechen-Button ausgelöst hat (bricht alle
+                             eingereihten Uploads ab)
+    :param upload_job:       {'queue_id'} der Warteschlange dieser Seite (oder None)
+    :return: Tuple aus (Patch der Dateiliste, Meldungen des Uploads, Store, Patch der Checkboxes,
+             Fortschrittsanzeige, Intervall deaktiviert, Stil des Abbrechen-Buttons);
+             unveränderte Teile als no_update
+    """
+    queue = get_queue(upload_job['queue_id']) if upload_job else None
+    if queue is None:
+        return no_update, no_update, no_update, no_update, [], True, {'display': 'none'}
+    if cancel_requested:
+        queue.cancel()
+
+    results, names, status, report, done = queue.poll()
+
+    file_list = messages = existing_store = checkbox_row = no_update
+    if results:
+        existing_data = init_store(existing_data)
+        file_list, checkbox_row = Patch(), Patch()
+        for result in results:
+            is_new = result['filename'] not in existing_data['file_names']
+            if merge_result(existing_data, result) is not None:
+                # Fehlerhafte Dateien meldet die Warteschlange
+                continue
+            filename = result['filename']
+            column = file_checkbox_column(filename, existing_data['checkbox_info'][filename]['ds_count'])
+            if is_new:
+                file_list.append(html.Li(filename))
+                checkbox_row.append(column)
+            else:
+                # Geänderter Inhalt unter bekanntem Namen: nur diese Spalte ersetzen
+                checkbox_row[existing_data['file_names'].index(filename)] = column
+        existing_store = existing_data
+    if report is not None:
+        messages = html.Ul(upload_messages(*report)) if any(report) else []
+
+    progress = build_progress(names, len(names), status)
+    if done:
+        return file_list, messages, existing_store, checkbox_row, progress, True, {'display': 'none'}
+    return file_list, messages, existing_store, checkbox_row, progress, False, {}
+
+
+def build_progress(names, total, status):
+    """
+    Fortschrittsbalken und Status pro Datei eines laufenden Uploads.
+
+    :param names:  Dateinamen des Jobs
+    :param total:  Anzahl zu verarbeitender Dateien
+    :param status: Status pro Datei (siehe upload_jobs)
+    """
+    finished = sum(s != STATUS_PENDING for s in status)
+    if total == 0:
+        return []
+    colors = {STATUS_DONE: 'green', STATUS_FAILED: 'red', STATUS_CANCELLED: 'grey'}
+    return [
+        dbc.Progress(
+            value=100 * finished / total,
+            label=f'{finished}/{total} Dateien',
+            striped=finished < total,
+            animated=finished < total,
+            className='mb-2'
+        ),
+        html.Ul(
+            [
+                html.Li(f'{fn}: {s}', style={'color': colors.get(s, 'black')})
+                for fn, s in zip(names, status)
+            ],
+            style={'maxHeight': '10rem', 'overflowY': 'auto'}
+        )
+    ]
 
-    # -------------------------------------
-    # 5) RÜCKGABE
-    # -------------------------------------
-    return html.Ul(all_file_names_html), existing_data, checkbox_row
@@ -0,0 +1,135 @@
+import threading
+import uuid
+from collections import OrderedDict
+
+from config import DATASET_CACHE_MAX_BYTES
+from data_processing.disk_cache import disk_cache
+
+
+def new_session_id():
+    """Erzeugt eine neue, zufällige Session-ID für den dcc.Store."""
+    return uuid.uuid4().hex
+
+
+def make_handle(session_id, content_hash):
+    """Baut den Handle, unter dem eine Datei im Cache abgelegt wird."""
+    return f'{session_id}:{content_hash}'
+
+
+def handle_hash(handle):
+    """Inhalts-Hash aus einem Handle (Gegenstück zu make_handle)."""
+    return handle.split(':', 1)[1] if handle and ':' in handle else None
+
+
+def _entry_size(curves, parameter_table):
+    size = sum(curve.nbytes for curve in curves)
+    if parameter_table is not None:
+        size += int(parameter_table.memory_usage(index=True, deep=True).sum())
+    return size
+
+
+class DatasetCache:
+    """
+    Serverseitiger Speicher für die geparsten Datensätze einer Datei.
+
+    Der dcc.Store im Browser enthält nur noch Handles (Session-ID + Inhalts-Hash);
+    die Kennlinien (IVCurve) und die Parametertabelle bleiben auf dem Server. Überschreitet der
+    Cache max_bytes, werden die am längsten nicht genutzten Einträge verworfen (LRU).
+    Ein verdrängter Eintrag wird beim nächsten Zugriff über den Inhalts-Hash aus dem
+    disk_cache nachgeladen, solange er dort noch liegt.
+    """
+
+    def __init__(self, max_bytes=DATASET_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def put(self, session_id, content_hash, curves, parameter_table=None):
+        """
+        Legt die Datensätze einer Datei ab und gibt den zugehörigen Handle zurück.
+
+        :param session_id:      ID der Browser-Session (aus dem dcc.Store)
+        :param content_hash:    SHA-256 des Dateiinhalts
+        :param curves:          Liste der IVCurve-Objekte aus process_file_extern
+        :param parameter_table: typisierte Parametertabelle (build_parameter_table)
+        :return:                Handle-String für den dcc.Store
+        """
+        handle = make_handle(session_id, content_hash)
+        entry = {
+            'datasets': curves,
+            'parameter_table': parameter_table,
+            'nbytes': _entry_size(curves, parameter_table),
+        }
+        with self._lock:
+            old = self._entries.pop(handle, None)
+            if old is not None:
+                self._size -= old['nbytes']
+            self._entries[handle] = entry
+            self._size += entry['nbytes']
+            self._evict()
+        return handle
+
+    def get(self, handle):
+        """
+        Liefert den Eintrag zu handle.
+
+        Ist er aus dem Speicher verdrängt, wird er aus dem disk_cache nachgeladen.
+
+        :return: Eintrag oder None, falls der Inhalt auch dort nicht (mehr) vorhanden ist
+        """
+        if not handle:
+            return None
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is not None:
+                self._entries.move_to_end(handle)
+                return entry
+        return self._reload(handle)
+
+    def _reload(self, handle):
+        content_hash = handle_hash(handle)
+        cached = disk_cache.get_many([content_hash]).get(content_hash) if content_hash else None
+        if cached is None:
+            return None
+        session_id = handle.split(':', 1)[0]
+        self.put(session_id, content_hash, cached['datasets'], cached['parameter_table'])
+        with self._lock:
+            return self._entries.get(handle)
+
+    @property
+    def nbytes(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self):
+        # Der zuletzt eingefügte Eintrag bleibt immer erhalten, auch wenn er allein zu groß ist
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._size -= entry['nbytes']
+
+
+# Prozessweiter Cache, den alle Callbacks gemeinsam nutzen
+dataset_cache = DatasetCache()
+
+
+def get_datasets(data_store, filename):
+    """Liefert die IVCurve-Liste einer Datei über ihren Handle im dcc.Store."""
+    handle = (data_store or {}).get('handles', {}).get(filename)
+    entry = dataset_cache.get(handle)
+    return entry['datasets'] if entry is not None else []
+
+
+def expired_files(data_store):
+    """
+    Dateien des dcc.Store, deren Datensätze weder im Speicher noch im disk_cache liegen.
+
+    Sie können nicht mehr angezeigt werden und müssen erneut hochgeladen werden.
+    """
+    handles = (data_store or {}).get('handles', {})
+    return [
+        filename for filename in (data_store or {}).get('file_names', [])
+        if dataset_cache.get(handles.get(filename)) is None
+    ]
@@ -0,0 +1,144 @@
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from config import DISK_CACHE_DIR, DISK_CACHE_MAX_BYTES
+
+# Bei Änderungen am Parser/an IVCurve erhöhen, damit alte Einträge nicht mehr verwendet werden
+DISK_CACHE_VERSION = 3
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest (
+    content_hash TEXT PRIMARY KEY,
+    version      INTEGER NOT NULL,
+    payload      BLOB NOT NULL,
+    nbytes       INTEGER NOT NULL,
+    last_access  REAL NOT NULL
+)
+"""
+
+
+class DiskCache:
+    """
+    Persistenter Cache für eingelesene Dateien (SQLite unter directory).
+
+    Schlüssel ist der SHA-256 der hochgeladenen Bytes, Wert die geparsten
+    Datensätze samt Parametertabelle. So muss eine bereits bekannte Datei nach einem
+    Neuladen der Seite oder Neustart des Servers nicht erneut geparst werden.
+    Überschreitet die Datenbank max_bytes, werden die am längsten nicht
+    genutzten Einträge gelöscht (LRU). max_bytes <= 0 schaltet den Cache ab.
+    """
+
+    def __init__(self, directory=DISK_CACHE_DIR, max_bytes=DISK_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.path = os.path.join(directory, 'ingest_cache.sqlite3')
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0 and bool(self.directory)
+
+    def _connect(self):
+        if not self._initialized:
+            os.makedirs(self.directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(_SCHEMA)
+            connection.commit()
+            self._initialized = True
+        return connection
+
+    def get_many(self, content_hashes):
+        """
+        Liest mehrere Einträge in einer Verbindung.
+
+        :param content_hashes: Liste von SHA-256-Hexstrings
+        :return:               {content_hash: {'datasets', 'parameter_table'}} für alle Treffer
+        """
+        wanted = sorted({h for h in content_hashes if h})
+        if not self.enabled or not wanted:
+            return {}
+        found = {}
+        try:
+            with self._lock:
+                connection = self._connect()
+                try:
+                    for start in range(0, len(wanted), 500):
+                        chunk = wanted[start:start + 500]
+                        placeholders = ','.join('?' * len(chunk))
+                        rows = connection.execute(
+                            f'SELECT content_hash, payload FROM ingest '
+                            f'WHERE version = ? AND content_hash IN ({placeholders})',
+                            [DISK_CACHE_VERSION] + chunk
+                        ).fetchall()
+                        for content_hash, payload in rows:
+                            found[content_hash] = pickle.loads(payload)
+                    if found:
+                        now = time.time()
+                        connection.executemany(
+                            'UPDATE ingest SET last_access = ? WHERE content_hash = ?',
+                            [(now, h) for h in found]
+                        )
+                        connection.commit()
+                finally:
+                    connection.close()
+        except (sqlite3.Error, OSError, pickle.UnpicklingError, EOFError, AttributeError) as exc:
+            # Defekter oder veralteter Cache darf den Upload nie verhindern
+            logger.warning('Disk-Cache nicht lesbar (%s: %s), wird ignoriert.', type(exc).__name__, exc)
+            return found
+        return found
+
+    def put_many(self, entries):
+        """
+        Speichert mehrere Einträge und räumt danach bis max_bytes auf.
+
+        :param entries: {content_hash: {'datasets', 'parameter_table'}}
+        """
+        if not self.enabled or not entries:
+            return
+        now = time.time()
+        rows = []
+        for content_hash, entry in entries.items():
+            payload = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+            rows.append((content_hash, DISK_CACHE_VERSION, payload, len(payload), now))
+        try:
+            with self._lock:
+                connection = self._connect()
+                try:
+                    connection.executemany(
+                        'INSERT OR REPLACE INTO ingest (content_hash, version, payload, nbytes, last_access) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        rows
+                    )
+                    self._evict(connection)
+                    connection.commit()
+                finally:
+                    connection.close()
+        except (sqlite3.Error, OSError) as exc:
+            logger.warning('Disk-Cache nicht beschreibbar (%s: %s), wird ignoriert.', type(exc).__name__, exc)
+
+    def _evict(self, connection):
+        # Älteste Einträge löschen, bis die Summe der Payloads unter max_bytes liegt
+        connection.execute('DELETE FROM ingest WHERE version != ?', (DISK_CACHE_VERSION,))
+        total = connection.execute('SELECT COALESCE(SUM(nbytes), 0) FROM ingest').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for content_hash, nbytes in connection.execute('SELECT content_hash, nbytes FROM ingest ORDER BY last_access'):
+            if total <= self.max_bytes:
+                break
+            doomed.append((content_hash,))
+            total -= nbytes
+        connection.executemany('DELETE FROM ingest WHERE content_hash = ?', doomed)
+
+
+# Prozessweiter Disk-Cache
+disk_cache = DiskCache()
@@ -0,0 +1,276 @@
+import io
+import threading
+import uuid
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from data_processing.dataset_cache import get_datasets
+from data_processing.file_processing import normalize_filename
+from data_processing.parameter_table import FLAGGED_COLUMNS, NUMERIC_COLUMNS, PRECISION_MAP, flag_column
+
+try:
+    import pyarrow  # noqa: F401 (nur für DataFrame.to_parquet)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Zeilen pro geschriebenem CSV-Block
+EXPORT_CHUNK_ROWS = 5000
+# Anzahl vorbereiteter, noch nicht abgeholter Exporte
+_MAX_PENDING = 32
+
+EXPORT_FORMATS = {
+    'csv': ('selected_data.csv', 'text/csv'),
+    'xlsx': ('selected_data.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'parquet': ('selected_data.parquet', 'application/vnd.apache.parquet'),
+}
+# Rohkurven werden als ZIP mit einer Datei pro Datensatz ausgeliefert
+CURVE_ARCHIVE_NAME = 'selected_curves.zip'
+
+
+def available_formats():
+    return [fmt for fmt in EXPORT_FORMATS if fmt != 'parquet' or PARQUET_AVAILABLE]
+
+
+def format_fixed(values, precision):
+    """
+    Formatiert eine float64-Spalte spaltenweise mit fester Nachkommastellenzahl.
+
+    :param values:    float64-Array (NaN für Platzhalter)
+    :param precision: Nachkommastellen
+    :return:          Objekt-Array mit Strings, None an den NaN-Stellen
+    """
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), None, dtype=object)
+    valid = ~np.isnan(values)
+    if valid.any():
+        # Runden wie bisher über Python-Formatierung, aber für die ganze Spalte auf einmal
+        result[valid] = np.char.mod(f'%.{precision}f', values[valid]).astype(object)
+    return result
+
+
+def format_for_download(rows, columns):
+    """
+    Text-Darstellung der ausgewählten Spalten: Zahlenspalten mit fester Präzision
+    aus PRECISION_MAP, Platzhalter ('Inf', '#NV', ...) bleiben unverändert erhalten.
+
+    :param rows:    typisierte Parameterzeilen (select_parameter_rows)
+    :param columns: gewünschte Spalten in Ausgabereihenfolge
+    :return:        DataFrame nur mit den gewünschten Spalten
+    """
+    out = {}
+    for column in columns:
+        if column in NUMERIC_COLUMNS:
+            formatted = format_fixed(rows[column].to_numpy(), PRECISION_MAP[column])
+            if column in FLAGGED_COLUMNS:
+                placeholders = rows[flag_column(column)].to_numpy(dtype=object)
+                formatted = np.where(pd.isna(formatted), placeholders, formatted)
+            out[column] = formatted
+        else:
+            out[column] = rows[column].to_numpy(dtype=object)
+    return pd.DataFrame(out, columns=columns)
+
+
+def iter_csv(rows, columns, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Erzeugt die CSV blockweise, damit nie die ganze Datei im Speicher liegt."""
+    yield pd.DataFrame(columns=columns).to_csv(index=False)
+    for start in range(0, len(rows), chunk_rows):
+        chunk = format_for_download(rows.iloc[start:start + chunk_rows], columns)
+        yield chunk.to_csv(index=False, header=False)
+
+
+def write_xlsx(rows, columns):
+    """
+    XLSX im write-only-Modus von openpyxl: Zahlen bleiben Zahlen (mit Zahlenformat
+    nach PRECISION_MAP), Platzhalter werden als Text geschrieben.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Parameter')
+    sheet.append(columns)
+
+    number_formats = {
+        column: '0' if PRECISION_MAP[column] == 0 else '0.' + '0' * PRECISION_MAP[column]
+        for column in columns if column in NUMERIC_COLUMNS
+    }
+    values = {}
+    for column in columns:
+        if column in NUMERIC_COLUMNS:
+            numbers = rows[column].to_numpy(dtype=object)
+            if column in FLAGGED_COLUMNS:
+                placeholders = rows[flag_column(column)].to_numpy(dtype=object)
+                numbers = np.where(pd.isna(rows[column].to_numpy()), placeholders, numbers)
+            values[column] = numbers
+        else:
+            values[column] = rows[column].to_numpy(dtype=object)
+
+    for i in range(len(rows)):
+        row = []
+        for column in columns:
+            value = values[column][i]
+            if value is None or (isinstance(value, float) and np.isnan(value)):
+                value = None
+            if column in number_formats and isinstance(value, float):
+                cell = WriteOnlyCell(sheet, value=value)
+                cell.number_format = number_formats[column]
+                row.append(cell)
+            else:
+                row.append(value)
+        sheet.append(row)
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def write_parquet(rows, columns):
+    """Parquet mit typisierten Spalten; zu jeder Zahlenspalte gehört die Platzhalterspalte '<Spalte> [flag]'."""
+    export_columns = []
+    for column in columns:
+        export_columns.append(column)
+        if column in FLAGGED_COLUMNS:
+            export_columns.append(flag_column(column))
+    table = rows[export_columns].reset_index(drop=True)
+    # Gemischte Objekt-Spalten (Zahl/Text) für Parquet einheitlich als Text ablegen
+    for column in table.columns:
+        if table[column].dtype == object:
+            table[column] = table[column].map(lambda v: None if v is None or v != v else str(v))
+    buffer = io.BytesIO()
+    table.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def selected_curves(data_store, file_checkbox_values, file_checkbox_ids, dataset_checklist_values, dataset_checklist_ids):
+    """
+    Kennlinien der aktiven Dateien/Datensätze in Datei-Reihenfolge.
+
+    Ist für eine aktive Datei keine Datensatz-Checkliste vorhanden, werden alle
+    ihre Datensätze exportiert (wie bei der Parameter-Tabelle).
+    Ergeben zwei Dateien denselben Anzeigenamen (z.B. 'a.xlsx' und
+    'IV Measurement_a.xlsx'), bekommt die spätere den Dateinamen dazu, damit
+    sich die Einträge im Archiv nicht gegenseitig überschreiben.
+
+    :return: Liste aus (Name im Archiv ohne Endung, IVCurve)
+    """
+    active_files = {
+        comp_id.get('index')
+        for val, comp_id in zip(file_checkbox_values, file_checkbox_ids)
+        if val
+    }
+    active_datasets = {
+        comp_id.get('index'): val or []
+        for val, comp_id in zip(dataset_checklist_values, dataset_checklist_ids)
+    }
+
+    items = []
+    used_names = set()
+    for filename in (data_store or {}).get('file_names', []):
+        if filename not in active_files:
+            continue
+        curves = get_datasets(data_store, filename)
+        indices = active_datasets.get(filename, range(len(curves)))
+        display_fn = _unique_name(normalize_filename(filename), filename, used_names)
+        for idx in sorted(i for i in indices if 0 <= i < len(curves)):
+            items.append((f'{display_fn}/{display_fn} - Datensatz {idx + 1}', curves[idx]))
+    return items
+
+
+class _ZipStream(io.RawIOBase):
+    """Nicht-seekbares Schreibziel für zipfile; gesammelte Bytes werden mit drain() abgeholt."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _curve_bytes(curve, fmt):
+    frame = curve.to_frame()
+    if fmt == 'parquet':
+        buffer = io.BytesIO()
+        frame.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    return frame.to_csv(index=False).encode('utf-8')
+
+
+def _unique_name(display_fn, filename, used_names):
+    # Anzeigename, bei Kollision mit dem Dateinamen bzw. einer laufenden Nummer ergänzt
+    # (ohne Groß-/Kleinschreibung verglichen, Windows-Entpacker unterscheiden sie nicht)
+    name = display_fn
+    if name.casefold() in used_names:
+        name = f'{display_fn} ({filename})'
+    counter = 2
+    while name.casefold() in used_names:
+        name = f'{display_fn} ({filename}) {counter}'
+        counter += 1
+    used_names.add(name.casefold())
+    return name
+
+
+def iter_curve_zip(items, fmt):
+    """
+    Schreibt die Kennlinien nacheinander in ein ZIP und gibt es stückweise aus.
+
+    Pro Datensatz wird nur dessen Datei im Speicher gehalten; das Archiv selbst
+    entsteht direkt im Antwort-Stream (zipfile schreibt bei nicht-seekbaren
+    Zielen Data-Descriptoren statt nachträglich den Header zu ändern).
+
+    :param items: Ergebnis von selected_curves
+    :param fmt:   'csv' oder 'parquet'
+    """
+    extension = 'parquet' if fmt == 'parquet' else 'csv'
+    stream = _ZipStream()
+    if extension == 'parquet':
+        # Parquet ist bereits komprimiert
+        options = {'compression': zipfile.ZIP_STORED}
+    else:
+        # CSV mit schneller Deflate-Stufe packen
+        options = {'compression': zipfile.ZIP_DEFLATED, 'compresslevel': 1}
+    with zipfile.ZipFile(stream, 'w', **options) as archive:
+        for name, curve in items:
+            archive.writestr(f'{name}.{extension}', _curve_bytes(curve, extension))
+            yield stream.drain()
+    yield stream.drain()
+
+
+_pending = OrderedDict()
+_pending_lock = threading.Lock()
+
+
+def register_export(kind, payload, fmt):
+    """
+    Legt einen vorbereiteten Export ab und liefert das Token für die Download-Route.
+
+    :param kind:    'parameters' (payload = (Zeilen, Spalten)) oder 'curves' (payload = selected_curves)
+    :param payload: Daten für den Export
+    :param fmt:     Ausgabeformat
+    :return:        Token (str)
+    """
+    token = uuid.uuid4().hex
+    with _pending_lock:
+        _pending[token] = (kind, payload, fmt)
+        while len(_pending) > _MAX_PENDING:
+            _pending.popitem(last=False)
+    return token
+
+
+def pop_export(token):
+    # Jeder Export kann genau einmal abgeholt werden
+    with _pending_lock:
+        return _pending.pop(token, None)
@@ -0,0 +1,72 @@
+import threading
+from collections import OrderedDict
+
+from config import FIGURE_CACHE_ENTRIES, TRACE_CACHE_ENTRIES
+
+# Alle Caches dieses Moduls, für die Ausgabe unter /metrics
+CACHES = []
+
+
+class LRUCache:
+    """
+    Begrenzter LRU-Cache mit Treffer-Statistik (threadsicher).
+
+    Die Schlüssel enthalten die Handles der Datensätze (Session-ID + Inhalts-Hash).
+    Ändert sich der Inhalt einer Datei, ändert sich ihr Handle; alte Einträge
+    werden dann nicht mehr getroffen und fallen nach LRU heraus.
+    """
+
+    def __init__(self, name, max_entries):
+        self.name = name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        CACHES.append(self)
+
+    def get(self, key):
+        """Wert zu key oder None; zählt Treffer und Fehlschläge."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return value
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, handle):
+        """Entfernt alle Einträge, deren Schlüssel handle enthält (z.B. nach Verdrängung aus dem dataset_cache)."""
+        with self._lock:
+            for key in [key for key in self._entries if handle in str(key)]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+# Fertige Trace-Dictionaries pro Datensatz (Auflösung, Flips, Trace-Typ)
+trace_cache = LRUCache('trace', TRACE_CACHE_ENTRIES)
+# Komplette Figuren und interpolierte Mittelwert-/Differenzansichten pro Auswahl
+figure_cache = LRUCache('figure', FIGURE_CACHE_ENTRIES)
+
+
+def invalidate_handle(handle):
+    """Verwirft Traces und Figuren einer Datei, deren Inhalt ersetzt wurde."""
+    for cache in CACHES:
+        cache.invalidate(handle)
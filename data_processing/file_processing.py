@@ -1,5 +1,6 @@
-import pandas as pd
+import numpy as np
 from input_handling.parser import read_input
+from data_processing.curves import IVCurve
 
 
 # Header-Definition
@@ -39,60 +40,63 @@ header = [
 
 
 def process_file_extern(contents, filename):
-    alle_zeilen = read_input(contents)
+    blatt = read_input(contents)
 
-    alle_zeilen = [
-        [cell.replace('\r\n', '\n').replace('\r', '\n') if isinstance(cell, str) else cell for cell in row]
-        for row in alle_zeilen
-    ]
     # Überprüfen, ob genügend Zeilen vorhanden sind
-    if len(alle_zeilen) < 2:
+    if len(blatt) < 2:
         parameter_values_list = None
+        offset = 0
     else:
-        parameter_values_list = []
-        # Annahme: Erste Zeile ist der Header
-        i = 1
-        # Solange die Zeile als Parameterzeile interpretiert werden kann, hinzufügen.
-        # Hier muss definiert werden, wann eine Zeile als Parameterzeile gilt.
-        while i < len(alle_zeilen):
-            if is_parameter_row(alle_zeilen[i]):
-                parameter_values_list.append(alle_zeilen[i])
-            i += 1
+        # Annahme: Erste Zeile ist der Header.
+        # Alle folgenden Zeilen mit mindestens 10 gefüllten Zellen gelten als Parameterzeile.
+        parameter_idx = np.flatnonzero(blatt.zellen_belegt[1:] >= 10) + 1
+        parameter_values_list = [_normalize_row(blatt.parameter_rows[i]) for i in parameter_idx]
         # Die verbleibenden Zeilen enthalten dann die eigentlichen Daten
-        alle_zeilen = alle_zeilen[2:]
-
+        offset = 2
 
     # Schritt 2: Verarbeitung der Datenabschnitte
-    df_list = []
-    i = 0
-    while i < len(alle_zeilen):
-        # Überspringe leere Zeilen
-        while i < len(alle_zeilen) and all(zelle == '' or zelle is None for zelle in alle_zeilen[i][:10]):
-            i += 1
-        if i >= len(alle_zeilen):
-            break  # Ende der Daten erreicht
-        daten_zeilen = []
-        while i < len(alle_zeilen) and not all(zelle == '' or zelle is None for zelle in alle_zeilen[i][:10]):
-            if i + 1 < len(alle_zeilen):
-                non_empty_cells_in_next_row = sum(
-                    1 for zelle in alle_zeilen[i + 1][:20] if zelle != '' and zelle is not None
-                )
-                if non_empty_cells_in_next_row > 8:
-                    i += 1
-                    break
-            daten_zeilen.append(alle_zeilen[i])
-            i += 1
-        if len(daten_zeilen) < 2:
-            continue  # Überspringe Abschnitte mit nicht genügend Daten
-        daten = daten_zeilen[1:]  # Ignoriere die erste Zeile (Überschrift)
-        df = pd.DataFrame(daten, columns=header)
-        df['Voltage [mV]'] = pd.to_numeric(df['Voltage [mV]'], errors='coerce') 
-        df['Current [mA]'] = pd.to_numeric(df['Current [mA]'], errors='coerce') * -1
-        df = df.dropna(subset=['Voltage [mV]', 'Current [mA]'])
-        df_list.append(df)
+    curves = []
+    for start, stop in find_dataset_blocks(blatt.nicht_leer[offset:]):
+        # Ignoriere die erste Zeile (Überschrift)
+        daten = slice(offset + start + 1, offset + stop)
+        meta = {'filename': filename, 'index': len(curves)}
+        curves.append(IVCurve.from_raw(blatt.spannung[daten], blatt.strom[daten], meta))
     
-    return df_list, parameter_values_list
+    return curves, parameter_values_list
+
+def find_dataset_blocks(nicht_leer):
+    """
+    Findet die Datenabschnitte anhand der Leer-Maske der Datenzeilen.
+
+    Ein Abschnitt ist eine zusammenhängende Folge von Zeilen, deren erste 10 Zellen
+    nicht alle leer sind und deren Folgezeile höchstens 8 gefüllte Zellen unter den
+    ersten 20 hat (sonst beginnt dort ein neuer Abschnitt und die aktuelle Zeile
+    entfällt). Abschnitte mit weniger als 2 Zeilen werden verworfen.
+
+    :param nicht_leer: Bool-Array (Zeilen x 20), True für gefüllte Zellen
+    :return:           Liste von (start, stop)-Zeilenbereichen inkl. Überschriftszeile
+    """
+    if len(nicht_leer) == 0:
+        return []
+    zeile_belegt = nicht_leer[:, :10].any(axis=1)
+    zeile_dicht = nicht_leer[:, :20].sum(axis=1) > 8
+    naechste_dicht = np.append(zeile_dicht[1:], False)
+    im_abschnitt = zeile_belegt & ~naechste_dicht
+
+    kanten = np.diff(np.concatenate(([0], im_abschnitt.astype(np.int8), [0])))
+    starts = np.flatnonzero(kanten == 1)
+    stops = np.flatnonzero(kanten == -1)
+    return [(int(a), int(b)) for a, b in zip(starts, stops) if b - a >= 2]
+
+def _normalize_row(row):
+    # Zeilenumbrüche in Strings vereinheitlichen ('\r\n' bzw. '\r' -> '\n')
+    return [cell.replace('\r\n', '\n').replace('\r', '\n') if isinstance(cell, str) else cell for cell in row]
+
+def normalize_filename(name: str) -> str:
+    # "IV Measurement" löschen
+    name = name.replace("IV Measurement", "")
+
+    # ".xlsx" am Ende entfernen
+    name = name.replace(".xlsx", "")
 
-def is_parameter_row(row):
-    count = sum(1 for cell in row if cell is not None and cell != '')
-    return count >= 10
+    return name.strip("_ ")
@@ -1,49 +1,336 @@
+import base64
+
+import numpy as np
 import plotly.graph_objects as go
-import pandas as pd
-import io
+from dash import Patch, no_update
+from plotly.colors import DEFAULT_PLOTLY_COLORS
+
+from config import GRAPH_POINTS_PER_TRACE, WEBGL_POINT_THRESHOLD
+from data_processing.dataset_cache import get_datasets
+from data_processing.figure_cache import figure_cache, trace_cache
+from data_processing.file_processing import normalize_filename
+from data_processing.resampling import group_mean_std, resample_curves, voltage_grid
+
+# uirevision der ersten Figur, bevor apply_view die eigentliche setzt
+INITIAL_REVISION = 'initial'
+
+def typed_array(values, dtype='f4'):
+    """
+    Kodiert ein Array als Plotly-Typed-Array ({'dtype', 'bdata'}).
+
+    Die Koordinaten gehen so als Base64-Binärdaten statt als JSON-Zahlenliste
+    an den Browser; float32 reicht für die Darstellung und halbiert die Größe.
+    """
+    array = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('<'))
+    return {'dtype': dtype, 'bdata': base64.b64encode(array.tobytes()).decode('ascii')}
+
+def update_graph_extern(selected_datasets_per_file, axis_range_toggle, x_min_input, x_max_input, y_min_input, y_max_input, x_flip_btn, y_flip_btn, data_store, ids, zoom=None, graph_state=None, graph_mode='raw', reference=None):
+    """
+    Aktualisiert den IV-Graphen.
+
+    Beim ersten Aufruf (bzw. wenn sich der Trace-Typ ändert) wird eine komplette
+    Figur gebaut. Danach wird mit graph_state (was aktuell im Browser angezeigt
+    wird) verglichen und nur die Änderung als Dash-Patch geschickt: neue Traces
+    anhängen, abgewählte löschen, bei Zoom nur die betroffenen Koordinaten
+    und bei Achsenänderungen nur das Layout.
 
-def update_graph_extern(selected_datasets_per_file, axis_range_toggle, x_min_input, x_max_input, y_min_input, y_max_input, x_flip_btn, y_flip_btn, data_store, ids):
-    # Erstelle eine leere Figur mit go.Figure
-    fig = go.Figure()
-    
-    if not data_store or 'data' not in data_store:
-        return fig  # Leere Grafik zurückgeben
+    In den Modi 'mean' (Mittelwert ± Standardabweichung pro Datei) und 'delta'
+    (Differenz zur Referenzkurve) werden die Kurven zuvor auf ein gemeinsames
+    Spannungsraster interpoliert (siehe resampling_figure).
 
-    all_x_values = []
-    all_y_values = []
+    Flips setzt der Browser selbst um (apply_view). Die Vorzeichen gesendeter
+    Koordinaten folgen dem Flip-State beim Aufruf und stehen zusätzlich in
+    trace.meta; wurde währenddessen geflippt, gleicht apply_view das danach an.
 
+    :param zoom:       letzter Zoom des Benutzers aus dem graph-zoom-Store ({'x_range', 'uirevision'})
+    :param graph_mode: 'raw', 'mean' oder 'delta'
+    :param reference:  trace_key der Referenzkurve für 'delta' (None = erste ausgewählte Kurve)
+    :return: Tuple aus (Figur, Patch oder no_update), dem neuen graph_state und den
+             Optionen der Referenzauswahl (no_update, wenn sich die Auswahl nicht geändert hat)
+    """
+    if not data_store or 'handles' not in data_store:
+        return go.Figure(), None, []  # Leere Grafik zurückgeben
+
+    # Sichtbarer Spannungsbereich bestimmt, welche Pyramidenstufe gesendet wird
+    uirevision = current_revision(graph_state)
+    x_window = visible_x_window(zoom, uirevision, axis_range_toggle, x_min_input, x_max_input, x_flip_btn)
+
+    selected_curves = {}
     for selected_datasets, id_dict in zip(selected_datasets_per_file, ids):
         filename = id_dict['index']
-        df_json_list = data_store['data'].get(filename, [])
+        handle = data_store['handles'].get(filename)
+        curves = get_datasets(data_store, filename)
         for idx in selected_datasets:
-            df_json = df_json_list[idx]
-            df = pd.read_json(io.StringIO(df_json), orient='split')
-            label = f'{filename} - Datensatz {idx + 1}'
-
-
-            # Bereite die x- und y-Werte vor und flippe sie ggf.
-            x_vals = df['Voltage [mV]']
-            y_vals = df['Current [mA]']
-
-            if x_flip_btn:      # hier deine Variable aus dem Callback
-                x_vals = -1 * x_vals
-            if y_flip_btn:      # hier deine Variable aus dem Callback
-                y_vals = -1 * y_vals
-
-            # Sammle alle x- und y-Werte für die Achsenskalierung
-            all_x_values.extend(x_vals.tolist())
-            all_y_values.extend(y_vals.tolist())
-
-            # Füge die (ggf. geflippten) Daten dem Graphen hinzu
-            fig.add_trace(
-                go.Scatter(
-                    x=x_vals,
-                    y=y_vals,
-                    mode='lines',
-                    name=label
-                )
-            )
-    
+            if idx >= len(curves):
+                continue  # Handle wurde aus dem Cache verdrängt
+            selected_curves[trace_key(handle, idx)] = (filename, idx, curves[idx])
+
+    # Referenzauswahl nur neu senden, wenn sich die ausgewählten Kurven geändert haben
+    if graph_state and set(graph_state.get('traces', [])) == set(selected_curves):
+        options = no_update
+    else:
+        options = [
+            {'label': f'{normalize_filename(filename)} - Datensatz {idx + 1}', 'value': key}
+            for key, (filename, idx, _) in selected_curves.items()
+        ]
+
+    if graph_mode in ('mean', 'delta') and selected_curves:
+        figure, new_state = resampling_figure(
+            selected_curves, graph_mode, reference, axis_range_toggle, x_min_input, x_max_input,
+            y_min_input, y_max_input, x_flip_btn, y_flip_btn, graph_state
+        )
+        return figure, new_state, options
+
+    views = {
+        key: curve.view_indices(x_window, GRAPH_POINTS_PER_TRACE)
+        for key, (_, _, curve) in selected_curves.items()
+    }
+
+    # Viele Punkte: WebGL statt SVG rendern
+    total_points = sum(len(view) for view in views.values())
+    trace_type = 'scattergl' if total_points > WEBGL_POINT_THRESHOLD else 'scatter'
+
+    # Datenbereich (ungeflippt, inkl. 0) – daraus berechnet auch der Browser den Auto-Bereich
+    curves = [curve for _, _, curve in selected_curves.values()]
+    bounds = [*_value_range(curve.voltage for curve in curves), *_value_range(curve.current for curve in curves)]
+    x_range, y_range = _axis_ranges(bounds, axis_range_toggle, x_min_input, x_max_input, y_min_input, y_max_input, x_flip_btn, y_flip_btn)
+
+    new_state = {
+        'traces': list(selected_curves),
+        'trace_type': trace_type,
+        'x_flip': bool(x_flip_btn),
+        'y_flip': bool(y_flip_btn),
+        'window': list(x_window) if x_window is not None else None,
+        'bounds': bounds,
+        'x_range': x_range,
+        'y_range': y_range,
+        # Zoom des Benutzers bleibt erhalten, solange sich Achseneinstellungen und Flips nicht ändern
+        # (die uirevision setzt apply_view, hier wird sie nur weitergereicht)
+        'uirevision': uirevision,
+        # Nur dann hängt die gesendete Auflösung vom Ausschnitt ab (sonst braucht apply_view den Server nicht)
+        'decimated': any(len(curve.voltage) > GRAPH_POINTS_PER_TRACE for curve in curves),
+    }
+
+    def build_trace(key):
+        # Fertige Traces werden pro Datensatz, Ausschnitt, Trace-Typ und Flip wiederverwendet
+        filename, idx, curve = selected_curves[key]
+        label = f'{normalize_filename(filename)} - Datensatz {idx + 1}'
+        cache_key = (key, label, x_window, trace_type, bool(x_flip_btn), bool(y_flip_btn))
+        trace = trace_cache.get(cache_key)
+        if trace is None:
+            trace = trace_cache.put(cache_key, make_trace(curve, views[key], label, trace_type, x_flip_btn, y_flip_btn))
+        return trace
+
+    if not graph_state or graph_state.get('trace_type') != trace_type:
+        # Komplette Figur aufbauen (oder eine identische Ansicht von vorhin wiederverwenden)
+        figure_key = ('raw', tuple(new_state['traces']), trace_type, x_window, new_state['x_flip'], new_state['y_flip'],
+                      _as_tuple(x_range), _as_tuple(y_range), new_state['uirevision'])
+        fig = figure_cache.get(figure_key)
+        if fig is None:
+            fig = go.Figure(data=[build_trace(key) for key in new_state['traces']])
+            fig.update_layout(_base_layout(new_state))
+            figure_cache.put(figure_key, fig)
+        return fig, new_state, options
+
+    # -------------------------------------
+    # Nur die Änderungen als Patch schicken
+    # -------------------------------------
+    patch = Patch()
+    changed = False
+    old_traces = graph_state.get('traces', [])
+
+    # Abgewählte Traces von hinten nach vorne löschen, damit die Positionen stimmen
+    for position in reversed(range(len(old_traces))):
+        if old_traces[position] not in selected_curves:
+            del patch['data'][position]
+            changed = True
+    remaining = [key for key in old_traces if key in selected_curves]
+
+    # Neuer Zoombereich: nur die Koordinaten der Kurven ersetzen, deren Auswahl an Punkten sich ändert
+    # (Flips nicht: die hat der Browser bereits an den angezeigten Daten umgesetzt)
+    old_window = graph_state.get('window')
+    for position, key in enumerate(remaining):
+        new_view = old_window != new_state['window'] and not np.array_equal(
+            selected_curves[key][2].view_indices(old_window, GRAPH_POINTS_PER_TRACE), views[key]
+        )
+        if not new_view:
+            continue
+        trace = build_trace(key)
+        patch['data'][position]['x'] = trace['x']
+        patch['data'][position]['y'] = trace['y']
+        patch['data'][position]['meta'] = trace['meta']
+        changed = True
+
+    # Neu ausgewählte Traces anhängen
+    remaining_set = set(remaining)
+    added = [key for key in new_state['traces'] if key not in remaining_set]
+    for key in added:
+        patch['data'].append(build_trace(key))
+        changed = True
+    new_state['traces'] = remaining + added
+
+    # Achsenbereiche
+    if graph_state.get('x_range') != x_range:
+        patch['layout']['xaxis']['range'] = x_range
+        changed = True
+    if graph_state.get('y_range') != y_range:
+        patch['layout']['yaxis']['range'] = y_range
+        changed = True
+
+    return (patch if changed else no_update), new_state, options
+
+def trace_key(handle, idx):
+    """Eindeutiger Schlüssel eines Datensatzes im Graphen (ändert sich, wenn die Datei neu hochgeladen wird)."""
+    return f'{handle}|{idx}'
+
+def make_trace(curve, view, label, trace_type, x_flip, y_flip):
+    """Trace-Dictionary einer Kennlinie in der gewählten Auflösung (view) und ggf. geflippt."""
+    x_vals = curve.voltage[view]
+    y_vals = curve.current[view]
+    return {
+        'type': trace_type,
+        'x': typed_array(-x_vals if x_flip else x_vals),
+        'y': typed_array(-y_vals if y_flip else y_vals),
+        'mode': 'lines',
+        'name': label,
+        'meta': flip_meta(x_flip, y_flip),
+    }
+
+def flip_meta(x_flip, y_flip):
+    """Vorzeichen der gesendeten Koordinaten (trace.meta), danach richtet apply_view jede Trace aus."""
+    return {'x_flip': bool(x_flip), 'y_flip': bool(y_flip)}
+
+def resampling_figure(selected_curves, graph_mode, reference, axis_range_toggle, x_min_input, x_max_input, y_min_input, y_max_input, x_flip_btn, y_flip_btn, graph_state=None):
+    """
+    Mittelwert-/Differenzansicht auf einem gemeinsamen Spannungsraster.
+
+    Alle ausgewählten Kurven werden in einem Schritt interpoliert (resample_curves);
+    Mittelwert und Streuung pro Datei bzw. die Differenz zur Referenz sind dann
+    reine Array-Operationen auf der Matrix (Kurven x Stützstellen).
+
+    :return: Tuple aus (Figur oder Patch bzw. no_update, neuer graph_state)
+    """
+    keys = list(selected_curves)
+    ref_key = reference if reference in selected_curves else keys[0]
+    content_key = ('resampled', tuple(keys), graph_mode, ref_key, bool(x_flip_btn), bool(y_flip_btn))
+    content = figure_cache.get(content_key)
+    if content is None:
+        content = figure_cache.put(content_key, _resampled_traces(selected_curves, keys, graph_mode, ref_key, x_flip_btn, y_flip_btn))
+    traces, bounds, y_title = content
+
+    x_range, y_range = _axis_ranges(bounds, axis_range_toggle, x_min_input, x_max_input, y_min_input, y_max_input, x_flip_btn, y_flip_btn)
+    new_state = {
+        'traces': keys,
+        'trace_type': graph_mode,
+        'reference': ref_key,
+        'x_flip': bool(x_flip_btn),
+        'y_flip': bool(y_flip_btn),
+        'window': None,
+        'bounds': bounds,
+        'x_range': x_range,
+        'y_range': y_range,
+        'uirevision': current_revision(graph_state),
+        # Das gemeinsame Raster hängt nicht vom Ausschnitt ab
+        'decimated': False,
+    }
+
+    unchanged = graph_state and all(
+        graph_state.get(field) == new_state[field] for field in ('traces', 'trace_type', 'reference')
+    )
+    if unchanged:
+        # Nur Achsen/Zoom/Flips geändert (das Raster hängt nicht vom Zoom ab, Flips setzt der Browser um):
+        # höchstens das Layout patchen
+        patch = Patch()
+        changed = False
+        for field, path in (('x_range', 'xaxis'), ('y_range', 'yaxis')):
+            if graph_state.get(field) != new_state[field]:
+                patch['layout'][path]['range'] = new_state[field]
+                changed = True
+        return (patch if changed else no_update), new_state
+
+    figure_key = content_key + (_as_tuple(x_range), _as_tuple(y_range), new_state['uirevision'])
+    fig = figure_cache.get(figure_key)
+    if fig is None:
+        fig = go.Figure(data=traces)
+        fig.update_layout(_base_layout(new_state))
+        fig.update_layout(yaxis_title=y_title)
+        figure_cache.put(figure_key, fig)
+    return fig, new_state
+
+def _resampled_traces(selected_curves, keys, graph_mode, ref_key, x_flip_btn, y_flip_btn):
+    """
+    Interpoliert die Kurven und baut die Traces der Mittelwert- bzw. Differenzansicht.
+
+    :return: Tuple aus (Liste von Trace-Dictionaries, Datenbereich [x_min, x_max, y_min, y_max], Titel der y-Achse)
+    """
+    curves = [curve for _, _, curve in selected_curves.values()]
+    grid = voltage_grid(curves)
+    matrix = resample_curves(curves, grid)
+
+    x_sign = -1.0 if x_flip_btn else 1.0
+    y_sign = -1.0 if y_flip_btn else 1.0
+    meta = flip_meta(x_flip_btn, y_flip_btn)
+    traces = []
+    if graph_mode == 'mean':
+        file_order = list(dict.fromkeys(filename for filename, _, _ in selected_curves.values()))
+        file_index = {filename: i for i, filename in enumerate(file_order)}
+        mean, std, count = group_mean_std(matrix, [file_index[filename] for filename, _, _ in selected_curves.values()])
+        plotted = [mean + std, mean - std]
+        for i, filename in enumerate(file_order):
+            ok = count[i] > 0
+            x_vals = grid[ok] * x_sign
+            color = DEFAULT_PLOTLY_COLORS[i % len(DEFAULT_PLOTLY_COLORS)]
+            label = f'{normalize_filename(filename)} (Mittelwert ± Std, n={int(count[i].max())})'
+            # Band als geschlossene Fläche: obere Kante hin, untere zurück
+            traces.append({
+                'type': 'scatter',
+                'x': typed_array(np.concatenate((x_vals, x_vals[::-1]))),
+                'y': typed_array(y_sign * np.concatenate(((mean[i] + std[i])[ok], (mean[i] - std[i])[ok][::-1]))),
+                'fill': 'toself',
+                'fillcolor': color.replace('rgb(', 'rgba(').replace(')', ', 0.2)'),
+                'line': {'width': 0},
+                'hoverinfo': 'skip',
+                'legendgroup': filename,
+                'showlegend': False,
+                'meta': meta,
+            })
+            traces.append({
+                'type': 'scatter',
+                'x': typed_array(x_vals),
+                'y': typed_array(y_sign * mean[i][ok]),
+                'mode': 'lines',
+                'line': {'color': color},
+                'name': label,
+                'legendgroup': filename,
+                'meta': meta,
+            })
+        y_title = 'Current [mA]'
+    else:
+        delta = matrix - matrix[keys.index(ref_key)]
+        plotted = [delta]
+        trace_type = 'scattergl' if delta.size > WEBGL_POINT_THRESHOLD else 'scatter'
+        for key, row in zip(keys, delta):
+            filename, idx, _ = selected_curves[key]
+            label = f'{normalize_filename(filename)} - Datensatz {idx + 1}'
+            traces.append({
+                'type': trace_type,
+                'x': typed_array(grid * x_sign),
+                'y': typed_array(y_sign * row),
+                'mode': 'lines',
+                'name': f'{label} (Referenz)' if key == ref_key else label,
+                'meta': meta,
+            })
+        y_title = 'ΔCurrent [mA] (zur Referenz)'
+
+    values = np.concatenate([block[~np.isnan(block)] for block in plotted] + [np.zeros(1)])
+    bounds = [*_value_range([grid]), float(values.min()), float(values.max())]
+    return traces, bounds, y_title
+
+def _as_tuple(value):
+    # Listen (Achsenbereiche) als Teil eines Cache-Schlüssels
+    return tuple(value) if value is not None else None
+
+def _axis_ranges(bounds, axis_range_toggle, x_min_input, x_max_input, y_min_input, y_max_input, x_flip_btn, y_flip_btn):
     if axis_range_toggle == 'manual':
         # Verwende die vom Benutzer eingegebenen Werte
         try:
@@ -59,10 +346,8 @@ def update_graph_extern(selected_datasets_per_file, axis_range_toggle, x_min_inp
             y_max = None
     else:
         # Bestimme die minimalen und maximalen Werte, einschließlich 0
-        x_min = min(all_x_values + [0])
-        x_max = max(all_x_values + [0])
-        y_min = min(all_y_values + [0])
-        y_max = max(all_y_values + [0])
+        x_min, x_max = (-bounds[1], -bounds[0]) if x_flip_btn else (bounds[0], bounds[1])
+        y_min, y_max = (-bounds[3], -bounds[2]) if y_flip_btn else (bounds[2], bounds[3])
         
         # Füge etwas Abstand hinzu (15% des Bereichs)
         x_margin = abs((x_max - x_min) * 0.15)
@@ -72,19 +357,24 @@ def update_graph_extern(selected_datasets_per_file, axis_range_toggle, x_min_inp
         y_min -= y_margin
         y_max += y_margin
 
-    # Aktualisiere das Layout der Figur
-    fig.update_layout(
+    x_range = [x_min, x_max] if x_min is not None and x_max is not None else None
+    y_range = [y_min, y_max] if y_min is not None and y_max is not None else None
+    return x_range, y_range
+
+def _base_layout(state):
+    return dict(
         xaxis_title='Voltage [mV]',
         yaxis_title='Current [mA]',
         legend_title='Datensätze',
         showlegend=True,
+        uirevision=state['uirevision'],
         xaxis=dict(
             zeroline=True,
             zerolinewidth=2,
             zerolinecolor='black',
             showgrid=True,
             gridcolor='lightgray',
-            range=[x_min, x_max] if x_min is not None and x_max is not None else None
+            range=state['x_range']
         ),
         yaxis=dict(
             zeroline=True,
@@ -92,8 +382,58 @@ def update_graph_extern(selected_datasets_per_file, axis_range_toggle, x_min_inp
             zerolinecolor='black',
             showgrid=True,
             gridcolor='lightgray',
-            range=[y_min, y_max] if y_min is not None and y_max is not None else None
+            range=state['y_range']
         )
     )
-    
-    return fig
+
+def current_revision(graph_state):
+    """
+    uirevision der angezeigten Figur (ändert sich mit Achseneinstellungen und Flips).
+
+    Sie wird nur im Browser gebildet (apply_view in assets/clientside.js) und
+    hier aus graph-state übernommen; würden beide Seiten sie aus den Eingaben
+    formatieren, wichen sie etwa bei 1e-07/1e-7 ab und der Zoom ginge verloren.
+    Die erste Figur bekommt INITIAL_REVISION, apply_view ersetzt sie sofort.
+    """
+    if not graph_state:
+        return INITIAL_REVISION
+    return graph_state.get('uirevision', INITIAL_REVISION)
+
+def visible_x_window(zoom, uirevision, axis_range_toggle, x_min_input, x_max_input, x_flip_btn):
+    """
+    Ermittelt den sichtbaren Spannungsbereich (in Datenkoordinaten, ohne Flip).
+
+    Vorrang hat der letzte Zoom des Benutzers, aber nur, wenn er unter der
+    aktuellen uirevision entstanden ist; nach Flip, Preset oder Wechsel
+    Automatisch/Manuell hat Plotly die Achse zurückgesetzt und der Zoom ist
+    veraltet. Sonst gilt der manuelle Achsenbereich.
+    Der Bereich wird um 10 % je Seite erweitert, damit kleines Verschieben
+    nicht sofort grobe Punkte zeigt. None bedeutet: ganze Kurve sichtbar.
+
+    :param zoom: {'x_range': [min, max] oder None (Autorange), 'uirevision'} aus dem graph-zoom-Store
+    """
+    window = None
+    if axis_range_toggle == 'manual' and x_min_input is not None and x_max_input is not None:
+        window = (x_min_input, x_max_input)
+    if zoom and zoom.get('uirevision') == uirevision:
+        window = zoom.get('x_range')
+    if window is None:
+        return None
+
+    try:
+        lower, upper = sorted(float(value) for value in window[:2])
+    except (TypeError, ValueError):
+        return None
+    if x_flip_btn:
+        lower, upper = -upper, -lower
+    margin = (upper - lower) * 0.1
+    return lower - margin, upper + margin
+
+def _value_range(arrays):
+    # Minimum/Maximum über alle Arrays per NumPy-Reduktion, die 0 ist immer enthalten
+    lower, upper = 0.0, 0.0
+    for values in arrays:
+        if len(values):
+            lower = min(lower, float(np.min(values)))
+            upper = max(upper, float(np.max(values)))
+    return lower, upper
@@ -0,0 +1,159 @@
+import multiprocessing
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from config import INGEST_WORKERS
+from data_processing.disk_cache import disk_cache
+from data_processing.file_processing import process_file_extern
+from data_processing.parameter_table import build_parameter_table
+from input_handling.parser import content_hash
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def ingest_file(contents, filename):
+    """
+    Dekodiert, liest und segmentiert eine einzelne Datei.
+
+    Läuft im Worker-Prozess; Fehler werden nicht geworfen, sondern im Ergebnis
+    vermerkt, damit eine defekte Datei den Rest des Uploads nicht verliert.
+
+    :return: Dictionary mit 'filename', 'content_hash', 'datasets', 'parameter_table', 'error'
+    """
+    result = {
+        'filename': filename, 'content_hash': None, 'datasets': [],
+        'parameter_table': None, 'error': None,
+    }
+    try:
+        result['content_hash'] = content_hash(contents)
+        result['datasets'], parameter_values_list = process_file_extern(contents, filename)
+        # Die rohen Parameterzeilen werden danach nicht mehr gebraucht, nur die typisierte Tabelle
+        result['parameter_table'] = build_parameter_table(parameter_values_list, result['datasets'])
+    except Exception as exc:
+        result['error'] = f'{type(exc).__name__}: {exc}'
+    return result
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Nicht forken: der Pool entsteht im Upload-Thread eines Multithread-Servers, ein
+            # geforkter Worker könnte Locks erben, die gerade ein anderer Thread hält (Logging, SQLite)
+            _executor = ProcessPoolExecutor(
+                max_workers=INGEST_WORKERS, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _parse_files(jobs, cancelled=None):
+    """
+    Parst die Dateien und liefert (Position, Ergebnis) in Fertigstellungs-Reihenfolge.
+
+    Bei nur einer Datei oder INGEST_WORKERS <= 1 wird direkt im Aufrufer gearbeitet.
+    Ist cancelled gesetzt (threading.Event), werden noch nicht gestartete Dateien verworfen.
+    """
+    def sequential(positions):
+        for i in positions:
+            if cancelled is not None and cancelled.is_set():
+                return
+            yield i, ingest_file(*jobs[i])
+
+    if INGEST_WORKERS <= 1 or len(jobs) <= 1:
+        yield from sequential(range(len(jobs)))
+        return
+
+    done = set()
+    try:
+        executor = _get_executor()
+        futures = {executor.submit(ingest_file, contents, filename): i for i, (contents, filename) in enumerate(jobs)}
+        pending = set(futures)
+        while pending:
+            finished, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future.cancelled():
+                    continue
+                # Erst nach result() als erledigt merken: bei BrokenProcessPool wird die Datei sequentiell nachgeholt
+                result = future.result()
+                done.add(futures[future])
+                yield futures[future], result
+            if cancelled is not None and cancelled.is_set():
+                for future in pending:
+                    future.cancel()
+                return
+    except BrokenProcessPool:
+        # Ein Worker ist abgestürzt: Pool verwerfen und die restlichen Dateien sequentiell verarbeiten
+        _reset_executor()
+        yield from sequential([i for i in range(len(jobs)) if i not in done])
+
+
+def _cached_result(filename, file_hash, entry):
+    # Ergebnis aus dem Disk-Cache in die Form von ingest_file bringen
+    for curve in entry['datasets']:
+        curve.meta['filename'] = filename
+    return {
+        'filename': filename, 'content_hash': file_hash, 'datasets': entry['datasets'],
+        'parameter_table': entry['parameter_table'], 'error': None,
+    }
+
+
+def upload_hashes(list_of_contents):
+    """SHA-256 je hochgeladener Datei; None, wenn der Inhalt nicht dekodierbar ist."""
+    hashes = []
+    for contents in list_of_contents:
+        try:
+            hashes.append(content_hash(contents))
+        except Exception:
+            hashes.append(None)  # Fehler meldet ingest_file beim regulären Einlesen
+    return hashes
+
+
+def iter_ingest(list_of_contents, list_of_names, hashes=None, cancelled=None):
+    """
+    Verarbeitet mehrere Dateien parallel und liefert jedes Ergebnis, sobald es fertig ist.
+
+    Dateien, deren Inhalt (SHA-256) bereits im persistenten disk_cache liegt,
+    werden nicht erneut geparst und kommen zuerst. Neu geparste Dateien werden
+    sofort im disk_cache abgelegt. Die Reihenfolge hängt also von Cache und
+    Laufzeiten ab; Aufrufer ordnen die Ergebnisse über die Position ein
+    (siehe UploadJob).
+
+    :param list_of_contents: Inhalte der Dateien (Base64-Data-URLs oder Bytes)
+    :param list_of_names:    Dateinamen in gleicher Reihenfolge
+    :param hashes:           bereits berechnete upload_hashes (optional)
+    :param cancelled:        threading.Event zum Abbrechen (optional)
+    :return:                 Generator über (Position im Upload, Ergebnis-Dictionary wie ingest_file)
+    """
+    jobs = list(zip(list_of_contents, list_of_names))
+    cached = {}
+    if disk_cache.enabled:
+        if hashes is None:
+            hashes = upload_hashes(list_of_contents)
+        cached = disk_cache.get_many(hashes)
+    if hashes is None:
+        hashes = [None] * len(jobs)
+
+    missing = []
+    for i, (contents, filename) in enumerate(jobs):
+        if hashes[i] in cached:
+            yield i, _cached_result(filename, hashes[i], cached[hashes[i]])
+        else:
+            missing.append(i)
+
+    for position, result in _parse_files([jobs[i] for i in missing], cancelled):
+        if result['error'] is None:
+            disk_cache.put_many({result['content_hash']: {
+                'datasets': result['datasets'],
+                'parameter_table': result['parameter_table'],
+            }})
+        yield missing[position], result
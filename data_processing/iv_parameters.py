@@ -0,0 +1,159 @@
+import numpy as np
+
+# Relative Fensterbreite (bezogen auf Voc) für die lokalen Steigungsfits bei V=0 (Rp) und V=Voc (Rs)
+FIT_WINDOW = 0.1
+# Mindestanzahl Punkte im Fenster, sonst bleibt Rs/Rp NaN
+FIT_MIN_POINTS = 3
+
+IV_PARAMETER_NAMES = ['Isc', 'Voc', 'Vmpp', 'Impp', 'Pmpp', 'FF', 'Rs', 'Rp']
+
+
+def flatten_curves(curves):
+    """
+    Packt alle Kennlinien in flache Arrays (ragged batch).
+
+    Jede Kurve wird nach Spannung sortiert; segment enthält pro Punkt den
+    Kurvenindex, starts den ersten Punkt jeder Kurve.
+    """
+    lengths = np.array([len(curve.voltage) for curve in curves], dtype=np.int64)
+    if lengths.sum() == 0:
+        empty = np.empty(0)
+        return empty, empty, np.empty(0, dtype=np.int64), lengths
+    voltage = np.concatenate([curve.voltage for curve in curves])
+    current = np.concatenate([curve.current for curve in curves])
+    segment = np.repeat(np.arange(len(curves)), lengths)
+    order = np.lexsort((voltage, segment))
+    return voltage[order], current[order], segment, lengths
+
+
+def _first_per_segment(mask, segment, n_curves):
+    """Index des ersten True-Eintrags je Kurve (-1, falls keiner)."""
+    first = np.full(n_curves, -1, dtype=np.int64)
+    positions = np.flatnonzero(mask)
+    segments, index = np.unique(segment[positions], return_index=True)
+    first[segments] = positions[index]
+    return first
+
+
+def _crossing(x, y, segment, n_curves, rising):
+    """
+    Linear interpolierte Nullstelle von y (erste Vorzeichenänderung je Kurve).
+
+    :param rising: True für Durchgang von <= 0 nach > 0, sonst von > 0 nach <= 0
+    :return:       x an der Nullstelle (NaN, falls keine vorhanden)
+    """
+    result = np.full(n_curves, np.nan)
+    if len(x) < 2:
+        return result
+    same = segment[:-1] == segment[1:]
+    if rising:
+        sign_change = (y[:-1] <= 0) & (y[1:] > 0)
+    else:
+        sign_change = (y[:-1] > 0) & (y[1:] <= 0)
+    first = _first_per_segment(same & sign_change, segment[:-1], n_curves)
+    found = first >= 0
+    i = first[found]
+    dy = y[i + 1] - y[i]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(dy != 0, -y[i] / dy, 0.0)
+    result[found] = x[i] + t * (x[i + 1] - x[i])
+    return result
+
+
+def _interpolate_at(x, y, segment, n_curves, x0):
+    """y an der Stelle x0 (pro Kurve), linear zwischen den umgebenden Punkten."""
+    result = np.full(n_curves, np.nan)
+    if len(x) < 2:
+        return result
+    same = segment[:-1] == segment[1:]
+    target = x0[segment[:-1]]
+    bracket = same & (x[:-1] <= target) & (x[1:] >= target)
+    first = _first_per_segment(bracket, segment[:-1], n_curves)
+    found = first >= 0
+    i = first[found]
+    dx = x[i + 1] - x[i]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(dx != 0, (x0[found] - x[i]) / dx, 0.0)
+    result[found] = y[i] + t * (y[i + 1] - y[i])
+    return result
+
+
+def _local_slope(x, y, segment, n_curves, center, half_width):
+    """
+    Steigung dy/dx einer linearen Regression über alle Punkte mit |x - center| <= half_width.
+
+    Die Summen werden mit np.bincount pro Kurve gebildet, also ohne Python-Schleife.
+    """
+    inside = np.abs(x - center[segment]) <= half_width[segment]
+    inside &= ~np.isnan(center[segment])
+    seg = segment[inside]
+    xs, ys = x[inside], y[inside]
+    n = np.bincount(seg, minlength=n_curves).astype(np.float64)
+    sx = np.bincount(seg, xs, minlength=n_curves)
+    sy = np.bincount(seg, ys, minlength=n_curves)
+    sxx = np.bincount(seg, xs * xs, minlength=n_curves)
+    sxy = np.bincount(seg, xs * ys, minlength=n_curves)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+    slope[n < FIT_MIN_POINTS] = np.nan
+    return slope
+
+
+def extract_iv_parameters(curves):
+    """
+    Berechnet die Kennlinienparameter für viele Kurven gleichzeitig.
+
+    Einheiten wie in der Messdatei: Spannung in mV, Strom in mA (Photostrom positiv).
+
+    - Isc:  Strom bei V = 0 (interpoliert)
+    - Voc:  Spannung beim Nulldurchgang des Stroms (interpoliert)
+    - Pmpp: maximale Leistung im Bereich V >= 0, I >= 0 (mW), dazu Vmpp/Impp
+    - FF:   Pmpp / (Isc * Voc) in %
+    - Rs:   -dV/dI aus linearem Fit um Voc (Ohm)
+    - Rp:   -dV/dI aus linearem Fit um V = 0 (kOhm)
+
+    :param curves: Liste von IVCurve
+    :return:       Dictionary {Name: float64-Array der Länge len(curves)}, NaN wo nicht bestimmbar
+    """
+    n_curves = len(curves)
+    result = {name: np.full(n_curves, np.nan) for name in IV_PARAMETER_NAMES}
+    if n_curves == 0:
+        return result
+
+    voltage, current, segment, lengths = flatten_curves(curves)
+    if len(voltage) == 0:
+        return result
+
+    zeros = np.zeros(n_curves)
+    isc = _interpolate_at(voltage, current, segment, n_curves, zeros)
+    voc = _crossing(voltage, current, segment, n_curves, rising=False)
+
+    # Maximum Power Point: pro Kurve das Maximum von V*I im Erzeugerquadranten
+    power = voltage * current / 1000.0
+    power = np.where((voltage >= 0) & (current >= 0), power, -np.inf)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    nonempty = lengths > 0
+    pmpp = np.full(n_curves, -np.inf)
+    pmpp[nonempty] = np.maximum.reduceat(power, starts[nonempty])
+    at_max = _first_per_segment(power == pmpp[segment], segment, n_curves)
+    valid_mpp = (at_max >= 0) & np.isfinite(pmpp) & (pmpp > 0)
+    result['Pmpp'][valid_mpp] = pmpp[valid_mpp]
+    result['Vmpp'][valid_mpp] = voltage[at_max[valid_mpp]]
+    result['Impp'][valid_mpp] = current[at_max[valid_mpp]]
+
+    result['Isc'] = isc
+    result['Voc'] = voc
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result['FF'] = np.where(
+            (isc > 0) & (voc > 0),
+            result['Vmpp'] * result['Impp'] / (isc * voc) * 100.0,
+            np.nan
+        )
+
+        half_width = np.abs(voc) * FIT_WINDOW
+        slope_voc = _local_slope(voltage, current, segment, n_curves, voc, half_width)
+        slope_sc = _local_slope(voltage, current, segment, n_curves, zeros, half_width)
+        # mV/mA = Ohm; Rp in kOhm wie in der Messdatei
+        result['Rs'] = np.where(slope_voc < 0, -1.0 / slope_voc, np.nan)
+        result['Rp'] = np.where(slope_sc < 0, -1.0 / slope_sc / 1000.0, np.nan)
+    return result
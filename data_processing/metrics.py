@@ -0,0 +1,181 @@
+import functools
+import json
+import threading
+import time
+
+from config import METRICS_ENABLED
+from data_processing.figure_cache import CACHES
+
+# Bucket-Grenzen der Histogramme
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7, 1e8)
+DATASET_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class Histogram:
+    """Kumulatives Histogramm im Prometheus-Format, getrennt nach Callback-Namen."""
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label, value):
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series['counts']):
+                    lines.append(f'{self.name}_bucket{{callback="{label}",le="{bound:g}"}} {count}')
+                lines.append(f'{self.name}_bucket{{callback="{label}",le="+Inf"}} {series["count"]}')
+                lines.append(f'{self.name}_sum{{callback="{label}"}} {series["sum"]:.6g}')
+                lines.append(f'{self.name}_count{{callback="{label}"}} {series["count"]}')
+        return lines
+
+
+class Counter:
+    """Einfacher Zähler im Prometheus-Format, getrennt nach Callback-Namen."""
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label, amount=1):
+        with self._lock:
+            self._values[label] = self._values.get(label, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{{callback="{label}"}} {value}')
+        return lines
+
+
+callback_duration = Histogram('sosim_callback_duration_seconds', 'Laufzeit der Dash-Callbacks', DURATION_BUCKETS)
+callback_input_bytes = Histogram('sosim_callback_input_bytes', 'Serialisierte Größe der Callback-Eingaben', SIZE_BUCKETS)
+callback_output_bytes = Histogram('sosim_callback_output_bytes', 'Serialisierte Größe der Callback-Ausgaben', SIZE_BUCKETS)
+callback_datasets = Histogram('sosim_callback_datasets', 'Anzahl verarbeiteter Datensätze (ausgewählte, ohne Auswahl alle der Session)', DATASET_BUCKETS)
+callback_errors = Counter('sosim_callback_errors_total', 'Callbacks, die mit einer Exception endeten')
+
+_METRICS = [callback_duration, callback_input_bytes, callback_output_bytes, callback_datasets, callback_errors]
+
+
+def payload_size(value):
+    """Größe von value als JSON (wie Dash es überträgt); 0, falls nicht serialisierbar (z.B. no_update)."""
+    from plotly.utils import PlotlyJSONEncoder
+
+    try:
+        return len(json.dumps(value, cls=PlotlyJSONEncoder).encode('utf-8'))
+    except (TypeError, ValueError):
+        return 0
+
+
+def selected_dataset_count():
+    """
+    Anzahl der ausgewählten Datensätze unter den Inputs und States des laufenden Callbacks.
+
+    Gezählt werden die Werte aller dataset-checklist-Komponenten, also genau
+    die Datensätze, die der Callback verarbeitet.
+
+    :return: Anzahl oder None, wenn der Callback keine Datensatz-Auswahl bekommt
+    """
+    from dash import ctx
+    from dash.exceptions import MissingCallbackContextException
+
+    try:
+        groups = list(ctx.inputs_list) + list(ctx.states_list)
+    except MissingCallbackContextException:
+        return None
+    count = None
+    for group in groups:
+        for item in group if isinstance(group, list) else [group]:
+            comp_id = item.get('id')
+            if isinstance(comp_id, dict) and comp_id.get('type') == 'dataset-checklist' and item.get('property') == 'value':
+                count = (count or 0) + len(item.get('value') or [])
+    return count
+
+
+def session_dataset_count(values):
+    """Summe der Datensätze aus dem ersten data-store (Dictionary mit 'checkbox_info') in values."""
+    for value in values:
+        if isinstance(value, (list, tuple)):
+            nested = session_dataset_count(value)
+            if nested:
+                return nested
+        elif isinstance(value, dict) and 'checkbox_info' in value:
+            return sum(info.get('ds_count', 0) for info in value['checkbox_info'].values())
+    return 0
+
+
+def instrument(name):
+    """
+    Decorator für Dash-Callbacks: misst Laufzeit, Größe von Ein-/Ausgaben und Anzahl Datensätze.
+
+    Ist die Instrumentierung abgeschaltet (SOSIM_METRICS), wird die Funktion
+    unverändert zurückgegeben und verursacht keinerlei Mehraufwand.
+    """
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as exc:
+                # PreventUpdate ist kein Fehler, wird aber wie jede Exception weitergereicht
+                if type(exc).__name__ != 'PreventUpdate':
+                    callback_errors.inc(name)
+                raise
+            finally:
+                callback_duration.observe(name, time.perf_counter() - start)
+            callback_input_bytes.observe(name, payload_size(list(args)))
+            callback_output_bytes.observe(name, payload_size(result))
+            datasets = selected_dataset_count()
+            if datasets is None:
+                # z.B. Upload: verarbeitet wird der ganze Store
+                datasets = session_dataset_count(list(args) + [result])
+            callback_datasets.observe(name, datasets)
+            return result
+
+        return wrapper
+    return decorator
+
+
+def render_cache_metrics():
+    """Treffer, Fehlschläge, Trefferquote und Größe der Trace-/Figuren-Caches (figure_cache.CACHES)."""
+    lines = []
+    for name, kind, description, value in (
+        ('sosim_cache_hits_total', 'counter', 'Treffer im Cache', lambda cache: cache.hits),
+        ('sosim_cache_misses_total', 'counter', 'Fehlschläge im Cache', lambda cache: cache.misses),
+        ('sosim_cache_hit_ratio', 'gauge', 'Anteil der Treffer an allen Abfragen', lambda cache: f'{cache.hit_rate:.6g}'),
+        ('sosim_cache_entries', 'gauge', 'Aktuelle Anzahl Einträge', len),
+    ):
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+        lines += [f'{name}{{cache="{cache.name}"}} {value(cache)}' for cache in CACHES]
+    return lines
+
+
+def render_metrics():
+    """Alle Metriken im Prometheus-Textformat."""
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    lines.extend(render_cache_metrics())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,352 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from data_processing.dataset_cache import dataset_cache
+from data_processing.file_processing import header, normalize_filename
+from data_processing.iv_parameters import extract_iv_parameters
+
+# zentrale Präzisions-Map (Spalten -> Nachkommastellen)
+PRECISION_MAP = {
+    'Isc [mA]': 1,
+    'Voc [mV]': 0,
+    'Vmpp [mV]': 0,
+    'Impp [mA]': 1,
+    'Pmpp [mW]': 2,
+    'FF [%]': 2,
+    'Rp [kOhm]': 2,
+    'Rs [Ohm]': 1,
+    'Eta [%]': 1,
+    'Jsc [mA/cm²]': 1,
+}
+
+# Aus den Rohkurven berechnete Parameter (extract_iv_parameters) -> Spalte in der Tabelle
+CURVE_PARAMETER_COLUMNS = {
+    'Isc': 'Isc [mA] (Kurve)',
+    'Voc': 'Voc [mV] (Kurve)',
+    'Vmpp': 'Vmpp [mV] (Kurve)',
+    'Impp': 'Impp [mA] (Kurve)',
+    'Pmpp': 'Pmpp [mW] (Kurve)',
+    'FF': 'FF [%] (Kurve)',
+    'Rp': 'Rp [kOhm] (Kurve)',
+    'Rs': 'Rs [Ohm] (Kurve)',
+}
+for _column in CURVE_PARAMETER_COLUMNS.values():
+    PRECISION_MAP[_column] = PRECISION_MAP[_column.replace(' (Kurve)', '')]
+
+# Spalten aus den Parameterzeilen der Messdatei
+PARAMETER_TABLE_COLUMNS = header[3:-2]
+# Angezeigte Spalten: berechnete Werte direkt hinter den Werten des Messgeräts
+_insert_at = PARAMETER_TABLE_COLUMNS.index('Jsc [mA/cm²]') + 1
+TABLE_COLUMNS = (
+    PARAMETER_TABLE_COLUMNS[:_insert_at]
+    + list(CURVE_PARAMETER_COLUMNS.values())
+    + PARAMETER_TABLE_COLUMNS[_insert_at:]
+)
+# Spalten, die als Zahl (float64) geführt werden; alle übrigen bleiben Rohwerte
+NUMERIC_COLUMNS = [column for column in TABLE_COLUMNS if column in PRECISION_MAP]
+# Zahlenspalten der Messdatei, deren Platzhalter ('Inf', '#NV') in einer flag_column erhalten bleiben
+FLAGGED_COLUMNS = [column for column in PARAMETER_TABLE_COLUMNS if column in PRECISION_MAP]
+
+# Anzahl der zusammengeführten Session-Tabellen, die vorgehalten werden
+_COMBINED_CACHE_SIZE = 16
+
+
+def flag_column(column):
+    """Name der Markierungsspalte, die Platzhalter wie 'Inf' oder '#NV' einer Zahlenspalte aufnimmt."""
+    return f'{column} [flag]'
+
+
+def build_parameter_table(parameter_values_list, curves=None):
+    """
+    Wandelt die Parameterzeilen einer Datei einmalig in eine typisierte Tabelle um.
+
+    Zahlenspalten (PRECISION_MAP) werden float64; Platzhalter ('Inf', '#NV', leere
+    oder nicht lesbare Zellen) werden NaN und landen im Original in der
+    zugehörigen flag_column. FF wird bereits in % umgerechnet. Sind curves
+    angegeben, kommen die daraus berechneten Parameter (CURVE_PARAMETER_COLUMNS)
+    dazu; die Tabelle hat dann mindestens eine Zeile pro Kennlinie.
+
+    :param parameter_values_list: Parameterzeilen aus process_file_extern (oder None)
+    :param curves:                IVCurve-Liste derselben Datei (optional)
+    :return:                      DataFrame, eine Zeile pro Datensatz
+    """
+    rows = [dict(zip(header, row)) for row in (parameter_values_list or [])]
+    curves = curves or []
+    # Fehlende Parameterzeilen (z.B. bei unvollständigen Dateien) als leer auffüllen
+    rows += [{}] * max(len(curves) - len(rows), 0)
+    raw = pd.DataFrame(rows, columns=PARAMETER_TABLE_COLUMNS, dtype=object)
+
+    table = pd.DataFrame(index=raw.index)
+    for column in PARAMETER_TABLE_COLUMNS:
+        values = raw[column]
+        if column not in PRECISION_MAP:
+            table[column] = values
+            continue
+        text = values.astype(str).str.strip().str.upper()
+        sentinel = values.isna() | values.eq('Inf') | text.eq('#NV')
+        numbers = pd.to_numeric(values.where(~sentinel), errors='coerce').astype(np.float64)
+        sentinel |= numbers.isna()
+        if column == 'FF [%]':
+            numbers = numbers * 100
+        table[column] = numbers.where(~sentinel)
+        table[flag_column(column)] = values.where(sentinel)
+
+    computed = extract_iv_parameters(curves)
+    for name, column in CURVE_PARAMETER_COLUMNS.items():
+        values = np.full(len(table), np.nan)
+        values[:len(curves)] = computed[name]
+        table[column] = values
+    return table[[c for c in _table_order() if c in table.columns]]
+
+
+def _table_order():
+    # Anzeige-Reihenfolge, jeweils mit der Markierungsspalte direkt hinter ihrer Zahlenspalte
+    order = []
+    for column in TABLE_COLUMNS:
+        order.append(column)
+        if column in FLAGGED_COLUMNS:
+            order.append(flag_column(column))
+    return order
+
+
+def restore_placeholders(table):
+    """Setzt die Platzhalter aus den Markierungsspalten wieder in die Zahlenspalten ein."""
+    restored = table.copy()
+    for column in NUMERIC_COLUMNS:
+        flag = flag_column(column)
+        if flag in restored.columns:
+            restored[column] = restored[column].astype(object).where(restored[column].notna(), restored[flag])
+            restored = restored.drop(columns=flag)
+    return restored
+
+
+def label_parameter_table(table, filename):
+    """Kopie der Tabelle einer Datei mit den Spalten 'Datei' (Anzeigename), 'file' und 'dataset' vorne."""
+    display_fn = normalize_filename(filename)
+    frame = table.copy()
+    frame.insert(0, 'dataset', np.arange(len(table)))
+    frame.insert(0, 'file', filename)
+    frame.insert(0, 'Datei', [f'{display_fn} - Datensatz {idx + 1}' for idx in range(len(table))])
+    return frame
+
+
+_combined_cache = OrderedDict()
+_combined_lock = threading.Lock()
+
+
+def combined_parameter_table(data_store):
+    """
+    Parametertabelle aller Dateien einer Session, zusammengeführt und zwischengespeichert.
+
+    Schlüssel ist die Folge der Handles; solange keine Datei hinzukommt oder
+    ersetzt wird, wird die Tabelle nicht neu aufgebaut. Fehlt eine Datei im
+    dataset_cache, wird das unvollständige Ergebnis nicht gespeichert: nach
+    erneutem Hochladen kommt sie unter demselben Handle zurück.
+
+    :return: Tuple aus (DataFrame mit 'Datei', 'file', 'dataset' + Parameterspalten,
+             {Dateiname: (Startzeile, Anzahl)})
+    """
+    handles = data_store.get('handles', {})
+    key = tuple(handles.get(fn) for fn in data_store.get('file_names', []))
+    with _combined_lock:
+        if key in _combined_cache:
+            _combined_cache.move_to_end(key)
+            return _combined_cache[key]
+
+    frames = []
+    offsets = {}
+    start = 0
+    complete = True
+    for filename in data_store.get('file_names', []):
+        entry = dataset_cache.get(handles.get(filename))
+        if entry is None:
+            complete = False  # Handle wurde aus dem Cache verdrängt
+            continue
+        if entry.get('parameter_table') is None:
+            continue
+        frame = label_parameter_table(entry['parameter_table'], filename)
+        frames.append(frame)
+        offsets[filename] = (start, len(frame))
+        start += len(frame)
+
+    if frames:
+        combined = pd.concat(frames, ignore_index=True)
+    else:
+        combined = build_parameter_table(None).assign(Datei=[], file=[], dataset=[])
+    result = (combined, offsets)
+    if not complete:
+        return result
+
+    with _combined_lock:
+        _combined_cache[key] = result
+        while len(_combined_cache) > _COMBINED_CACHE_SIZE:
+            _combined_cache.popitem(last=False)
+    return result
+
+
+def selection_mask(offsets, total, file_checkbox_values, file_checkbox_ids, dataset_checklist_values, dataset_checklist_ids):
+    """
+    Bool-Maske der aktiven Zeilen aus den Datei- und Datensatz-Checkboxen.
+
+    Ist für eine aktive Datei keine Datensatz-Checkliste vorhanden, gelten alle
+    ihre Datensätze als ausgewählt.
+    """
+    mask = np.zeros(total, dtype=bool)
+    active_datasets = {
+        comp_id['index']: val
+        for val, comp_id in zip(dataset_checklist_values, dataset_checklist_ids)
+        if comp_id.get('index')
+    }
+    for val, comp_id in zip(file_checkbox_values, file_checkbox_ids):
+        filename = comp_id.get('index')
+        if not val or not filename or filename not in offsets:
+            continue
+        start, count = offsets[filename]
+        if filename not in active_datasets:
+            mask[start:start + count] = True
+            continue
+        selected = np.asarray(active_datasets[filename] or [], dtype=np.int64)
+        selected = selected[(selected >= 0) & (selected < count)]
+        mask[start + selected] = True
+    return mask
+
+
+def select_parameter_rows(data_store, file_checkbox_values, file_checkbox_ids, dataset_checklist_values, dataset_checklist_ids):
+    """Typisierte Parameterzeilen der aktuell aktiven Dateien/Datensätze (in Datei-Reihenfolge)."""
+    if not data_store or 'handles' not in data_store:
+        return build_parameter_table(None).assign(Datei=[], file=[], dataset=[])
+    combined, offsets = combined_parameter_table(data_store)
+    mask = selection_mask(
+        offsets, len(combined),
+        file_checkbox_values, file_checkbox_ids,
+        dataset_checklist_values, dataset_checklist_ids
+    )
+    return combined[mask]
+
+
+# Filter-Syntax der DataTable, z.B. "{Eta [%]} s> 18 && {Datei} icontains abc"
+_FILTER_PART = re.compile(
+    r'^\{(?P<column>[^}]+)\}\s*'
+    r'(?P<operator>[si]?(?:>=|<=|!=|=|<|>|eq|ne|lt|le|gt|ge|contains|datestartswith))\s*'
+    r'(?P<value>.*)$'
+)
+_OPERATOR_ALIASES = {'eq': '=', 'ne': '!=', 'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>='}
+
+
+def _parse_filter_part(part):
+    """Zerlegt einen Teil der filter_query in (Spalte, Operator, Wert, Groß/Klein egal) oder None."""
+    match = _FILTER_PART.match(part.strip())
+    if not match:
+        return None
+    operator = match.group('operator')
+    case_insensitive = operator.startswith('i')
+    if operator[0] in 'si' and operator[1:]:
+        operator = operator[1:]
+    operator = _OPERATOR_ALIASES.get(operator, operator)
+
+    value = match.group('value').strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'`':
+        value = value[1:-1]
+    return match.group('column'), operator, value, case_insensitive
+
+
+def _compare(values, operator, value):
+    if operator == '=':
+        return values == value
+    if operator == '!=':
+        return values != value
+    if operator == '<':
+        return values < value
+    if operator == '<=':
+        return values <= value
+    if operator == '>':
+        return values > value
+    if operator == '>=':
+        return values >= value
+    return None
+
+
+def filter_mask(table, filter_query):
+    """
+    Bool-Maske für eine filter_query der DataTable (Teile mit '&&' verknüpft).
+
+    Zahlenspalten werden direkt auf den float64-Werten verglichen; ist der Wert
+    keine Zahl (z.B. '#NV'), wird stattdessen die Markierungsspalte geprüft.
+    Unbekannte Spalten oder Ausdrücke werden ignoriert.
+    """
+    mask = np.ones(len(table), dtype=bool)
+    if not filter_query:
+        return mask
+
+    for part in filter_query.split(' && '):
+        parsed = _parse_filter_part(part)
+        if parsed is None:
+            continue
+        column, operator, value, case_insensitive = parsed
+        if column not in table.columns:
+            continue
+
+        if column in NUMERIC_COLUMNS:
+            try:
+                number = float(value)
+            except ValueError:
+                number = None
+            if number is not None and operator not in ('contains', 'datestartswith'):
+                result = _compare(table[column].to_numpy(), operator, number)
+                if result is not None:
+                    mask &= result
+                    continue
+            # Platzhalter oder Textsuche: gegen die angezeigten Werte vergleichen
+            values = restore_placeholders(table[[c for c in (column, flag_column(column)) if c in table.columns]])[column]
+        else:
+            values = table[column]
+
+        text = values.astype(str)
+        if case_insensitive:
+            text = text.str.lower()
+            value = value.lower()
+        if operator == 'contains':
+            mask &= text.str.contains(value, regex=False).to_numpy()
+        elif operator == 'datestartswith':
+            mask &= text.str.startswith(value).to_numpy()
+        else:
+            result = _compare(text.to_numpy(), operator, value)
+            if result is not None:
+                mask &= result
+    return mask
+
+
+def query_parameter_table(rows, filter_query, sort_by, page_current, page_size):
+    """
+    Filtert, sortiert und blättert die ausgewählten Parameterzeilen serverseitig.
+
+    Platzhalter (NaN in Zahlenspalten) werden unabhängig von der Richtung ans Ende sortiert.
+
+    :param rows:         Ergebnis von select_parameter_rows
+    :param filter_query: filter_query der DataTable
+    :param sort_by:      sort_by der DataTable ([{'column_id', 'direction'}, ...])
+    :param page_current: aktuelle Seite (0-basiert)
+    :param page_size:    Zeilen pro Seite
+    :return:             Tuple aus (Zeilen der Seite mit Platzhaltern, Seitenanzahl, korrigierte Seite)
+    """
+    rows = rows[filter_mask(rows, filter_query)]
+
+    sort_by = [s for s in (sort_by or []) if s.get('column_id') in rows.columns]
+    if sort_by and len(rows):
+        rows = rows.sort_values(
+            [s['column_id'] for s in sort_by],
+            ascending=[s.get('direction') != 'desc' for s in sort_by],
+            na_position='last',
+            kind='stable',
+        )
+
+    page_size = max(int(page_size or 1), 1)
+    page_count = max((len(rows) + page_size - 1) // page_size, 1)
+    page_current = min(max(int(page_current or 0), 0), page_count - 1)
+    start = page_current * page_size
+    page = restore_placeholders(rows.iloc[start:start + page_size])
+    return page, page_count, page_current
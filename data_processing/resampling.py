@@ -0,0 +1,88 @@
+import numpy as np
+
+from config import RESAMPLE_GRID_POINTS
+from data_processing.iv_parameters import flatten_curves
+
+
+def voltage_grid(curves, points=RESAMPLE_GRID_POINTS):
+    """
+    Gemeinsames Spannungsraster über den Gesamtbereich aller Kurven.
+
+    Die Messungen unterscheiden sich in Start-/Endspannung und Schrittzahl;
+    das Raster deckt alle ab, außerhalb einer Kurve bleibt deren Wert NaN.
+
+    :return: float64-Array mit points Stützstellen (leer, wenn keine Punkte vorhanden)
+    """
+    lower = [curve.voltage.min() for curve in curves if len(curve.voltage)]
+    upper = [curve.voltage.max() for curve in curves if len(curve.voltage)]
+    if not lower:
+        return np.empty(0)
+    return np.linspace(min(lower), max(upper), points)
+
+
+def resample_curves(curves, grid):
+    """
+    Interpoliert alle Kurven in einem Schritt linear auf grid.
+
+    Die Kurven werden als flacher, pro Kurve nach Spannung sortierter Batch
+    abgelegt. Mit dem Schlüssel Kurvenindex * Breite + Spannung ist der ganze
+    Batch monoton, sodass ein einziges np.searchsorted für alle Kurven und
+    Stützstellen die umgebenden Messpunkte findet.
+
+    :param curves: Liste von IVCurve
+    :param grid:   aufsteigendes Spannungsraster (mV)
+    :return:       Matrix (Kurven x Stützstellen) mit Strömen in mA, NaN außerhalb einer Kurve
+    """
+    n_curves = len(curves)
+    result = np.full((n_curves, len(grid)), np.nan)
+    voltage, current, segment, lengths = flatten_curves(curves)
+    if len(voltage) == 0 or len(grid) == 0:
+        return result
+
+    base = min(voltage.min(), grid[0])
+    width = max(voltage.max(), grid[-1]) - base + 1.0
+    key = segment * width + (voltage - base)
+    query = np.arange(n_curves)[:, None] * width + (grid - base)[None, :]
+
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))[:, None]
+    ends = starts + lengths[:, None]
+    right = np.searchsorted(key, query, side='right')
+    left = right - 1
+    last = len(voltage) - 1
+    x0 = voltage[np.clip(left, 0, last)]
+    x1 = voltage[np.clip(right, 0, last)]
+    y0 = current[np.clip(left, 0, last)]
+    y1 = current[np.clip(right, 0, last)]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(x1 > x0, (grid[None, :] - x0) / (x1 - x0), 0.0)
+    values = y0 + t * (y1 - y0)
+    # Gültig, wenn beide Nachbarn zur selben Kurve gehören oder die Stützstelle genau auf dem letzten Punkt liegt
+    inside = (left >= starts) & ((right < ends) | (x0 == grid[None, :]))
+    result[inside] = values[inside]
+    return result
+
+
+def group_mean_std(matrix, groups):
+    """
+    Mittelwert und Standardabweichung (ddof=1) pro Gruppe und Stützstelle, NaN-fest.
+
+    :param matrix: Ergebnis von resample_curves
+    :param groups: Gruppennummer je Zeile (z.B. Datei), aufsteigend sortiert
+    :return:       Tuple aus (Mittelwert, Standardabweichung, Anzahl), je (Gruppen x Stützstellen)
+    """
+    groups = np.asarray(groups)
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if len(groups) else np.empty(0, dtype=np.int64)
+    if len(starts) == 0:
+        empty = np.empty((0, matrix.shape[1]))
+        return empty, empty, empty
+    valid = ~np.isnan(matrix)
+    filled = np.where(valid, matrix, 0.0)
+    count = np.add.reduceat(valid, starts, axis=0).astype(np.float64)
+    total = np.add.reduceat(filled, starts, axis=0)
+    total_sq = np.add.reduceat(filled * filled, starts, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / count
+        std = np.sqrt(np.clip((total_sq - count * mean * mean) / (count - 1), 0.0, None))
+    std[count < 2] = 0.0
+    return mean, std, count
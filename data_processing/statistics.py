@@ -0,0 +1,265 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from data_processing.dataset_cache import dataset_cache
+from data_processing.file_processing import normalize_filename
+from data_processing.parameter_table import PRECISION_MAP
+
+# Parameter der Statistik-Ansicht (Spalten der Parametertabelle)
+STATISTIC_COLUMNS = ['Eta [%]', 'FF [%]', 'Voc [mV]', 'Jsc [mA/cm²]']
+
+# Gruppierung: pro Datei oder pro Probe (Dateiname ohne laufende Nummer am Ende)
+GROUP_MODES = {'file': 'pro Datei', 'sample': 'pro Probe'}
+
+# Ab so vielen Werten pro Parameter zeigt der Violin-Plot keine Einzelpunkte mehr
+VIOLIN_POINTS_MAX = 2000
+
+# Zwischengespeicherte Teil-Aggregate (eine Datei mit einer bestimmten Datensatz-Auswahl)
+_PARTIAL_CACHE_SIZE = 4096
+
+_TRAILING_NUMBER = re.compile(r'[\s_-]*\d+$')
+
+_partial_cache = OrderedDict()
+_partial_lock = threading.Lock()
+
+
+def filename_group(filename, mode):
+    """
+    Gruppenname einer Datei.
+
+    :param mode: 'file' (Anzeigename der Datei) oder 'sample' (Anzeigename ohne
+                 laufende Nummer am Ende, z.B. "Batch7_Zelle_03" -> "Batch7_Zelle")
+    """
+    display_fn = normalize_filename(filename)
+    if mode == 'sample':
+        return _TRAILING_NUMBER.sub('', display_fn) or display_fn
+    return display_fn
+
+
+class PartialAggregate:
+    """
+    Summen einer Datei (bzw. Gruppe) pro Parameter, aus denen sich Mittelwert,
+    Standardabweichung und Median zusammensetzen lassen.
+
+    - count, total, total_sq: Anzahl, Summe, Quadratsumme der gültigen Werte (ohne NaN)
+    - values:                 sortierte gültige Werte je Parameter (für Median/Quartile/Verteilung)
+    """
+
+    def __init__(self, count, total, total_sq, values):
+        self.count = count
+        self.total = total
+        self.total_sq = total_sq
+        self.values = values
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        # matrix: Datensätze x STATISTIC_COLUMNS, NaN für ungültige Werte
+        valid = ~np.isnan(matrix)
+        filled = np.where(valid, matrix, 0.0)
+        values = [np.sort(matrix[valid[:, i], i]) for i in range(matrix.shape[1])]
+        return cls(valid.sum(axis=0), filled.sum(axis=0), (filled * filled).sum(axis=0), values)
+
+    @classmethod
+    def merge(cls, partials):
+        partials = list(partials)
+        if not partials:
+            return cls.from_matrix(np.empty((0, len(STATISTIC_COLUMNS))))
+        return cls(
+            np.sum([p.count for p in partials], axis=0),
+            np.sum([p.total for p in partials], axis=0),
+            np.sum([p.total_sq for p in partials], axis=0),
+            [
+                partials[0].values[i] if len(partials) == 1 else np.sort(np.concatenate([p.values[i] for p in partials]))
+                for i in range(len(STATISTIC_COLUMNS))
+            ],
+        )
+
+
+def file_aggregate(handle, selected):
+    """
+    Teil-Aggregat einer Datei für die ausgewählten Datensätze (zwischengespeichert).
+
+    Solange sich Handle und Auswahl einer Datei nicht ändern, wird nichts neu
+    berechnet; beim Hinzufügen oder Abwählen von Dateien entstehen nur deren Teile neu.
+
+    :param handle:   Handle der Datei im dataset_cache
+    :param selected: ausgewählte Datensatz-Indizes (None = alle)
+    :return:         PartialAggregate oder None, falls die Datei nicht mehr im Cache liegt
+    """
+    key = (handle, None if selected is None else tuple(sorted(selected)))
+    with _partial_lock:
+        if key in _partial_cache:
+            _partial_cache.move_to_end(key)
+            return _partial_cache[key]
+
+    entry = dataset_cache.get(handle)
+    if entry is None or entry.get('parameter_table') is None:
+        return None
+    table = entry['parameter_table']
+    matrix = table.reindex(columns=STATISTIC_COLUMNS).to_numpy(dtype=np.float64, na_value=np.nan)
+    if selected is not None:
+        rows = np.asarray(selected, dtype=np.int64)
+        matrix = matrix[rows[(rows >= 0) & (rows < len(matrix))]]
+    partial = PartialAggregate.from_matrix(matrix)
+
+    with _partial_lock:
+        _partial_cache[key] = partial
+        while len(_partial_cache) > _PARTIAL_CACHE_SIZE:
+            _partial_cache.popitem(last=False)
+    return partial
+
+
+def group_aggregates(data_store, file_checkbox_values, file_checkbox_ids, dataset_checklist_values, dataset_checklist_ids, mode):
+    """
+    Aggregate der aktiven Dateien/Datensätze, zusammengefasst nach filename_group.
+
+    :return: OrderedDict {Gruppe: PartialAggregate} in Datei-Reihenfolge
+    """
+    groups = OrderedDict()
+    if not data_store or 'handles' not in data_store:
+        return groups
+    active_files = {
+        comp_id.get('index') for val, comp_id in zip(file_checkbox_values, file_checkbox_ids) if val
+    }
+    active_datasets = {
+        comp_id.get('index'): val for val, comp_id in zip(dataset_checklist_values, dataset_checklist_ids)
+    }
+    for filename in data_store.get('file_names', []):
+        if filename not in active_files:
+            continue
+        selected = active_datasets.get(filename)
+        if selected is not None and not selected:
+            continue
+        partial = file_aggregate(data_store['handles'].get(filename), selected)
+        if partial is not None:
+            groups.setdefault(filename_group(filename, mode), []).append(partial)
+    return OrderedDict((group, PartialAggregate.merge(partials)) for group, partials in groups.items())
+
+
+def _ragged_quantiles(values, starts, counts, q):
+    """Quantil q (linear interpoliert wie np.percentile) für viele sortierte Teilarrays auf einmal."""
+    position = q * np.maximum(counts - 1, 0)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, np.maximum(counts - 1, 0))
+    fraction = position - lower
+    safe = counts > 0
+    lo = np.where(safe, values[np.where(safe, starts + lower, 0)], np.nan) if len(values) else np.full(len(counts), np.nan)
+    hi = np.where(safe, values[np.where(safe, starts + upper, 0)], np.nan) if len(values) else np.full(len(counts), np.nan)
+    return lo + fraction * (hi - lo)
+
+
+def group_summary(groups, column_index):
+    """
+    Kennzahlen aller Gruppen für einen Parameter, ohne Schleife über die Werte.
+
+    :return: Dictionary mit Arrays (eine Stelle pro Gruppe): 'n', 'mean', 'std', 'median',
+             'q1', 'q3', 'lower', 'upper' (Whisker bei 1,5 IQR); NaN wo nicht bestimmbar
+    """
+    aggregates = list(groups.values())
+    n = np.array([a.count[column_index] for a in aggregates], dtype=np.int64)
+    total = np.array([a.total[column_index] for a in aggregates], dtype=np.float64)
+    total_sq = np.array([a.total_sq[column_index] for a in aggregates], dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / n
+        # Stichproben-Standardabweichung (ddof=1) aus den Summen
+        std = np.sqrt(np.clip((total_sq - n * mean * mean) / (n - 1), 0.0, None))
+    std[n < 2] = np.nan
+
+    # Alle sortierten Werte hintereinander (ragged batch), Quantile per Index-Arithmetik
+    values = np.concatenate([a.values[column_index] for a in aggregates]) if aggregates else np.empty(0)
+    starts = np.concatenate(([0], np.cumsum(n)[:-1])).astype(np.int64)
+    q1, median, q3 = (_ragged_quantiles(values, starts, n, q) for q in (0.25, 0.5, 0.75))
+
+    lower = np.full(len(n), np.nan)
+    upper = np.full(len(n), np.nan)
+    nonempty = n > 0
+    if values.size:
+        segment = np.repeat(np.arange(len(n)), n)
+        iqr = q3 - q1
+        inside = (values >= (q1 - 1.5 * iqr)[segment]) & (values <= (q3 + 1.5 * iqr)[segment])
+        lower[nonempty] = np.minimum.reduceat(np.where(inside, values, np.inf), starts[nonempty])
+        upper[nonempty] = np.maximum.reduceat(np.where(inside, values, -np.inf), starts[nonempty])
+    return {'n': n, 'mean': mean, 'std': std, 'median': median, 'q1': q1, 'q3': q3, 'lower': lower, 'upper': upper}
+
+
+def statistics_table(groups):
+    """Zeilen der Statistik-Tabelle: pro Gruppe n, Mittelwert, Standardabweichung und Median je Parameter."""
+    frame = pd.DataFrame({'Gruppe': list(groups)})
+    for i, column in enumerate(STATISTIC_COLUMNS):
+        summary = group_summary(groups, i)
+        decimals = PRECISION_MAP.get(column, 2) + 1
+        frame[f'{column} n'] = summary['n']
+        frame[f'{column} Mittelwert'] = np.round(summary['mean'], decimals)
+        frame[f'{column} Std'] = np.round(summary['std'], decimals)
+        frame[f'{column} Median'] = np.round(summary['median'], decimals)
+    # NaN als leere Zelle
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+
+def statistics_table_columns():
+    columns = [{'name': ['', 'Gruppe'], 'id': 'Gruppe'}]
+    for column in STATISTIC_COLUMNS:
+        for stat in ('n', 'Mittelwert', 'Std', 'Median'):
+            columns.append({'name': [column, stat], 'id': f'{column} {stat}', 'type': 'numeric'})
+    return columns
+
+
+def statistics_figure(groups, plot_type):
+    """
+    Box- oder Violin-Plots der Gruppen, ein Teilplot (und eine Trace) pro Parameter.
+
+    Box-Plots werden aus vorab berechneten Quartilen gezeichnet, damit auch
+    bei 10k+ Datensätzen nur wenige Zahlen zum Browser gehen. Violin-Plots
+    brauchen die Verteilung und übertragen die Werte (als Binärarray).
+    """
+    figure = make_subplots(rows=1, cols=len(STATISTIC_COLUMNS), subplot_titles=STATISTIC_COLUMNS)
+    names = list(groups)
+    positions = np.arange(len(names))
+    for col, column in enumerate(STATISTIC_COLUMNS, start=1):
+        summary = group_summary(groups, col - 1)
+        present = summary['n'] > 0
+        if not present.any():
+            continue
+        if plot_type == 'violin':
+            figure.add_trace(go.Violin(
+                x=np.repeat(positions, summary['n']).astype(np.float32),
+                y=np.concatenate([groups[group].values[col - 1] for group in names]).astype(np.float32),
+                name=column, box_visible=True, meanline_visible=True, spanmode='hard',
+                points='all' if summary['n'].sum() <= VIOLIN_POINTS_MAX else False
+            ), row=1, col=col)
+        else:
+            figure.add_trace(go.Box(
+                x=positions[present], q1=summary['q1'][present], median=summary['median'][present],
+                q3=summary['q3'][present], lowerfence=summary['lower'][present],
+                upperfence=summary['upper'][present], mean=summary['mean'][present],
+                boxmean=True, name=column
+            ), row=1, col=col)
+    axis = dict(tickvals=positions, ticktext=names, tickangle=-45)
+    figure.update_layout(
+        {f'xaxis{i if i > 1 else ""}': axis for i in range(1, len(STATISTIC_COLUMNS) + 1)},
+        height=450, margin=dict(l=40, r=20, t=40, b=120), showlegend=False
+    )
+    return figure
+
+
+def update_statistics_extern(data_store, file_checkbox_values, file_checkbox_ids, dataset_checklist_values, dataset_checklist_ids, mode, plot_type):
+    """
+    Figur und Tabelle der Statistik-Ansicht für die aktuelle Auswahl.
+
+    :param mode:      Gruppierung (siehe GROUP_MODES)
+    :param plot_type: 'box' oder 'violin'
+    :return:          Tuple aus (Figur, Tabellenzeilen, Stil des Statistik-Bereichs)
+    """
+    groups = group_aggregates(
+        data_store, file_checkbox_values, file_checkbox_ids,
+        dataset_checklist_values, dataset_checklist_ids, mode
+    )
+    if not groups:
+        return go.Figure(), [], {'display': 'none'}
+    return statistics_figure(groups, plot_type), statistics_table(groups), {}
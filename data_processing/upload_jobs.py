@@ -0,0 +1,262 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from data_processing.ingestion import iter_ingest
+
+# Status pro Datei
+STATUS_PENDING = 'wartend'
+STATUS_DONE = 'fertig'
+STATUS_FAILED = 'fehler'
+STATUS_CANCELLED = 'abgebrochen'
+
+# Höchstens so viele Warteschlangen (auch abgeschlossene) im Speicher halten
+_MAX_QUEUES = 32
+# Abgeschlossene Warteschlangen, die nicht mehr abgefragt werden, nach dieser Zeit verwerfen (s)
+_QUEUE_TTL = 600
+
+
+class UploadJob:
+    """
+    Ein im Hintergrund laufender Upload (Thread über iter_ingest).
+
+    Der Thread legt fertige Ergebnisse in einer Warteschlange ab; der
+    Polling-Callback holt sie mit drain() ab und führt sie in den Store zusammen.
+    So erscheinen die ersten Dateien, während die übrigen noch geparst werden.
+
+    iter_ingest liefert in Fertigstellungsreihenfolge (Disk-Cache-Treffer zuerst).
+    Freigegeben wird trotzdem nur in Upload-Reihenfolge: ein Ergebnis wartet, bis
+    alle Dateien davor fertig sind. So hängen Dateiliste und Checkboxes nicht vom
+    Timing ab, und bei doppelten Namen gewinnt immer die spätere Datei.
+    """
+
+    def __init__(self, list_of_contents, list_of_names, hashes, on_done=None):
+        self.job_id = uuid.uuid4().hex
+        self.names = list(list_of_names)
+        self.hashes = list(hashes) if hashes is not None else [None] * len(self.names)
+        self.status = [STATUS_PENDING] * len(self.names)
+        self.cancelled = threading.Event()
+        self.done = False
+        self._on_done = on_done
+        self._results = []
+        # Fertige Ergebnisse, die noch auf eine frühere Datei warten (Position -> Ergebnis)
+        self._pending = {}
+        self._next = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, args=(list_of_contents, list_of_names, hashes), daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self, list_of_contents, list_of_names, hashes):
+        try:
+            for position, result in iter_ingest(list_of_contents, list_of_names, hashes, self.cancelled):
+                with self._lock:
+                    self.status[position] = STATUS_DONE if result['error'] is None else STATUS_FAILED
+                    self._release(position, result)
+        except Exception as exc:
+            # Unerwarteter Fehler: alle offenen Dateien als fehlgeschlagen melden
+            with self._lock:
+                for position, status in enumerate(self.status):
+                    if status == STATUS_PENDING:
+                        self.status[position] = STATUS_FAILED
+                        self._release(position, {
+                            'filename': self.names[position],
+                            'error': f'{type(exc).__name__}: {exc}',
+                        })
+        finally:
+            with self._lock:
+                # Nach einem Abbruch fehlen Positionen: den Rest trotzdem geordnet freigeben
+                self._results.extend(self._pending.pop(position) for position in sorted(self._pending))
+                if self.cancelled.is_set():
+                    self.status = [STATUS_CANCELLED if s == STATUS_PENDING else s for s in self.status]
+                self.done = True
+            if self._on_done is not None:
+                self._on_done()
+
+    def _release(self, position, result):
+        # Nur unter self._lock aufrufen
+        self._pending[position] = result
+        while self._next in self._pending:
+            self._results.append(self._pending.pop(self._next))
+            self._next += 1
+
+    def cancel(self):
+        # Laufende Dateien werden noch fertig geparst, wartende nicht mehr gestartet
+        self.cancelled.set()
+
+    def drain(self):
+        """
+        Holt alle seit dem letzten Aufruf fertig gewordenen Ergebnisse ab.
+
+        :return: Tuple aus (Liste von Ergebnis-Dictionaries, Status pro Datei, Job beendet)
+        """
+        with self._lock:
+            results, self._results = self._results, []
+            # done erst melden, wenn auch alle Ergebnisse abgeholt wurden
+            return results, list(self.status), self.done
+
+    def progress(self):
+        """Status pro Datei, ohne Ergebnisse abzuholen."""
+        with self._lock:
+            return list(self.status)
+
+
+class UploadQueue:
+    """
+    Die Uploads einer Seite in Upload-Reihenfolge.
+
+    Startet ein zweiter Upload, während der erste noch läuft, wird er angehängt
+    statt den ersten abzubrechen. Alle Jobs parsen sofort; abgeholt wird aber nur
+    vom vordersten Job, spätere halten ihre Ergebnisse bis dahin zurück.
+
+    Die Meldungen (fehlerhafte, übersprungene, abgebrochene Dateien) liegen hier
+    und nicht im dcc.Store: Start- und Polling-Callback laufen unabhängig
+    voneinander und würden sich dort gegenseitig überschreiben.
+    """
+
+    def __init__(self):
+        self.queue_id = uuid.uuid4().hex
+        self.jobs = []
+        self.failed = []
+        self.skipped = []
+        self.cancelled = []
+        self.closed = False
+        self.touched = time.time()
+        self._finished_names = []
+        self._finished_status = []
+        self._reported = False
+        self._lock = threading.Lock()
+
+    def add(self, job, skipped_files):
+        """
+        Hängt einen Job an; False, wenn die Warteschlange schon abgeschlossen ist.
+        """
+        with self._lock:
+            if self.closed:
+                return False
+            self.jobs.append(job)
+            self.skipped += skipped_files
+            self._reported = False
+            return True
+
+    def pending_hashes(self):
+        """Inhalts-Hash -> Dateiname der Dateien, die noch nicht abgeholt wurden."""
+        with self._lock:
+            return {
+                file_hash: filename
+                for job in self.jobs
+                for filename, file_hash in zip(job.names, job.hashes)
+                if file_hash is not None
+            }
+
+    def cancel(self):
+        with self._lock:
+            for job in self.jobs:
+                job.cancel()
+
+    def progress(self):
+        """
+        :return: Tuple aus (Dateinamen, Status pro Datei) aller Jobs dieser Warteschlange
+        """
+        with self._lock:
+            return self._progress()
+
+    def _progress(self):
+        names, status = list(self._finished_names), list(self._finished_status)
+        for job in self.jobs:
+            names += job.names
+            status += job.progress()
+        return names, status
+
+    def poll(self):
+        """
+        Holt die fertigen Ergebnisse in Upload-Reihenfolge ab.
+
+        Ein beendeter Job wird aus der Warteschlange genommen, danach kommt der
+        nächste an die Reihe. Ist kein Job mehr übrig, wird die Warteschlange
+        abgeschlossen; ein weiterer Upload beginnt dann eine neue.
+
+        :return: Tuple aus (Liste von Ergebnis-Dictionaries, Dateinamen, Status pro Datei,
+                 (fehlerhafte, übersprungene, abgebrochene Dateien) oder None, falls unverändert,
+                 Warteschlange abgeschlossen)
+        """
+        with self._lock:
+            self.touched = time.time()
+            results = []
+            changed = False
+            while self.jobs:
+                job_results, job_status, job_done = self.jobs[0].drain()
+                results += job_results
+                self.failed += [(r['filename'], r['error']) for r in job_results if r['error'] is not None]
+                if not job_done:
+                    break
+                job = self.jobs.pop(0)
+                cancelled = [fn for fn, s in zip(job.names, job_status) if s == STATUS_CANCELLED]
+                self.cancelled += cancelled
+                changed = changed or bool(cancelled)
+                self._finished_names += job.names
+                self._finished_status += job_status
+            if not self.jobs:
+                self.closed = True
+
+            report = None
+            if results or changed or not self._reported:
+                report = (list(self.failed), list(self.skipped), list(self.cancelled))
+                self._reported = True
+            names, status = self._progress()
+            return results, names, status, report, self.closed
+
+    @property
+    def idle(self):
+        return all(job.done for job in self.jobs)
+
+
+_queues = OrderedDict()
+_queues_lock = threading.Lock()
+
+
+def enqueue_upload(queue_id, list_of_contents, list_of_names, hashes=None, skipped_files=(), on_done=None):
+    """
+    Startet die Verarbeitung der Dateien in einem Hintergrund-Thread und hängt
+    sie an die Warteschlange der Seite an.
+
+    :param queue_id:         ID der Warteschlange aus dem dcc.Store (None beim ersten Upload)
+    :param list_of_contents: Inhalte der Dateien (Pfade aus dem Chunk-Upload oder Base64-Data-URLs)
+    :param list_of_names:    Dateinamen in gleicher Reihenfolge
+    :param hashes:           bereits berechnete upload_hashes (optional)
+    :param skipped_files:    Liste von (übersprungene Datei, identische Datei) für die Meldungen
+    :param on_done:          Funktion, die nach dem letzten Ergebnis aufgerufen wird (optional)
+    :return:                 UploadQueue (bei abgeschlossener oder unbekannter queue_id eine neue)
+    """
+    job = UploadJob(list_of_contents, list_of_names, hashes, on_done)
+    skipped_files = [tuple(skipped) for skipped in skipped_files]
+    with _queues_lock:
+        queue = _queues.get(queue_id)
+        if queue is None or not queue.add(job, skipped_files):
+            _prune()
+            queue = UploadQueue()
+            queue.add(job, skipped_files)
+            _queues[queue.queue_id] = queue
+    job.start()
+    return queue
+
+
+def get_queue(queue_id):
+    with _queues_lock:
+        return _queues.get(queue_id)
+
+
+def _prune():
+    # Alte, nicht mehr abgefragte Warteschlangen entfernen; nie mehr als _MAX_QUEUES behalten
+    now = time.time()
+    for queue_id, queue in list(_queues.items()):
+        if queue.idle and now - queue.touched > _QUEUE_TTL:
+            del _queues[queue_id]
+    while len(_queues) >= _MAX_QUEUES:
+        _, queue = _queues.popitem(last=False)
+        queue.cancel()
@@ -0,0 +1,128 @@
+import os
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+from config import UPLOAD_CHUNK_BYTES, UPLOAD_DIR, UPLOAD_MAX_FILE_BYTES, UPLOAD_MAX_FILES, UPLOAD_MAX_TOTAL_BYTES
+
+# Nicht abgeschlossene Uploads nach dieser Zeit löschen (s)
+UPLOAD_TTL = 24 * 3600
+# Blockgröße beim Kopieren des Request-Bodys auf die Platte
+_COPY_BLOCK = 1024 * 1024
+_UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadError(ValueError):
+    """Ungültiger Upload-Block (falsche ID, Lücke, zu groß)."""
+
+
+def _upload_dir(upload_id):
+    # Nur selbst erzeugte IDs zulassen, damit kein Pfad außerhalb von UPLOAD_DIR entsteht
+    if not isinstance(upload_id, str) or not _UPLOAD_ID.match(upload_id):
+        raise UploadError(f'Ungültige Upload-ID: {upload_id!r}')
+    return os.path.join(UPLOAD_DIR, upload_id)
+
+
+def _part_path(upload_id, index):
+    # Dateinamen des Browsers werden nie als Pfad verwendet, nur die Position im Upload
+    return os.path.join(_upload_dir(upload_id), f'{int(index)}.xlsx')
+
+
+def create_upload():
+    """
+    Legt ein Verzeichnis für einen neuen Upload an und räumt verwaiste Uploads auf.
+
+    :return: Upload-ID (32 Hex-Zeichen)
+    """
+    _prune()
+    upload_id = uuid.uuid4().hex
+    os.makedirs(_upload_dir(upload_id))
+    return upload_id
+
+
+def write_chunk(upload_id, index, offset, stream, length=None):
+    """
+    Schreibt einen Block der Datei index ab offset; der Body wird blockweise kopiert.
+
+    Blöcke kommen der Reihe nach. Ein wiederholter Block (z.B. nach einem
+    Netzwerkfehler) überschreibt den alten ab offset. Wird eine Grenze
+    überschritten (Dateigröße, Platz aller offenen Uploads), wird der Block
+    verworfen und die Datei wieder auf offset gekürzt.
+
+    :param stream: Datei-ähnliches Objekt mit den Rohdaten (request.stream)
+    :param length: Content-Length des Blocks, falls bekannt
+    :return:       neue Größe der Datei in Bytes
+    """
+    if length is not None and length > UPLOAD_CHUNK_BYTES:
+        raise UploadError(f'Block größer als {UPLOAD_CHUNK_BYTES} Bytes.')
+    if offset < 0:
+        raise UploadError(f'Ungültiger Offset {offset}.')
+    if not 0 <= index < UPLOAD_MAX_FILES:
+        raise UploadError(f'Höchstens {UPLOAD_MAX_FILES} Dateien pro Upload.')
+    path = _part_path(upload_id, index)
+    if not os.path.isdir(os.path.dirname(path)):
+        raise UploadError(f'Unbekannter Upload: {upload_id}')
+
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as file:
+        existing = file.seek(0, os.SEEK_END)
+        if offset > existing:
+            raise UploadError(f'Lücke im Upload (Offset {offset}).')
+        # Belegter Platz ohne diese Datei (sie wird ab offset neu geschrieben)
+        others = _used_bytes() - existing
+        file.seek(offset)
+        file.truncate()
+        size = offset
+        try:
+            for block in iter(lambda: stream.read(_COPY_BLOCK), b''):
+                size += len(block)
+                if size > UPLOAD_MAX_FILE_BYTES:
+                    raise UploadError(f'Datei größer als {UPLOAD_MAX_FILE_BYTES // (1024 * 1024)} MB.')
+                if others + size > UPLOAD_MAX_TOTAL_BYTES:
+                    raise UploadError('Upload-Speicher voll, bitte später erneut versuchen.')
+                file.write(block)
+        except UploadError:
+            file.truncate(offset)
+            raise
+    return size
+
+
+def upload_paths(upload_id, count):
+    """
+    Pfade der hochgeladenen Dateien in Upload-Reihenfolge (für ingest_file/read_input).
+
+    :param count: Anzahl der Dateien des Uploads
+    :return:      Liste von Path
+    """
+    return [Path(_part_path(upload_id, index)) for index in range(count)]
+
+
+def remove_upload(upload_id):
+    # Nach dem Einlesen werden die Rohdaten nicht mehr gebraucht (Ergebnisse liegen in den Caches)
+    shutil.rmtree(_upload_dir(upload_id), ignore_errors=True)
+
+
+def _used_bytes():
+    # Platz aller offenen Uploads; Dateien, die gerade gelöscht werden, zählen nicht
+    total = 0
+    for root, _, files in os.walk(UPLOAD_DIR):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _prune():
+    if not os.path.isdir(UPLOAD_DIR):
+        return
+    now = time.time()
+    for name in os.listdir(UPLOAD_DIR):
+        path = os.path.join(UPLOAD_DIR, name)
+        try:
+            if _UPLOAD_ID.match(name) and now - os.path.getmtime(path) > UPLOAD_TTL:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
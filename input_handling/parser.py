@@ -1,17 +1,301 @@
-import pylightxl
 import base64
+import hashlib
 import io
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
 
-def read_input(contents):
+import numpy as np
+
+# Spalten, deren Leer-Status für die Segmentierung gebraucht wird
+MASK_COLUMNS = 20
+# Ab so vielen gefüllten Zellen wird eine Zeile vollständig behalten (Parameterzeile)
+PARAMETER_MIN_CELLS = 10
+
+EXCEL_STARTDATE = datetime(1899, 12, 30)
+_DATE_STYLES = ('14', '15', '16', '17')
+_TIME_STYLES = ('18', '19', '20', '21')
+_DATETIME_STYLES = ('22',)
+# Markiert Zellen ohne Inhalt (nur Formatierung)
+_NO_VALUE = object()
+
+
+class SheetRows:
+    """
+    Spaltenprojizierte Sicht auf das erste Tabellenblatt.
+
+    Statt alle Zellen als Python-Listen vorzuhalten, enthält sie nur das,
+    was process_file_extern braucht:
+
+    - nicht_leer:     Bool-Array (Zeilen x 20), True für gefüllte Zellen der ersten 20 Spalten
+    - zellen_belegt:  Anzahl gefüllter Zellen je Zeile (über die ganze Zeile)
+    - spannung/strom: Rohwerte der Spalten A und B (Objekt-Arrays, '' für leere Zellen)
+    - parameter_rows: vollständige Zeilen mit mindestens 10 gefüllten Zellen {Zeile: Liste}
+    """
+
+    def __init__(self, nicht_leer, zellen_belegt, spannung, strom, parameter_rows):
+        self.nicht_leer = nicht_leer
+        self.zellen_belegt = zellen_belegt
+        self.spannung = spannung
+        self.strom = strom
+        self.parameter_rows = parameter_rows
+
+    def __len__(self):
+        return len(self.zellen_belegt)
+
+
+def decode_contents(contents):
+    # Data-URL ("data:<typ>;base64,<daten>") in Bytes umwandeln
     content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    # In-memory BytesIO-Objekt erstellen
-    file_io = io.BytesIO(decoded)
-
-    # Excel-Datei mit pylightxl aus dem BytesIO-Objekt lesen
-    db = pylightxl.readxl(fn=file_io)
-    # Annahme: Daten sind im ersten Tabellenblatt
-    sheet_name = db.ws_names[0]
-    sheet = db.ws(ws=sheet_name)
-    
-    return list(sheet.rows)
\ No newline at end of file
+    return base64.b64decode(content_string)
+
+def read_input(contents):
+    """
+    Liest das erste Tabellenblatt einer hochgeladenen Excel-Datei zeilenweise.
+
+    Das Blatt-XML wird gestreamt (iterparse); pro Zeile werden nur Leer-Status,
+    die Spalten A/B und ggf. die vollständige Parameterzeile behalten.
+
+    :param contents: Base64-Data-URL, bereits dekodierte Bytes oder Pfad einer hochgeladenen Datei
+    :return:         SheetRows
+    """
+    with zipfile.ZipFile(_open_source(contents)) as archive:
+        shared_strings = _read_shared_strings(archive)
+        styles = _read_styles(archive)
+        with archive.open(_first_sheet_path(archive)) as sheet_file:
+            return _scan_sheet(sheet_file, shared_strings, styles)
+
+def content_hash(contents):
+    # SHA-256 über die dekodierten Bytes, unabhängig vom Data-URL-Präfix bzw. blockweise von der Platte
+    if isinstance(contents, os.PathLike):
+        digest = hashlib.sha256()
+        with open(contents, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    decoded = decode_contents(contents) if isinstance(contents, str) else contents
+    return hashlib.sha256(decoded).hexdigest()
+
+def _open_source(contents):
+    # Pfade öffnet zipfile selbst (liest nur die benötigten Teile), alles andere liegt im Speicher
+    if isinstance(contents, os.PathLike):
+        return contents
+    decoded = decode_contents(contents) if isinstance(contents, str) else contents
+    return io.BytesIO(decoded)
+
+
+def _local(tag):
+    # Namespace abschneiden ("{uri}row" -> "row"), funktioniert für Transitional und Strict
+    return tag.rsplit('}', 1)[-1]
+
+def _parse_xml(archive, path):
+    with archive.open(path) as file:
+        return ET.parse(file).getroot()
+
+def _first_sheet_path(archive):
+    # Wie bisher (pylightxl): Blätter nach der Nummer ihrer rId sortieren, das erste nehmen
+    workbook = _parse_xml(archive, 'xl/workbook.xml')
+    rels = _parse_xml(archive, 'xl/_rels/workbook.xml.rels')
+    targets = {rel.get('Id'): rel.get('Target') for rel in rels if _local(rel.tag) == 'Relationship'}
+
+    sheets = []
+    for element in workbook.iter():
+        if _local(element.tag) != 'sheet':
+            continue
+        rid = next((value for key, value in element.attrib.items() if _local(key) == 'id'), None)
+        sheets.append((int(re.sub('[^0-9]', '', rid)), rid))
+    if not sheets:
+        raise ValueError('Die Arbeitsmappe enthält kein Tabellenblatt.')
+
+    target = targets[min(sheets)[1]]
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return 'xl/' + target
+
+def _read_shared_strings(archive):
+    if 'xl/sharedStrings.xml' not in archive.NameToInfo:
+        return []
+    strings = []
+    with archive.open('xl/sharedStrings.xml') as file:
+        for event, element in ET.iterparse(file, events=('end',)):
+            if _local(element.tag) != 'si':
+                continue
+            runs = [child for child in element if _local(child.tag) == 'r']
+            if runs:
+                strings.append(''.join(
+                    t.text for run in runs for t in run.iter() if _local(t.tag) == 't' and t.text
+                ))
+            else:
+                texts = [child for child in element if _local(child.tag) == 't']
+                strings.append(texts[0].text if texts else None)
+            element.clear()
+    return strings
+
+def _read_styles(archive):
+    # Zellformat-Index -> numFmtId; eigene Datums-/Zeitformate werden auf 14/18/22 abgebildet
+    styles = {0: '0'}
+    if 'xl/styles.xml' not in archive.NameToInfo:
+        return styles
+    root = _parse_xml(archive, 'xl/styles.xml')
+
+    custom_styles = {}
+    for element in root:
+        if _local(element.tag) != 'numFmts':
+            continue
+        for num_fmt in element:
+            fc = num_fmt.get('formatCode', '').lower().split(';')[0]
+            if fc == 'general':
+                continue
+            nnu = sum(fc.count(c) for c in '0#?')
+            ndc = sum(fc.count(c) for c in 'yd')
+            ntc = sum(fc.count(c) for c in 'hs')
+            if nnu > ndc + ntc:
+                continue
+            if ndc and ntc:
+                custom_styles[num_fmt.get('numFmtId')] = '22'
+            elif ndc:
+                custom_styles[num_fmt.get('numFmtId')] = '14'
+            elif ntc:
+                custom_styles[num_fmt.get('numFmtId')] = '18'
+
+    for element in root:
+        if _local(element.tag) == 'cellXfs':
+            for i, xf in enumerate(element):
+                num_fmt_id = xf.get('numFmtId')
+                styles[i] = custom_styles.get(num_fmt_id, num_fmt_id)
+            break
+    return styles
+
+def _column_index(address):
+    # "AB12" -> 27 (0-basiert)
+    index = 0
+    for char in address:
+        if not char.isalpha():
+            break
+        index = index * 26 + (ord(char.upper()) - 64)
+    return index - 1
+
+def _cell_value(cell, shared_strings, styles):
+    """Zellwert wie bisher von pylightxl geliefert; _NO_VALUE, wenn die Zelle keinen Inhalt hat."""
+    cell_type = cell.get('t')
+    value = formula = None
+    inline = None
+    for child in cell:
+        name = _local(child.tag)
+        if name == 'v':
+            value = child.text or ''
+        elif name == 'f':
+            formula = child.text or ''
+        elif name == 'is':
+            inline = ''.join(t.text for t in child.iter() if _local(t.tag) == 't' and t.text)
+
+    if cell_type == 'inlineStr':
+        return inline if inline else _NO_VALUE
+    if not value and not formula:
+        return _NO_VALUE  # reiner Style-Eintrag
+    value = value or ''
+
+    if cell_type == 's':
+        return shared_strings[int(value)]
+    if cell_type == 'b':
+        return value == '1'
+    if value == '' or cell_type in ('str', 'e'):
+        return value
+
+    digits = value if '-' not in value else value[1:]
+    number = int(value) if digits.isdigit() else float(value)
+    style = styles.get(int(cell.get('s') or 0), '0')
+    if style in _DATE_STYLES:
+        return (EXCEL_STARTDATE + timedelta(number)).isoformat()[:10].replace('-', '/')
+    if style in _TIME_STYLES:
+        partialday = number % 1
+        return (EXCEL_STARTDATE + timedelta(2, round(partialday * 86400))).strftime('%H:%M:%S')
+    if style in _DATETIME_STYLES:
+        partialday = number % 1
+        dt = EXCEL_STARTDATE + timedelta(int(number), round(partialday * 86400))
+        return dt.isoformat().replace('T', ' ').replace('-', '/')
+    return number
+
+def _scan_sheet(sheet_file, shared_strings, styles):
+    zellen_belegt = []
+    spannung = []
+    strom = []
+    masken_zeilen = []
+    masken_spalten = []
+    parameter_cells = {}
+    breite = 0
+    sheet_data = None
+    row_number = 0
+
+    for event, element in ET.iterparse(sheet_file, events=('start', 'end')):
+        name = _local(element.tag)
+        if event == 'start':
+            if name == 'sheetData':
+                sheet_data = element
+            continue
+        if name != 'row':
+            continue
+
+        row_number = int(element.get('r') or row_number + 1)
+        werte = {}
+        column = -1
+        for cell in element:
+            if _local(cell.tag) != 'c':
+                continue
+            address = cell.get('r')
+            column = _column_index(address) if address else column + 1
+            value = _cell_value(cell, shared_strings, styles)
+            if value is not _NO_VALUE:
+                werte[column] = value
+
+        if werte:
+            # Fehlende Zeilen (ohne Zellen) als leer auffüllen
+            fehlend = row_number - 1 - len(zellen_belegt)
+            if fehlend > 0:
+                zellen_belegt.extend([0] * fehlend)
+                spannung.extend([''] * fehlend)
+                strom.extend([''] * fehlend)
+
+            index = len(zellen_belegt)
+            belegt = 0
+            for col, value in werte.items():
+                if value != '' and value is not None:
+                    belegt += 1
+                    if col < MASK_COLUMNS:
+                        masken_zeilen.append(index)
+                        masken_spalten.append(col)
+            zellen_belegt.append(belegt)
+            spannung.append(werte.get(0, ''))
+            strom.append(werte.get(1, ''))
+            if belegt >= PARAMETER_MIN_CELLS:
+                parameter_cells[index] = werte
+            breite = max(breite, max(werte) + 1)
+
+        # Bereits verarbeitete Zeilen freigeben, damit der Speicher begrenzt bleibt
+        if sheet_data is not None:
+            sheet_data.clear()
+
+    nicht_leer = np.zeros((len(zellen_belegt), MASK_COLUMNS), dtype=bool)
+    nicht_leer[masken_zeilen, masken_spalten] = True
+
+    parameter_rows = {}
+    for index, werte in parameter_cells.items():
+        row = [''] * breite
+        for col, value in werte.items():
+            row[col] = value
+        parameter_rows[index] = row
+
+    return SheetRows(
+        nicht_leer=nicht_leer,
+        zellen_belegt=np.array(zellen_belegt, dtype=np.int32),
+        spannung=_object_array(spannung),
+        strom=_object_array(strom),
+        parameter_rows=parameter_rows,
+    )
+
+def _object_array(values):
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
@@ -0,0 +1,25 @@
+import io
+import zipfile
+
+from benchmarks.synthetic import make_workbook
+from data_processing.data_processing import init_store, merge_result
+from data_processing.export import iter_curve_zip, selected_curves
+from data_processing.ingestion import ingest_file
+
+
+def test_curve_zip_member_names_are_unique():
+    # Alle drei Dateien haben den Anzeigenamen 'a' bzw. 'A'
+    filenames = ['a.xlsx', 'IV Measurement_a.xlsx', 'A.xlsx']
+    store = init_store(None)
+    for seed, filename in enumerate(filenames):
+        merge_result(store, ingest_file(make_workbook(2, 10, seed), filename))
+
+    items = selected_curves(
+        store, [[fn] for fn in filenames], [{'index': fn} for fn in filenames],
+        [[0, 1]] * len(filenames), [{'index': fn} for fn in filenames]
+    )
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(iter_curve_zip(items, 'csv'))))
+    members = [name.casefold() for name in archive.namelist()]
+
+    assert len(members) == 6
+    assert len(set(members)) == len(members)
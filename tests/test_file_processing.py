@@ -0,0 +1,122 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from benchmarks.synthetic import make_workbook, workbook_rows
+from data_processing.file_processing import header, process_file_extern
+
+
+def _baseline_process(alle_zeilen):
+    """
+    Ursprüngliche zeilenweise Auswertung (vor der Vektorisierung) als Referenz.
+
+    :param alle_zeilen: Zeilen des Tabellenblatts, auf len(header) Spalten mit '' aufgefüllt
+    :return:            Tuple aus (Liste von DataFrames, Parameterzeilen)
+    """
+    alle_zeilen = [
+        [cell.replace('\r\n', '\n').replace('\r', '\n') if isinstance(cell, str) else cell for cell in row]
+        for row in alle_zeilen
+    ]
+    if len(alle_zeilen) < 2:
+        parameter_values_list = None
+    else:
+        parameter_values_list = [
+            row for row in alle_zeilen[1:]
+            if sum(1 for cell in row if cell is not None and cell != '') >= 10
+        ]
+        alle_zeilen = alle_zeilen[2:]
+
+    df_list = []
+    i = 0
+    while i < len(alle_zeilen):
+        while i < len(alle_zeilen) and all(zelle == '' or zelle is None for zelle in alle_zeilen[i][:10]):
+            i += 1
+        if i >= len(alle_zeilen):
+            break
+        daten_zeilen = []
+        while i < len(alle_zeilen) and not all(zelle == '' or zelle is None for zelle in alle_zeilen[i][:10]):
+            if i + 1 < len(alle_zeilen):
+                non_empty_cells_in_next_row = sum(
+                    1 for zelle in alle_zeilen[i + 1][:20] if zelle != '' and zelle is not None
+                )
+                if non_empty_cells_in_next_row > 8:
+                    i += 1
+                    break
+            daten_zeilen.append(alle_zeilen[i])
+            i += 1
+        if len(daten_zeilen) < 2:
+            continue
+        df = pd.DataFrame(daten_zeilen[1:], columns=header)
+        df['Voltage [mV]'] = pd.to_numeric(df['Voltage [mV]'], errors='coerce')
+        df['Current [mA]'] = pd.to_numeric(df['Current [mA]'], errors='coerce') * -1
+        df = df.dropna(subset=['Voltage [mV]', 'Current [mA]'])
+        df_list.append(df)
+    return df_list, parameter_values_list
+
+
+def _padded(rows):
+    return [list(row) + [''] * (len(header) - len(row)) for row in rows]
+
+
+def _assert_matches_baseline(contents, rows):
+    expected_frames, expected_parameters = _baseline_process(_padded(rows))
+    curves, parameters = process_file_extern(contents, 'fixture.xlsx')
+
+    assert parameters == expected_parameters
+    assert len(curves) == len(expected_frames)
+    for curve, frame in zip(curves, expected_frames):
+        np.testing.assert_array_equal(curve.voltage, frame['Voltage [mV]'].to_numpy(dtype=np.float64))
+        np.testing.assert_array_equal(curve.current, frame['Current [mA]'].to_numpy(dtype=np.float64))
+
+
+# Grenzfälle der Segmentierung: Folgezeile mit 8/9 gefüllten Zellen, Zellen erst ab Spalte 11,
+# nicht-numerische Werte, Abschnitte mit nur einer Zeile, Parameterzeile zwischen den Daten
+EDGE_CASE_ROWS = [
+    header,
+    [1.5, 2, 'a\r\nb', 4, 5, 6, 7, 8, 9, 10, 'x\ry'],
+    ['Voltage', 'Current'],
+    [1, 2], [2, 3], ['abc', 4], [3, None], [4, '5'],
+    [],
+    ['Abschnitt'], [5, 6],
+    [7, 8, 1, 1, 1, 1, 1, 1, 1],
+    [8, 9], [9, 10],
+    [10, 11, 1, 1, 1, 1, 1, 1],
+    [11, 12],
+    [],
+    [None] * 10 + ['spät'],
+    [20, 21], [22, 23],
+    [],
+    ['nur Überschrift'],
+    [],
+    [12, 13, 1, 1, 1, 1, 1, 1, 1, 1],
+    [13, 14], [14, 15],
+    [None, None, 3],
+    [15, 16],
+]
+
+
+def test_edge_cases_match_baseline_row_loop():
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in EDGE_CASE_ROWS:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+
+    rows = [['' if cell is None else cell for cell in row] for row in EDGE_CASE_ROWS]
+    _assert_matches_baseline(buffer.getvalue(), rows)
+
+
+@pytest.mark.parametrize('n_datasets, steps, seed, placeholder_share', [
+    (4, 60, 0, 0.2),
+    (3, 1, 1, 0.0),
+    (6, 25, 2, 1.0),
+])
+def test_matches_baseline_row_loop(n_datasets, steps, seed, placeholder_share):
+    _assert_matches_baseline(
+        make_workbook(n_datasets, steps, seed, placeholder_share),
+        list(workbook_rows(n_datasets, steps, seed, placeholder_share))
+    )
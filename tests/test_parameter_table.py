@@ -0,0 +1,26 @@
+from benchmarks.synthetic import make_workbook
+from data_processing import disk_cache as disk_cache_module
+from data_processing.data_processing import init_store, merge_result
+from data_processing.dataset_cache import dataset_cache
+from data_processing.ingestion import ingest_file
+from data_processing.parameter_table import combined_parameter_table
+
+
+def test_table_is_rebuilt_after_expired_file_is_uploaded_again(monkeypatch):
+    monkeypatch.setattr(disk_cache_module.disk_cache, 'max_bytes', 0)
+    workbooks = {filename: make_workbook(3, 20, seed) for seed, filename in enumerate(['a.xlsx', 'b.xlsx', 'c.xlsx'])}
+    store = init_store(None)
+    for filename in ['a.xlsx', 'b.xlsx']:
+        merge_result(store, ingest_file(workbooks[filename], filename))
+
+    # a.xlsx aus dem dataset_cache verdrängen (ohne Disk-Cache kein Nachladen)
+    with dataset_cache._lock:
+        entry = dataset_cache._entries.pop(store['handles']['a.xlsx'])
+        dataset_cache._size -= entry['nbytes']
+    merge_result(store, ingest_file(workbooks['c.xlsx'], 'c.xlsx'))
+    assert len(combined_parameter_table(store)[0]) == 6
+
+    merge_result(store, ingest_file(workbooks['a.xlsx'], 'a.xlsx'))
+    combined, offsets = combined_parameter_table(store)
+    assert len(combined) == 9
+    assert offsets['a.xlsx'] == (0, 3)
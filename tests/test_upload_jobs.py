@@ -0,0 +1,81 @@
+import threading
+
+from data_processing import upload_jobs
+from data_processing.upload_jobs import STATUS_CANCELLED, STATUS_DONE, UploadJob, enqueue_upload
+
+
+def _collect(job):
+    filenames = []
+    while True:
+        results, status, done = job.drain()
+        filenames += [result['filename'] for result in results]
+        if done:
+            return filenames, status
+
+
+def test_results_are_released_in_upload_order(monkeypatch):
+    # Disk-Cache-Treffer und kleine Dateien werden früher fertig als große
+    finish_order = [2, 0, 3, 1]
+
+    def fake_iter_ingest(list_of_contents, list_of_names, hashes=None, cancelled=None):
+        for position in finish_order:
+            yield position, {'filename': list_of_names[position], 'error': None}
+
+    monkeypatch.setattr(upload_jobs, 'iter_ingest', fake_iter_ingest)
+    job = UploadJob([b''] * 4, ['a.xlsx', 'b.xlsx', 'c.xlsx', 'd.xlsx'], None).start()
+    filenames, status = _collect(job)
+
+    assert filenames == ['a.xlsx', 'b.xlsx', 'c.xlsx', 'd.xlsx']
+    assert status == [STATUS_DONE] * 4
+
+
+def test_second_upload_is_queued_behind_the_running_one(monkeypatch):
+    release_first = threading.Event()
+
+    def fake_iter_ingest(list_of_contents, list_of_names, hashes=None, cancelled=None):
+        if list_of_names[0] == 'a.xlsx':
+            release_first.wait(timeout=5)
+        for position, filename in enumerate(list_of_names):
+            if cancelled.is_set():
+                return
+            yield position, {'filename': filename, 'error': None}
+
+    monkeypatch.setattr(upload_jobs, 'iter_ingest', fake_iter_ingest)
+    first = enqueue_upload(None, [b''] * 2, ['a.xlsx', 'b.xlsx'])
+    second = enqueue_upload(first.queue_id, [b''], ['c.xlsx'], skipped_files=[('d.xlsx', 'a.xlsx')])
+    assert second is first
+
+    # Der zweite Upload ist fertig, wartet aber auf den ersten
+    second.jobs[1]._thread.join(timeout=5)
+    results, names, status, report, done = first.poll()
+    assert results == [] and not done
+    assert names == ['a.xlsx', 'b.xlsx', 'c.xlsx']
+    assert report == ([], [('d.xlsx', 'a.xlsx')], [])
+
+    release_first.set()
+    filenames = []
+    while not done:
+        results, names, status, report, done = first.poll()
+        filenames += [result['filename'] for result in results]
+    assert filenames == ['a.xlsx', 'b.xlsx', 'c.xlsx']
+    assert status == [STATUS_DONE] * 3
+
+    # Abgeschlossene Warteschlange: ein weiterer Upload beginnt eine neue
+    assert enqueue_upload(first.queue_id, [], []) is not first
+
+
+def test_cancel_lists_files_that_were_not_read(monkeypatch):
+    def fake_iter_ingest(list_of_contents, list_of_names, hashes=None, cancelled=None):
+        cancelled.wait(timeout=5)
+        return iter(())
+
+    monkeypatch.setattr(upload_jobs, 'iter_ingest', fake_iter_ingest)
+    queue = enqueue_upload(None, [b''] * 2, ['a.xlsx', 'b.xlsx'])
+    enqueue_upload(queue.queue_id, [b''], ['c.xlsx'])
+    queue.cancel()
+
+    done = False
+    while not done:
+        results, names, status, report, done = queue.poll()
+    assert status == [STATUS_CANCELLED] * 3
+    assert report == ([], [], ['a.xlsx', 'b.xlsx', 'c.xlsx'])